@@ -2,11 +2,14 @@
 # This version includes reminders, progress tracking, and data persistence!
 
 import re
+import sys
 import random
-import json
-import os
 from datetime import datetime, timedelta
 
+from intent_router import IntentRouter, MAX_INPUT_LENGTH
+from student_storage import JsonFileStorage
+from student_profiles import ProfileCache
+
 def greet_student():
     """
     Welcome message for our advanced chatbot
@@ -28,9 +31,21 @@ def greet_student():
     print("-" * 70)
 
 class AdvancedStudentBot:
-    def __init__(self):
+    def __init__(self, storage=None, student_id=None, profiles=None):
         self.data_file = "student_data.json"
-        self.student_data = self.load_student_data()
+        # Where grades, reminders and goals are kept (see student_storage.py).
+        # With a student_id each student has their own file instead, and
+        # `profiles` keeps the recently used ones loaded (see student_profiles.py)
+        self.profiles = profiles
+        self.student_id = None
+        self.storage = storage
+        # Only a storage the bot makes itself is closed by it - not one passed
+        # in by the caller, and not one that comes from `profiles`
+        self.own_storage = storage is None
+        if student_id is not None:
+            self.switch_student(student_id)
+        elif storage is None:
+            self.storage = JsonFileStorage(self.data_file)
         
         # Enhanced patterns for new features
         self.patterns = {
@@ -53,6 +68,12 @@ class AdvancedStudentBot:
             'help_command': [r'^help$', r'.*help.*', r'.*commands.*', r'.*what.*can.*do.*']
         }
         
+        # Very long messages (like a pasted transcript) are cut to this size
+        self.max_input_length = MAX_INPUT_LENGTH
+        
+        # Prepare the whole pattern table once into a single fast matcher
+        self.router = IntentRouter(self.patterns, max_input_length=self.max_input_length)
+        
         self.responses = {
             'gpa_question': [
                 "GPA stands for Grade Point Average! 📊 It's your academic performance in numbers. I can help you track your GPA by subject too! Try 'add subject Math grade 8.5'"
@@ -62,36 +83,6 @@ class AdvancedStudentBot:
             ]
         }
     
-    def load_student_data(self):
-        """
-        Load student data from file if it exists
-        """
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-            except:
-                pass
-        
-        # Default structure
-        return {
-            'subjects': {},  # {'Math': [8.5, 9.0], 'Physics': [7.5]}
-            'reminders': [],  # [{'task': 'study Math', 'time': '2024-01-01 18:00', 'completed': False}]
-            'goals': [],     # [{'goal': 'study 2 hours daily', 'target': 2, 'progress': 0}]
-            'study_sessions': []  # Track study time
-        }
-    
-    def save_student_data(self):
-        """
-        Save student data to file
-        """
-        try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.student_data, f, indent=2)
-            return True
-        except:
-            return False
-    
     def add_subject_grade(self, text):
         """
         Extract subject and grade from text like 'add subject Math grade 8.5'
@@ -104,14 +95,10 @@ class AdvancedStudentBot:
             subject = match.group(1).strip().title()
             grade = float(match.group(2))
             
-            if subject not in self.student_data['subjects']:
-                self.student_data['subjects'][subject] = []
-            
-            self.student_data['subjects'][subject].append(grade)
-            self.save_student_data()
+            grades = self.storage.add_grade(subject, grade)
             
             # Calculate current average for this subject
-            avg = sum(self.student_data['subjects'][subject]) / len(self.student_data['subjects'][subject])
+            avg = sum(grades) / len(grades)
             
             return f"✅ Added {subject}: {grade}\n📊 Current average in {subject}: {avg:.2f}\n💾 Data saved!"
         
@@ -121,7 +108,8 @@ class AdvancedStudentBot:
         """
         Show all subjects and their progress
         """
-        if not self.student_data['subjects']:
+        subjects = self.storage.subjects()
+        if not subjects:
             return "📚 No subjects added yet! Try: 'add subject Math grade 8.5'"
         
         result = "📊 Your Academic Progress:\n" + "="*40 + "\n"
@@ -129,7 +117,7 @@ class AdvancedStudentBot:
         total_points = 0
         total_subjects = 0
         
-        for subject, grades in self.student_data['subjects'].items():
+        for subject, grades in subjects.items():
             avg = sum(grades) / len(grades)
             total_points += avg
             total_subjects += 1
@@ -165,8 +153,7 @@ class AdvancedStudentBot:
                     'completed': False
                 }
                 
-                self.student_data['reminders'].append(reminder)
-                self.save_student_data()
+                self.storage.add_reminder(reminder)
                 
                 return f"⏰ Reminder set!\n📝 Task: {task}\n🕐 Time: {time_part}\n💡 I'll remind you when you ask 'show reminders'!"
         
@@ -176,12 +163,13 @@ class AdvancedStudentBot:
         """
         Show all reminders
         """
-        if not self.student_data['reminders']:
+        reminders = self.storage.reminders()
+        if not reminders:
             return "⏰ No reminders set! Try: 'set reminder study Math at 6pm'"
         
         result = "⏰ Your Study Reminders:\n" + "="*30 + "\n"
         
-        for i, reminder in enumerate(self.student_data['reminders'], 1):
+        for i, reminder in enumerate(reminders, 1):
             status = "✅ Completed" if reminder['completed'] else "⏳ Pending"
             result += f"\n{i}. 📝 {reminder['task']}\n"
             result += f"   🕐 {reminder['time']}\n"
@@ -204,8 +192,7 @@ class AdvancedStudentBot:
                 'target': 100  # Default target
             }
             
-            self.student_data['goals'].append(goal)
-            self.save_student_data()
+            self.storage.add_goal(goal)
             
             return f"🎯 Goal set: {goal_text}\n📈 Track your progress with 'show goals'\n💪 You've got this!"
         
@@ -215,12 +202,13 @@ class AdvancedStudentBot:
         """
         Show all goals
         """
-        if not self.student_data['goals']:
+        goals = self.storage.goals()
+        if not goals:
             return "🎯 No goals set! Try: 'set goal study 2 hours daily'"
         
         result = "🎯 Your Study Goals:\n" + "="*25 + "\n"
         
-        for i, goal in enumerate(self.student_data['goals'], 1):
+        for i, goal in enumerate(goals, 1):
             result += f"\n{i}. 📋 {goal['goal']}\n"
             result += f"   📅 Created: {goal['created']}\n"
             result += f"   📈 Progress: {goal['progress']}%\n"
@@ -266,17 +254,16 @@ Example: 'add subject Math grade 8.5'"""
         """
         user_input = user_input.lower().strip()
         
-        for intent, patterns in self.patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, user_input):
-                    return intent
-        
-        return 'unknown'
+        # One scan over the precompiled table (first intent still wins)
+        return self.router.match(user_input)
     
     def get_response(self, user_input):
         """
         Enhanced response handling with new features
         """
+        # Only look at the first part of very long messages
+        user_input = user_input[:self.max_input_length]
+        
         intent = self.match_pattern(user_input)
         
         # Handle new features
@@ -317,30 +304,60 @@ Example: 'add subject Math grade 8.5'"""
         """
         grades = re.findall(r'\b\d+(?:\.\d+)?\b', text)
         return [float(grade) for grade in grades if 0 <= float(grade) <= 10]
+    
+    def switch_student(self, student_id):
+        """
+        Carries on with another student's grades, reminders and goals
+        """
+        if self.profiles is None:
+            self.profiles = ProfileCache()
+        if self.own_storage and self.storage is not None:
+            # The bot's first storage isn't kept by `profiles`, so nobody
+            # else would ever save and close it
+            self.storage.close()
+        self.storage = self.profiles.get(student_id)
+        self.own_storage = False
+        self.student_id = student_id
+        self.data_file = self.profiles.path(student_id)
+    
+    def shutdown(self):
+        """
+        Writes any unsaved data before the program ends
+        """
+        if self.profiles is not None:
+            self.profiles.close()  # closes the current storage too, if it came from there
+        if self.own_storage:
+            self.storage.close()
 
-def main_advanced_chat():
+def main_advanced_chat(student_id=None):
     """
     Main chat loop for advanced chatbot
     """
     greet_student()
-    bot = AdvancedStudentBot()
+    bot = AdvancedStudentBot(student_id=student_id)
     
     print("✅ Advanced features loaded! Type 'help' to see all commands.")
     
-    while True:
-        user_input = input("\n💬 Command or question: ")
-        
-        if user_input.lower().strip() in ['quit', 'exit', 'bye', 'goodbye']:
-            print("\n👋 Goodbye! Your data has been saved. Keep studying smart! 🌟")
-            break
-        
-        if user_input.strip() == "":
-            continue
-        
-        response = bot.get_response(user_input)
-        print(f"\n🤖 Assistant: {response}")
+    try:
+        while True:
+            user_input = input("\n💬 Command or question: ")
+            
+            if user_input.lower().strip() in ['quit', 'exit', 'bye', 'goodbye']:
+                print("\n👋 Goodbye! Your data has been saved. Keep studying smart! 🌟")
+                bot.shutdown()
+                break
+            
+            if user_input.strip() == "":
+                continue
+            
+            response = bot.get_response(user_input)
+            print(f"\n🤖 Assistant: {response}")
+    except KeyboardInterrupt:
+        print("\n👋 Goodbye! Your data has been saved.")
+        bot.shutdown()
 
 # Start the advanced chatbot
 if __name__ == "__main__":
     print("🚀 Starting Advanced Student Helper Chatbot...")
-    main_advanced_chat()
+    # python advanced_chatbot.py [student ID]
+    main_advanced_chat(sys.argv[1] if len(sys.argv) > 1 else None)
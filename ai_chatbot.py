@@ -1,9 +1,37 @@
 # Student Helper Chatbot - Milestone 2: FREE AI-Powered Version
 # This version uses completely FREE AI models that run on your computer!
 
+import time
 import warnings
 warnings.filterwarnings("ignore")  # Hide technical warnings for cleaner output
 
+from response_cache import ResponseCache
+from streaming import hold_back_short_answers
+from conversation_window import ConversationWindow
+from latency_budget import LatencyBudget
+from generation_backends import TransformersBackend
+
+AI_MODEL_NAME = "microsoft/DialoGPT-small"  # Free conversational AI model
+
+# Settings we generate with - they are part of the cache key too
+GENERATION_SETTINGS = {'max_length': 200, 'num_return_sequences': 1, 'pad_token_id': 50256}
+
+# Remembers answers to questions we've already asked the AI (also after a restart)
+AI_RESPONSE_CACHE = ResponseCache("ai_response_cache")
+
+# Time-to-first-token and token count of every streamed answer
+TURN_STATS = []
+
+# Every prompt starts with these instructions
+AI_INSTRUCTIONS = "You are a helpful student assistant chatbot. Answer student questions clearly and friendly.\n\n"
+
+# Longest we wait for the AI before answering from our patterns instead
+AI_LATENCY_BUDGET = LatencyBudget(seconds=8.0)
+
+# How many tokens of earlier conversation go into each prompt. max_length
+# counts the prompt too, so this leaves room for the answer.
+HISTORY_TOKEN_BUDGET = 80
+
 def greet_student():
     """
     Shows a welcome message for our AI-powered chatbot
@@ -18,22 +46,29 @@ def greet_student():
     print("- Type 'quit' to exit")
     print("-" * 60)
 
-def setup_ai_model():
+def setup_ai_model(quantize=False, backend=None):
     """
-    Sets up our FREE AI model (this might take a moment the first time)
+    Sets up our FREE AI model (this might take a moment the first time).
+    quantize=True loads a smaller, faster int8 version (see quantization.py).
+    Pass a ready backend (like StubBackend from generation_backends.py) to
+    use that instead of the real model.
     """
+    if backend is not None:
+        return backend
+    
     try:
         print("🔄 Loading AI brain... (this might take 30 seconds the first time)")
-        
-        from transformers import pipeline
+        # One registry for the tip and the backend, so its list is read once
+        from model_registry import ModelRegistry
+        registry = ModelRegistry()
+        if not registry.has(AI_MODEL_NAME):
+            print(f"💡 Tip: run 'python model_registry.py add {AI_MODEL_NAME}' once to start faster (even offline)")
         
         # This creates our AI "brain" using a free model designed for conversations
         # It's like having a mini ChatGPT running on your computer!
-        chatbot_ai = pipeline(
-            "text-generation",
-            model="microsoft/DialoGPT-small",  # Free conversational AI model
-            tokenizer="microsoft/DialoGPT-small"
-        )
+        # The instructions are read once instead of before every question.
+        chatbot_ai = TransformersBackend(AI_MODEL_NAME, prefix=AI_INSTRUCTIONS, quantize=quantize,
+                                         registry=registry)
         
         print("✅ AI brain loaded successfully!")
         return chatbot_ai
@@ -45,26 +80,70 @@ def setup_ai_model():
         print(f"❌ Error loading AI: {e}")
         return None
 
-def get_ai_response(ai_model, user_question, conversation_history=""):
+def make_student_prompt(user_question, conversation_history=""):
+    """
+    Creates a student-focused prompt to guide the AI.
+    conversation_history holds the recent turns (see ConversationWindow).
+    """
+    return f"""{AI_INSTRUCTIONS}{conversation_history}Student Question: {user_question}
+Answer:"""
+
+def ai_cache_params(ai_model):
+    """
+    Everything that changes the AI's answer - used as part of the cache key
+    """
+    return {'model': getattr(ai_model, 'name', AI_MODEL_NAME), 'variant': getattr(ai_model, 'variant', 'fp32'),
+            **GENERATION_SETTINGS}
+
+def worth_caching(user_question, answer, seconds):
+    """
+    Only answers we'd show again go into the cache: not too short, not the
+    question echoed back, and not one that ran into the time limit (the
+    student got a fallback answer instead, or it was cut off)
+    """
+    return len(answer) >= 10 and answer != user_question and seconds <= AI_LATENCY_BUDGET.seconds
+
+def generate_answer(ai_model, student_prompt, cache_params, user_question):
+    """
+    Runs the AI model (in a background thread) and saves a good answer in
+    the cache
+    """
+    settings = {**GENERATION_SETTINGS, 'max_time': AI_LATENCY_BUDGET.hard_limit}
+    start = time.perf_counter()
+    response = ai_model(student_prompt, **settings)
+    
+    # Extract just the answer part
+    full_response = response[0]['generated_text']
+    answer = full_response.split("Answer:")[-1].strip()
+    seconds = time.perf_counter() - start
+    if worth_caching(user_question, answer, seconds):
+        AI_RESPONSE_CACHE.put(student_prompt, cache_params, answer, seconds)
+    return answer
+
+def get_ai_response(ai_model, user_question, conversation_history="", stream=False):
     """
-    Gets an intelligent response from our AI model
+    Gets an intelligent response from our AI model.
+    With stream=True you get the answer piece by piece instead (loop over it).
     """
+    if stream:
+        return stream_ai_response(ai_model, user_question, conversation_history)
+    
     if not ai_model:
         return "Sorry, AI is not available right now. Please try again later."
     
     try:
-        # Create a student-focused prompt to guide the AI
-        student_prompt = f"""You are a helpful student assistant chatbot. Answer student questions clearly and friendly.
-
-Student Question: {user_question}
-Answer:"""
+        student_prompt = make_student_prompt(user_question, conversation_history)
         
-        # Get AI response
-        response = ai_model(student_prompt, max_length=200, num_return_sequences=1, pad_token_id=50256)
+        # Same question asked before? Reuse the answer instead of generating again
+        cache_params = ai_cache_params(ai_model)
+        answer = AI_RESPONSE_CACHE.get(student_prompt, cache_params)
         
-        # Extract just the answer part
-        full_response = response[0]['generated_text']
-        answer = full_response.split("Answer:")[-1].strip()
+        if answer is None:
+            # Get AI response - but don't keep the student waiting too long
+            on_time, answer = AI_LATENCY_BUDGET.run(generate_answer, ai_model, student_prompt, cache_params,
+                                                  user_question)
+            if not on_time:
+                return get_fallback_response(user_question)
         
         # If the answer is too short or weird, give a fallback response
         if len(answer) < 10 or answer == user_question:
@@ -76,6 +155,58 @@ Answer:"""
         print(f"AI Error: {e}")
         return get_fallback_response(user_question)
 
+def stream_ai_response(ai_model, user_question, conversation_history=""):
+    """
+    Like get_ai_response, but yields the answer while the AI is still writing it
+    """
+    if not ai_model:
+        yield "Sorry, AI is not available right now. Please try again later."
+        return
+    
+    student_prompt = make_student_prompt(user_question, conversation_history)
+    cache_params = ai_cache_params(ai_model)
+    cached_answer = AI_RESPONSE_CACHE.get(student_prompt, cache_params)
+    
+    if cached_answer is not None:
+        token_stream = None
+        pieces = [cached_answer]
+    else:
+        # Stop if the AI starts writing the next student question itself
+        settings = {**GENERATION_SETTINGS, 'max_time': AI_LATENCY_BUDGET.hard_limit}
+        token_stream = ai_model.stream(student_prompt, settings, stop_texts=("Student:", "Student Question:"))
+        pieces = token_stream
+    
+    def answer_pieces():
+        # Too-short answers get replaced by a fallback, like get_ai_response does
+        yield from hold_back_short_answers(pieces, 10, lambda short: get_fallback_response(user_question))
+        if token_stream:
+            # A late stream is read to the end, but the student never saw it
+            first_token = token_stream.first_token_seconds
+            answer = token_stream.text.strip()
+            if (first_token is not None and worth_caching(user_question, answer, first_token)
+                    and token_stream.total_seconds < AI_LATENCY_BUDGET.hard_limit):
+                AI_RESPONSE_CACHE.put(student_prompt, cache_params, answer, token_stream.total_seconds)
+            TURN_STATS.append(token_stream.stats())
+    
+    shown = False
+    try:
+        if token_stream:
+            # No first words within the time budget? Answer from our patterns instead
+            answer = AI_LATENCY_BUDGET.start_stream(answer_pieces())
+            if answer is None:
+                yield get_fallback_response(user_question)
+                return
+        else:
+            answer = answer_pieces()
+        
+        for piece in answer:
+            shown = True
+            yield piece
+    except Exception as e:
+        print(f"AI Error: {e}")
+        if not shown:
+            yield get_fallback_response(user_question)
+
 def get_fallback_response(user_question):
     """
     Backup responses when AI isn't working perfectly
@@ -109,28 +240,44 @@ def main_ai_chat():
     if not ai_model:
         print("⚠️ Running in basic mode. AI features will be available once installation completes.")
     
-    conversation_history = ""
+    # Recent turns the AI can see, kept within a fixed token budget so the
+    # prompt (and the wait) doesn't grow during a long chat
+    conversation = ConversationWindow(tokenizer=ai_model.tokenizer if ai_model else None,
+                                      max_tokens=HISTORY_TOKEN_BUDGET)
     
     while True:
         user_input = input("\n💬 Ask me anything: ")
         
         if user_input.lower().strip() in ['quit', 'exit', 'bye', 'goodbye']:
             print("\n👋 Goodbye! Keep up the great work with your studies!")
+            stats = AI_RESPONSE_CACHE.stats()
+            if stats['memory_hits'] + stats['disk_hits']:
+                print(f"📦 Answer cache: {stats['hit_rate']:.0%} hit rate, saved {stats['saved_seconds']:.1f}s of AI thinking")
+            timed = [turn['first_token_seconds'] for turn in TURN_STATS if turn['first_token_seconds'] is not None]
+            if timed:
+                print(f"⏱️ First words appeared after {sum(timed) / len(timed):.2f}s on average")
+            budget = AI_LATENCY_BUDGET.stats()
+            if budget['missed']:
+                print(f"⏳ The AI missed the {budget['budget_seconds']:.0f}s time limit {budget['missed']} time(s)")
             break
         
         if user_input.strip() == "":
             continue
             
-        # Get AI response
+        # Get AI response - printed piece by piece while the AI writes it
         if ai_model:
-            response = get_ai_response(ai_model, user_input, conversation_history)
+            print("\n🤖 AI Assistant: ", end="", flush=True)
+            response = ""
+            for piece in get_ai_response(ai_model, user_input, conversation.render(), stream=True):
+                print(piece, end="", flush=True)
+                response += piece
+            print()
         else:
             response = get_fallback_response(user_input)
-        
-        print(f"\n🤖 AI Assistant: {response}")
+            print(f"\n🤖 AI Assistant: {response}")
         
         # Keep track of conversation for context
-        conversation_history += f"Student: {user_input}\nAssistant: {response}\n"
+        conversation.add_turn(user_input, response)
 
 # Start the chatbot
 if __name__ == "__main__":
@@ -0,0 +1,1396 @@
+# Student Helper Chatbot - Performance Benchmarks
+# Small timing experiments to check that our speed-ups really help!
+# Run one with: python benchmarks.py router
+# Or run them all with: python benchmarks.py
+
+import ast
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+def load_testing_phrases(path="testing_guide.py"):
+    """
+    Collects every example command from testing_guide.py so our benchmarks
+    use the same phrases a real student would type.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    phrases = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            for line in node.value.splitlines():
+                line = line.strip()
+                # Skip blank lines, comments, headings and checklist items
+                if not line or line.startswith(('#', '-', '=', '[')) or not line[0].isascii():
+                    continue
+                if line.endswith(':') or len(line) > 80:
+                    continue
+                phrases.append(line)
+    return phrases
+
+
+@contextmanager
+def scratch_directory():
+    """
+    Runs the bots inside a temporary folder so benchmarks never touch
+    your real student_data.json
+    """
+    original = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            yield folder
+        finally:
+            os.chdir(original)
+
+
+def time_per_call(function, inputs, repeat=20):
+    """
+    Runs function over all inputs several times and returns the
+    average time for ONE call in microseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in inputs:
+            function(text)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(inputs)) * 1_000_000
+
+
+def legacy_match(pattern_table, text):
+    """
+    The original matching loop: every intent, every pattern, one re.search each
+    """
+    text = text.lower().strip()
+    for intent, patterns in pattern_table:
+        for pattern in patterns:
+            if re.search(pattern, text):
+                return intent
+    return 'unknown'
+
+
+def run_router_benchmark():
+    """
+    Compares the old nested re.search loop against the precompiled IntentRouter
+    """
+    from intent_router import IntentRouter
+    from smart_chatbot import SmartStudentBot
+    from advanced_chatbot import AdvancedStudentBot
+    from final_chatbot import AdvancedStudentBot as FinalStudentBot
+    from conversational_chatbot import ConversationalStudentBot
+
+    phrases = load_testing_phrases()
+    print(f"📋 Corpus: {len(phrases)} phrases from testing_guide.py\n")
+
+    with scratch_directory():
+        bots = [
+            ("smart_chatbot", SmartStudentBot()),
+            ("advanced_chatbot", AdvancedStudentBot()),
+            ("final_chatbot", FinalStudentBot()),
+            ("conversational_chatbot", ConversationalStudentBot()),
+        ]
+
+        print(f"{'Bot':<24}{'Loop (µs)':>12}{'Router (µs)':>14}{'Cached (µs)':>14}{'Speed-up':>10}")
+        for name, bot in bots:
+            table = list(getattr(bot, 'patterns', getattr(bot, 'command_patterns', {})).items())
+            router = IntentRouter(table, cache_size=0)
+            cached_router = IntentRouter(table)
+
+            # Both must agree on every phrase before we compare speed
+            for text in phrases:
+                assert legacy_match(table, text) == router.match(text.lower().strip()), text
+
+            loop_time = time_per_call(lambda text: legacy_match(table, text), phrases)
+            router_time = time_per_call(lambda text: router.match(text.lower().strip()), phrases)
+            cached_time = time_per_call(lambda text: cached_router.match(text.lower().strip()), phrases)
+            print(f"{name:<24}{loop_time:>12.2f}{router_time:>14.2f}{cached_time:>14.2f}"
+                  f"{loop_time / cached_time:>9.1f}x")
+
+            if hasattr(bot, 'shutdown'):
+                bot.shutdown()
+
+        # One pass over the corpus, like a single student session
+        session_router = IntentRouter(list(bots[2][1].patterns.items()))
+        for text in phrases:
+            session_router.match(text.lower().strip())
+        info = session_router.cache_info()
+        print(f"\n🗂️ One pass through the corpus (final_chatbot): {info['hits']} hits, "
+              f"{info['misses']} misses ({info['hit_rate']:.0%} hit rate)")
+
+
+def legacy_keyword_category(bot, text):
+    """
+    The original keyword check: one `keyword in text` per keyword, per category
+    """
+    text = text.lower()
+    for name, data in bot.conversation_patterns.items():
+        if any(keyword in text for keyword in data['keywords']):
+            return name
+    if any(greeting in text for greeting in bot.greetings):
+        return 'greeting'
+    if any(thank in text for thank in bot.thanks):
+        return 'thanks'
+    return None
+
+
+def run_keyword_benchmark():
+    """
+    Compares the per-keyword `in` checks against the Aho-Corasick keyword engine
+    on the testing corpus and on long pasted messages
+    """
+    from conversational_chatbot import ConversationalStudentBot
+
+    phrases = load_testing_phrases()
+
+    with scratch_directory():
+        bot = ConversationalStudentBot()
+        engine = bot.keyword_engine
+
+        # Both must pick the same category before we compare speed
+        for text in phrases:
+            assert legacy_keyword_category(bot, text) == engine.first_match(text.lower()), text
+
+        print(f"📋 Corpus: {len(phrases)} phrases from testing_guide.py")
+        loop_time = time_per_call(lambda text: legacy_keyword_category(bot, text), phrases)
+        engine_time = time_per_call(lambda text: engine.first_match(text.lower()), phrases)
+        print(f"   Keyword loop: {loop_time:.2f} µs/message   Automaton: {engine_time:.2f} µs/message\n")
+
+        # A pasted paragraph with no keywords is the worst case for the old loop:
+        # it has to read the whole text once for EVERY keyword
+        keyword_count = sum(len(data['keywords']) for data in bot.conversation_patterns.values())
+        keyword_count += len(bot.greetings) + len(bot.thanks)
+        print(f"🔑 {keyword_count} keywords in total")
+        print(f"{'Message size':<14}{'Loop (ms)':>12}{'Automaton (ms)':>16}{'ms per KB':>11}")
+        filler = "lorem ipsum dolor sit amet consectetur adipiscing elit sed "
+        for size in [1_000, 10_000, 100_000]:
+            message = (filler * (size // len(filler) + 1))[:size]
+            assert legacy_keyword_category(bot, message) == engine.first_match(message.lower())
+            loop_time = time_per_call(lambda text: legacy_keyword_category(bot, text), [message], repeat=5) / 1000
+            engine_time = time_per_call(lambda text: engine.first_match(text.lower()), [message], repeat=5) / 1000
+            print(f"{size // 1000:>5} KB{'':<7}{loop_time:>12.3f}{engine_time:>16.3f}{engine_time / (size / 1000):>11.4f}")
+
+        bot.shutdown()
+
+
+def run_faq_benchmark():
+    """
+    Times FAQ lookups: exact questions, messy questions and typos
+    """
+    from chatbot import FAQ_INDEX, FAQ_ALIASES
+
+    groups = {
+        'exact': list(FAQ_ALIASES),
+        'normalized': ["Whats GPA?", "what's cgpa", "Give me some study tips!", "how do I manage time?"],
+        'fuzzy (typos)': ["attendence", "time managment", "cgpa calculaton", "studdy tips"],
+        'unknown': ["what is the weather", "tell me a joke", "asdfghjkl", "12345"],
+    }
+
+    print(f"{'Question type':<16}{'µs per lookup':>15}{'answered':>10}")
+    for name, questions in groups.items():
+        answered = sum(1 for question in questions if FAQ_INDEX.lookup(question))
+        lookup_time = time_per_call(FAQ_INDEX.lookup, questions, repeat=200)
+        print(f"{name:<16}{lookup_time:>15.2f}{answered:>6}/{len(questions)}")
+
+
+def run_semantic_benchmark():
+    """
+    Shows how many corpus questions the TF-IDF tier answers before they
+    reach the AI model, and how long each tier takes
+    """
+    from ultimate_chatbot import UltimateStudentBot
+
+    phrases = load_testing_phrases()
+    knowledge_intents = ['gpa_question', 'cgpa_question', 'study_tips', 'time_management', 'exam_prep']
+
+    with scratch_directory():
+        bot = UltimateStudentBot(enable_ai=False)
+
+        tiers = {'regex command': [], 'semantic answer': [], 'needs AI model': []}
+        for text in phrases:
+            is_command, intent = bot.is_structured_command(text)
+            if is_command and intent not in knowledge_intents:
+                tiers['regex command'].append(text)
+            elif bot.get_semantic_response(text):
+                tiers['semantic answer'].append(text)
+            else:
+                tiers['needs AI model'].append(text)
+
+        print(f"📋 Corpus: {len(phrases)} phrases from testing_guide.py\n")
+        for name, texts in tiers.items():
+            print(f"   {name:<18}{len(texts):>5} ({len(texts) / len(phrases):.0%})")
+
+        would_reach_ai = len(phrases) - len(tiers['regex command'])
+        deflected = len(tiers['semantic answer'])
+        print(f"\n🛡️ AI calls avoided: {deflected} of {would_reach_ai} ({deflected / would_reach_ai:.0%})")
+
+        regex_time = time_per_call(bot.is_structured_command, phrases)
+        semantic_time = time_per_call(bot.semantic_tier.classify, phrases)
+        print(f"\n⏱️ Latency per tier:")
+        print(f"   regex routing     {regex_time:>10.1f} µs")
+        print(f"   semantic tier     {semantic_time:>10.1f} µs")
+        print(f"   AI model          (not loaded here - usually hundreds of ms or more on CPU)")
+
+        bot.shutdown()
+
+
+def make_long_inputs(size):
+    """
+    Builds nasty long messages of about `size` characters. Each one is
+    shaped to make '.*a.*b.*' style regex backtrack as much as possible.
+    """
+    shapes = {
+        'repeated what': "what is the ",           # lots of 'what', never 'gpa'
+        'calculate, no digits': "calculate ",      # 'calculate.*\\d+' never finds a digit
+        'cgpa + two digits': "cgpa 1 x 2 y ",      # '\\d+.*\\d+.*\\d+' keeps retrying
+        'subject names': "subject math ",          # the add subject regex
+        'transcript lines': "hello there\n",      # many short lines
+    }
+    return {name: (chunk * (size // len(chunk) + 1))[:size] for name, chunk in shapes.items()}
+
+
+def run_stress_benchmark():
+    """
+    Feeds 1 KB - 1 MB messages to every bot and records the worst latency
+    """
+    import chatbot
+    import ai_chatbot
+    from intent_router import MAX_INPUT_LENGTH
+    from smart_chatbot import SmartStudentBot
+    from advanced_chatbot import AdvancedStudentBot
+    from final_chatbot import AdvancedStudentBot as FinalStudentBot
+    from conversational_chatbot import ConversationalStudentBot
+    from ultimate_chatbot import UltimateStudentBot
+
+    sizes = [1_000, 10_000, 100_000, 1_000_000]
+    print(f"✂️ Input length cap: {MAX_INPUT_LENGTH} characters\n")
+
+    with scratch_directory():
+        smart_bot = SmartStudentBot()
+        advanced_bot = AdvancedStudentBot()
+        final_bot = FinalStudentBot()
+        conversational_bot = ConversationalStudentBot()
+        ultimate_bot = UltimateStudentBot(enable_ai=False)
+        bots = [
+            ("chatbot (FAQ)", chatbot.get_faq_response, []),
+            ("ai_chatbot (fallback)", ai_chatbot.get_fallback_response, []),
+            ("smart_chatbot", smart_bot.get_response, [smart_bot.router]),
+            ("advanced_chatbot", advanced_bot.get_response, [advanced_bot.router]),
+            ("final_chatbot", final_bot.get_response, [final_bot.router]),
+            ("conversational_chatbot", conversational_bot.get_response, [conversational_bot.command_router]),
+            ("ultimate_chatbot", ultimate_bot.get_response, [ultimate_bot.command_router]),
+        ]
+
+        header = "".join(f"{size // 1000:>8} KB" for size in sizes)
+        print(f"{'Worst-case latency (ms)':<26}{header}")
+        for name, get_response, routers in bots:
+            row = ""
+            for size in sizes:
+                worst = 0.0
+                for text in make_long_inputs(size).values():
+                    # Start cold every time - a cache hit isn't the worst case
+                    for router in routers:
+                        router.cache.clear()
+                    start = time.perf_counter()
+                    get_response(text)
+                    worst = max(worst, time.perf_counter() - start)
+                row += f"{worst * 1000:>11.2f}"
+            print(f"{name:<26}{row}")
+
+        # For comparison: the old re.search loop with no cap. It slows down so
+        # quickly that we only try small messages.
+        table = list(final_bot.patterns.items())
+        print(f"\n{'Old regex loop (final)':<26}{'ms':>11}")
+        for size in [250, 500, 1_000, 2_000]:
+            worst = 0.0
+            for text in make_long_inputs(size).values():
+                start = time.perf_counter()
+                legacy_match(table, text)
+                worst = max(worst, time.perf_counter() - start)
+            print(f"{f'{size} characters':<26}{worst * 1000:>11.2f}")
+
+        for bot in [final_bot, conversational_bot, ultimate_bot]:
+            bot.shutdown()
+
+
+# Runs in a fresh Python so the import time of transformers is counted too
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {repo!r})
+from ultimate_chatbot import UltimateStudentBot
+bot = UltimateStudentBot(background_warmup={background!r})
+first_prompt = time.perf_counter() - start
+bot.get_response('show my subjects')
+bot.ai_ready.wait()
+ai_ready = time.perf_counter() - start
+print('RESULT', first_prompt, ai_ready, bot.conversational_ai is not None)
+"""
+
+
+def run_startup_benchmark(runs=3):
+    """
+    Time-to-first-prompt of UltimateStudentBot: loading the AI model
+    before the prompt (the old way) vs warming it up in the background
+    """
+    repo = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'Startup':<28}{'first prompt (s)':>18}{'AI ready (s)':>15}")
+
+    for label, background in [('Load AI first (before)', False), ('Background warm-up', True)]:
+        prompt_times, ready_times = [], []
+        loaded = 'False'
+        for _ in range(runs):
+            with scratch_directory() as folder:
+                script = STARTUP_SCRIPT.format(repo=repo, background=background)
+                result = subprocess.run([sys.executable, "-c", script], cwd=folder,
+                                        capture_output=True, text=True)
+            lines = [line for line in result.stdout.splitlines() if line.startswith('RESULT')]
+            if not lines:
+                print(f"⚠️ {label}: run failed\n{result.stderr[-500:]}")
+                return
+            _, first_prompt, ai_ready, loaded = lines[-1].split()
+            prompt_times.append(float(first_prompt))
+            ready_times.append(float(ai_ready))
+
+        # The median ignores one unlucky slow run
+        prompt_times.sort()
+        ready_times.sort()
+        print(f"{label:<28}{prompt_times[runs // 2]:>18.3f}{ready_times[runs // 2]:>15.3f}")
+
+    if loaded != 'True':
+        print("\n(The AI model could not be loaded here, so 'AI ready' is the time to give up.)")
+
+
+class SlowFakeModel:
+    """
+    Pretends to be the AI pipeline: waits a bit, then echoes an answer.
+    Lets us time the cache without downloading a real model.
+    """
+
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.calls = 0
+
+    def __call__(self, prompt, **settings):
+        self.calls += 1
+        # Like generate(max_time=...), give up after the hard time limit
+        time.sleep(min(self.seconds, settings.get('max_time', self.seconds)))
+        return [{'generated_text': prompt + " Here is a helpful study answer for you!"}]
+
+
+def run_response_cache_benchmark():
+    """
+    Asks every testing phrase twice (like students repeating questions),
+    then again after a "restart" to show the on-disk cache working
+    """
+    import ai_chatbot
+    from response_cache import ResponseCache
+
+    questions = load_testing_phrases()
+    model = SlowFakeModel()
+    with scratch_directory():
+        for label in ['First run (cold)', 'Same questions again', 'After restart']:
+            if label == 'After restart':
+                ai_chatbot.AI_RESPONSE_CACHE = ResponseCache("ai_response_cache")
+            cache = ai_chatbot.AI_RESPONSE_CACHE
+            calls_before = model.calls
+            start = time.perf_counter()
+            for question in questions:
+                ai_chatbot.get_ai_response(model, question)
+            seconds = time.perf_counter() - start
+            stats = cache.stats()
+            print(f"{label:<22}{seconds:>8.2f}s  model calls: {model.calls - calls_before:>4}  "
+                  f"hit rate: {stats['hit_rate']:>5.0%}  saved: {stats['saved_seconds']:.2f}s")
+
+
+class FakeBatchModel:
+    """
+    Pretends to be a model on CPU: every call has a fixed overhead, and
+    each extra prompt in the batch adds a little more. Only one call can
+    run at a time, just like one model sharing the CPU.
+    """
+
+    def __init__(self, overhead=0.04, per_prompt=0.005):
+        self.overhead = overhead
+        self.per_prompt = per_prompt
+        self.lock = threading.Lock()
+
+    def generate_batch(self, prompts, settings):
+        with self.lock:
+            time.sleep(self.overhead + self.per_prompt * len(prompts))
+        return [[{'generated_text': prompt + " answer"}] for prompt in prompts]
+
+    def __call__(self, prompt, **settings):
+        return self.generate_batch([prompt], settings)[0]
+
+
+def measure_throughput(ask, sessions, questions_per_session=5):
+    """
+    Starts `sessions` chat threads that each ask a few questions and
+    returns answered questions per second
+    """
+    def chat(session):
+        for number in range(questions_per_session):
+            ask(f"Student {session}: question {number}")
+
+    threads = [threading.Thread(target=chat, args=(session,)) for session in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sessions * questions_per_session / (time.perf_counter() - start)
+
+
+def run_batching_benchmark():
+    """
+    Throughput of one-call-per-question vs the micro-batching queue,
+    for more and more students chatting at the same time
+    """
+    from inference_queue import BatchingScheduler
+
+    model = FakeBatchModel()
+    settings = {'max_length': 60, 'pad_token_id': 50256}
+    print(f"{'Chats at once':<15}{'one by one (q/s)':>18}{'batched (q/s)':>16}{'avg batch':>11}")
+    for sessions in [1, 2, 4, 8, 16]:
+        direct = measure_throughput(lambda prompt: model(prompt, **settings), sessions)
+
+        scheduler = BatchingScheduler(model.generate_batch, max_batch_size=8, max_wait=0.02)
+        batched = measure_throughput(lambda prompt: scheduler.submit(prompt, **settings), sessions)
+        scheduler.stop()
+
+        print(f"{sessions:<15}{direct:>18.1f}{batched:>16.1f}{scheduler.stats()['avg_batch_size']:>11.1f}")
+
+
+def generate_replies(model, tokenizer, prompts, new_tokens=40):
+    """
+    Greedy (non-random) replies, so fp32 and int8 can be compared fairly.
+    Returns (replies, tokens per second).
+    """
+    import torch
+
+    replies = []
+    tokens = 0
+    start = time.perf_counter()
+    for prompt in prompts:
+        inputs = tokenizer(prompt, return_tensors="pt")
+        with torch.no_grad():
+            output = model.generate(**inputs, do_sample=False, max_new_tokens=new_tokens,
+                                    min_new_tokens=new_tokens, pad_token_id=tokenizer.eos_token_id)
+        new = output[0, inputs["input_ids"].shape[-1]:]
+        tokens += len(new)
+        replies.append(tokenizer.decode(new, skip_special_tokens=True))
+    return replies, tokens / (time.perf_counter() - start)
+
+
+def run_quantization_benchmark():
+    """
+    fp32 vs int8 DialoGPT: weight memory, generation speed and how similar
+    the replies are. Set BENCHMARK_MODEL to try another (local) model.
+    """
+    from difflib import SequenceMatcher
+    from ai_chatbot import AI_MODEL_NAME
+    from quantization import load_quantized_model, model_size_bytes
+
+    try:
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+    except ImportError:
+        print("⚠️ This benchmark needs transformers and torch installed")
+        return
+
+    model_name = os.environ.get("BENCHMARK_MODEL", AI_MODEL_NAME)
+    prompts = [f"Student: {question}\nAssistant:" for question in load_testing_phrases()[:8]]
+
+    with scratch_directory():
+        try:
+            start = time.perf_counter()
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            fp32_model = AutoModelForCausalLM.from_pretrained(model_name).eval()
+            fp32_load = time.perf_counter() - start
+        except Exception as e:
+            print(f"⚠️ Could not load {model_name}: {e}")
+            return
+
+        start = time.perf_counter()
+        int8_model = load_quantized_model(model_name)
+        first_load = time.perf_counter() - start
+        start = time.perf_counter()
+        int8_model = load_quantized_model(model_name)
+        cached_load = time.perf_counter() - start
+
+        fp32_replies, fp32_speed = generate_replies(fp32_model, tokenizer, prompts)
+        int8_replies, int8_speed = generate_replies(int8_model, tokenizer, prompts)
+        fp32_size = model_size_bytes(fp32_model)
+        int8_size = model_size_bytes(int8_model)
+
+    similarity = [SequenceMatcher(None, a, b).ratio() for a, b in zip(fp32_replies, int8_replies)]
+    identical = sum(a == b for a, b in zip(fp32_replies, int8_replies))
+
+    print(f"Model: {model_name}")
+    print(f"{'':<26}{'fp32':>12}{'int8':>12}")
+    print(f"{'Weights (MB)':<26}{fp32_size / 1e6:>12.1f}{int8_size / 1e6:>12.1f}")
+    print(f"{'Tokens per second':<26}{fp32_speed:>12.1f}{int8_speed:>12.1f}")
+    print(f"{'Load time (s)':<26}{fp32_load:>12.2f}{first_load:>12.2f}  (int8 first start, quantizing)")
+    print(f"{'':<26}{'':>12}{cached_load:>12.2f}  (int8 later starts, from cache)")
+    print(f"\nReply similarity to fp32: {sum(similarity) / len(similarity):.0%} on average, "
+          f"{identical}/{len(prompts)} replies identical")
+
+
+def run_prefix_cache_benchmark():
+    """
+    How much prompt reading ("prefill") we save per AI call by reusing
+    the system prompt's KV cache. Set BENCHMARK_MODEL to try another model.
+    """
+    try:
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+    except ImportError:
+        print("⚠️ This benchmark needs transformers and torch installed")
+        return
+    from ai_chatbot import AI_MODEL_NAME
+    from prefix_cache import PrefixCache
+    from ultimate_chatbot import UltimateStudentBot
+
+    model_name = os.environ.get("BENCHMARK_MODEL", AI_MODEL_NAME)
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForCausalLM.from_pretrained(model_name).eval()
+    except Exception as e:
+        print(f"⚠️ Could not load {model_name}: {e}")
+        return
+
+    with scratch_directory():
+        bot = UltimateStudentBot(enable_ai=False)
+        prompts = [bot.make_ai_request(question)[0] for question in load_testing_phrases()[:20]]
+        bot.shutdown()
+
+    cache = PrefixCache(model, tokenizer, bot.ai_instructions)
+    full_seconds = cached_seconds = 0.0
+    full_tokens = cached_tokens = 0
+    with torch.no_grad():
+        for prompt in prompts:
+            input_ids = tokenizer(prompt, return_tensors="pt")["input_ids"]
+            start = time.perf_counter()
+            model(input_ids, use_cache=True)
+            full_seconds += time.perf_counter() - start
+            full_tokens += input_ids.shape[-1]
+
+            start = time.perf_counter()
+            inputs = cache.prepare(prompt)
+            past = inputs["past_key_values"]
+            reused = past.get_seq_length()
+            model(input_ids[:, reused:], past_key_values=past, use_cache=True)
+            cached_seconds += time.perf_counter() - start
+            cached_tokens += input_ids.shape[-1] - reused
+
+    calls = len(prompts)
+    print(f"Model: {model_name}")
+    print(f"System prompt cached once in {cache.prefill_seconds * 1000:.1f}ms "
+          f"({cache.prefix_ids.shape[-1]} tokens)")
+    print(f"{'Prefill per call':<26}{'tokens':>10}{'ms':>10}")
+    print(f"{'Whole prompt (before)':<26}{full_tokens / calls:>10.1f}{full_seconds / calls * 1000:>10.2f}")
+    print(f"{'Student text only (after)':<26}{cached_tokens / calls:>10.1f}{cached_seconds / calls * 1000:>10.2f}")
+    print(f"\nSaved {1 - cached_tokens / full_tokens:.0%} of the prompt tokens on every call")
+
+
+def run_conversation_window_benchmark(turns=200):
+    """
+    Prompt size over a long chat: the old ever-growing history string vs
+    the token-budgeted ConversationWindow (exact tokenizer counts if a
+    tokenizer can be loaded, word counts otherwise)
+    """
+    from ai_chatbot import AI_MODEL_NAME, HISTORY_TOKEN_BUDGET, make_student_prompt
+    from conversation_window import ConversationWindow
+
+    tokenizer = None
+    model_name = os.environ.get("BENCHMARK_MODEL", AI_MODEL_NAME)
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+    except Exception:
+        print("(No tokenizer available - counting words instead of tokens)")
+
+    window = ConversationWindow(tokenizer=tokenizer, max_tokens=HISTORY_TOKEN_BUDGET)
+    questions = load_testing_phrases()
+    old_history = ""
+    print(f"{'After turn':<12}{'old prompt (tokens)':>22}{'window prompt (tokens)':>25}")
+    for turn in range(1, turns + 1):
+        question = questions[turn % len(questions)]
+        answer = "Here are a few tips that should help you with that."
+        old_history += f"Student: {question}\nAssistant: {answer}\n"
+        window.add_turn(question, answer)
+        if turn in (1, 10, 50, 100, turns):
+            old_prompt = make_student_prompt(question, old_history)
+            new_prompt = make_student_prompt(question, window.render())
+            print(f"{turn:<12}{window.count_tokens(old_prompt):>22}{window.count_tokens(new_prompt):>25}")
+
+
+def run_deadline_benchmark():
+    """
+    Worst wait per turn with a model that is sometimes very slow:
+    waiting for every answer vs a latency budget with pattern fallbacks
+    """
+    import ai_chatbot
+    from latency_budget import LatencyBudget
+    from response_cache import ResponseCache
+
+    questions = load_testing_phrases()[:12]
+    delays = [0.05, 0.05, 0.6, 0.05, 1.2, 0.05]  # every few turns the model stalls
+    budget = 0.3
+
+    class UnevenModel(SlowFakeModel):
+        def __call__(self, prompt, **settings):
+            self.seconds = delays[self.calls % len(delays)]
+            return super().__call__(prompt, **settings)
+
+    with scratch_directory():
+        for label, seconds in [('No budget (before)', 60.0), (f'{budget}s budget', budget)]:
+            ai_chatbot.AI_RESPONSE_CACHE = ResponseCache("ai_response_cache", memory_size=0, disk_max_bytes=0)
+            ai_chatbot.AI_LATENCY_BUDGET = LatencyBudget(seconds=seconds)
+            model = UnevenModel()
+            waits = []
+            for question in questions:
+                start = time.perf_counter()
+                ai_chatbot.get_ai_response(model, question)
+                waits.append(time.perf_counter() - start)
+            stats = ai_chatbot.AI_LATENCY_BUDGET.stats()
+            ai_chatbot.AI_LATENCY_BUDGET.shutdown()
+            print(f"{label:<22}worst wait {max(waits):.2f}s  average {sum(waits) / len(waits):.2f}s  "
+                  f"deadline misses: {stats['missed']}")
+
+
+def measure_timer_jitter(seconds=4.0, interval=0.02):
+    """
+    Wakes up every `interval` seconds (like the reminder thread does) and
+    returns how late each wake-up was, in milliseconds
+    """
+    lateness = []
+    next_tick = time.perf_counter() + interval
+    end = time.perf_counter() + seconds
+    while next_tick < end:
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+        lateness.append((time.perf_counter() - next_tick) * 1000)
+        next_tick += interval
+    return sorted(lateness)
+
+
+def run_worker_pool_benchmark():
+    """
+    Reminder-timer jitter while the AI is generating: model in the same
+    process (a background thread) vs model in a worker process.
+    Set BENCHMARK_MODEL to use another (local) model.
+    """
+    from ai_chatbot import AI_MODEL_NAME
+    from process_pool import InferenceWorkerPool
+
+    try:
+        from transformers import pipeline
+    except ImportError:
+        print("⚠️ This benchmark needs transformers and torch installed")
+        return
+
+    model_name = os.environ.get("BENCHMARK_MODEL", AI_MODEL_NAME)
+    settings = {'pad_token_id': 50256, 'max_length': 200}
+    prompt = "Student: How can I study better for my exams?\nAssistant:"
+    try:
+        local_ai = pipeline("text-generation", model=model_name, tokenizer=model_name, **settings)
+    except Exception as e:
+        print(f"⚠️ Could not load {model_name}: {e}")
+        return
+    pool = InferenceWorkerPool(model_name, settings, workers=1)
+    if not pool.wait_until_ready():
+        print(f"⚠️ Worker could not load the model: {pool.last_error}")
+        return
+
+    def keep_generating(generate, stop):
+        while not stop.is_set():
+            generate(prompt, max_new_tokens=60, min_new_tokens=60)
+
+    print(f"{'While generating':<24}{'median (ms)':>13}{'p99 (ms)':>11}{'worst (ms)':>12}")
+    rows = [('Nothing (baseline)', None), ('Same process', local_ai), ('Worker process', pool)]
+    for label, generate in rows:
+        stop = threading.Event()
+        if generate is not None:
+            worker = threading.Thread(target=keep_generating, args=(generate, stop), daemon=True)
+            worker.start()
+            time.sleep(0.5)  # let the generation get going
+        lateness = measure_timer_jitter()
+        stop.set()
+        if generate is not None:
+            worker.join()
+        print(f"{label:<24}{lateness[len(lateness) // 2]:>13.2f}"
+              f"{lateness[int(len(lateness) * 0.99)]:>11.2f}{lateness[-1]:>12.2f}")
+    pool.stop()
+
+
+def time_turns(ask, questions):
+    """
+    Average milliseconds for ask(question) over all questions
+    """
+    start = time.perf_counter()
+    for question in questions:
+        ask(question)
+    return (time.perf_counter() - start) / len(questions) * 1000
+
+
+def time_first_pieces(stream, questions):
+    """
+    Average milliseconds until the first piece of each streamed answer
+    (the rest of the answer is still read, just not timed)
+    """
+    waits = []
+    for question in questions:
+        start = time.perf_counter()
+        pieces = iter(stream(question) or [])
+        next(pieces, None)
+        waits.append(time.perf_counter() - start)
+        for _ in pieces:
+            pass
+    return sum(waits) / len(waits) * 1000
+
+
+def run_stub_pipeline_benchmark():
+    """
+    The whole AI answer path - prompt, generation, answer extraction,
+    cache and fallback - with the stub backend, so no model download is
+    needed. "Around the model" is the time our own code adds.
+    """
+    import ai_chatbot
+    from generation_backends import StubBackend
+    from latency_budget import LatencyBudget
+    from response_cache import ResponseCache
+    from ultimate_chatbot import UltimateStudentBot
+
+    questions = load_testing_phrases()[:20]
+    stub = StubBackend(tokens=30, token_latency=0.002)
+    slow_stub = StubBackend(tokens=30, token_latency=0.05)
+
+    def model_only(question):
+        stub(ai_chatbot.make_student_prompt(question), **ai_chatbot.GENERATION_SETTINGS)
+    model_ms = time_turns(model_only, questions)
+
+    with scratch_directory():
+        ai_chatbot.AI_RESPONSE_CACHE = ResponseCache("ai_response_cache")
+        rows = [
+            ('Model call only', model_ms),
+            ('ai_chatbot: new question', time_turns(lambda q: ai_chatbot.get_ai_response(stub, q), questions)),
+            ('ai_chatbot: asked again', time_turns(lambda q: ai_chatbot.get_ai_response(stub, q), questions)),
+        ]
+        # Caches that never remember anything, so every turn reaches the model
+        ai_chatbot.AI_RESPONSE_CACHE = ResponseCache("no_cache", memory_size=0, disk_max_bytes=0)
+        rows.append(('ai_chatbot: first piece',
+                     time_first_pieces(lambda q: ai_chatbot.get_ai_response(stub, q, stream=True), questions)))
+
+        ai_chatbot.AI_LATENCY_BUDGET = LatencyBudget(seconds=0.1)
+        rows.append(('ai_chatbot: too slow (0.1s)',
+                     time_turns(lambda q: ai_chatbot.get_ai_response(slow_stub, q), questions[:5])))
+        budget = ai_chatbot.AI_LATENCY_BUDGET.stats()
+        ai_chatbot.AI_LATENCY_BUDGET.shutdown()
+
+        bot = UltimateStudentBot(background_warmup=False, ai_backend=stub)
+        rows.append(('ultimate: new question', time_turns(bot.get_conversational_response, questions)))
+        rows.append(('ultimate: asked again', time_turns(bot.get_conversational_response, questions)))
+        bot.response_cache = ResponseCache("no_cache", memory_size=0, disk_max_bytes=0)
+        rows.append(('ultimate: first piece', time_first_pieces(bot.stream_conversational_response, questions)))
+        bot.shutdown()
+
+    print(f"Stub model: {stub.tokens} tokens at {stub.token_latency * 1000:.0f}ms per token")
+    print(f"{'Turn':<30}{'ms per turn':>12}{'around the model':>18}")
+    for label, ms in rows:
+        extra = f"{ms - model_ms:>+18.2f}" if 'new question' in label else ""
+        print(f"{label:<30}{ms:>12.2f}{extra}")
+    print(f"\nToo-slow turns answered from patterns: {budget['missed']} of {budget['missed'] + budget['on_time']}")
+
+
+# Pairs of questions that mean the same thing, plus a few that don't
+PARAPHRASES = [
+    ("How do I study better?", "How can I study more effectively?"),
+    ("What is photosynthesis?", "Explain photosynthesis please"),
+    ("I feel stressed about exams", "I am so stressed about my exams"),
+    ("How do I stop procrastinating?", "How can I stop procrastination?"),
+    ("Tips for time management", "How do I manage my time?"),
+    ("How do I improve my grades?", "How can I get better grades?"),
+    ("How do I study math?", "How do I study history?"),
+    ("What is mitosis?", "What is meiosis?"),
+]
+
+
+def run_semantic_cache_benchmark():
+    """
+    Model calls saved by reusing answers for reworded questions, and how
+    fast a nearest-neighbour lookup is for a small and a full cache
+    """
+    import numpy as np
+    from generation_backends import StubBackend
+    from semantic_cache import SemanticAnswerCache, embed_question
+    from ultimate_chatbot import UltimateStudentBot
+
+    for label, semantic in [('Exact-match cache only', False), ('With semantic cache', True)]:
+        with scratch_directory():
+            stub = StubBackend(tokens=30, token_latency=0.002)
+            bot = UltimateStudentBot(background_warmup=False, ai_backend=stub)
+            if not semantic:
+                bot.semantic_cache = None
+            start = time.perf_counter()
+            for first, second in PARAPHRASES:
+                bot.get_conversational_response(first)
+                bot.get_conversational_response(second)
+            seconds = time.perf_counter() - start
+            bot.shutdown()
+        print(f"{label:<26}model calls: {stub.calls:>3} of {len(PARAPHRASES) * 2}   {seconds:.2f}s")
+
+    with scratch_directory():
+        # The unrelated pairs at the end must still get their own answers
+        cache = SemanticAnswerCache("pairs_check")
+        for first, second in PARAPHRASES:
+            cache.put(first, {}, first)
+        print("\nReworded question -> reused answer?")
+        for first, second in PARAPHRASES:
+            score = float(embed_question(first) @ embed_question(second))
+            print(f"  {second:<36}{'yes' if cache.get(second, {}) == first else 'no':>5}  (similarity {score:.2f})")
+
+        print(f"\n{'Cache size':<14}{'lookup (ms)':>12}")
+        for capacity in [1_000, 10_000, 100_000]:
+            cache = SemanticAnswerCache(f"size_{capacity}", capacity=capacity)
+            cache.vectors[:] = np.random.default_rng(0).standard_normal(cache.vectors.shape, dtype=np.float32)
+            cache.last_used[:] = 1
+            cache.entries = [{'answer': 'x', 'last_used': 1}] * capacity
+            questions = [first for first, _ in PARAPHRASES]
+            lookup = time_per_call(lambda question: cache.get(question, {}), questions, repeat=5) / 1000
+            print(f"{capacity:<14}{lookup:>12.3f}")
+
+
+def write_fake_notes(folder, notes, sections=10):
+    """
+    Fills a folder with made-up markdown notes (random words from the
+    testing phrases) - enough text to make indexing take some time
+    """
+    import random
+
+    words = " ".join(load_testing_phrases()).lower().split()
+    chooser = random.Random(0)
+    os.makedirs(folder, exist_ok=True)
+    for number in range(notes):
+        with open(os.path.join(folder, f"note_{number}.md"), "w", encoding="utf-8") as f:
+            for section in range(sections):
+                f.write(f"# Topic {number}-{section} {chooser.choice(words)}\n\n")
+                f.write(" ".join(chooser.choice(words) for _ in range(80)) + "\n\n")
+
+
+def run_knowledge_base_benchmark():
+    """
+    Full vs incremental indexing of a notes folder, loading the saved
+    index, and how long a search takes
+    """
+    from knowledge_base import KnowledgeBase
+
+    repo_notes = os.path.join(os.path.dirname(os.path.abspath(__file__)), "notes")
+    questions = ["Explain binary search", "What is photosynthesis?", "How does recursion work?",
+                 "Explain big O notation", "What is the Pomodoro technique?", "Tell me about the moon"]
+
+    with scratch_directory():
+        kb = KnowledgeBase(repo_notes)
+        kb.update()
+        print("Questions about the notes in notes/:")
+        for question in questions:
+            results = kb.search(question)
+            found = results[0][1]['heading'] if results else "(not in the notes - goes to the AI)"
+            print(f"  {question:<34}{found}")
+
+        print(f"\n{'Notes':<8}{'full index (s)':>15}{'1 changed (ms)':>16}{'nothing changed (ms)':>22}"
+              f"{'load index (s)':>16}{'search (ms)':>13}")
+        for notes in [10, 100, 1000]:
+            folder = f"notes_{notes}"
+            write_fake_notes(folder, notes)
+            kb = KnowledgeBase(folder, index_folder=f"index_{notes}")
+
+            start = time.perf_counter()
+            kb.update()
+            full = time.perf_counter() - start
+
+            with open(os.path.join(folder, "note_0.md"), "a", encoding="utf-8") as f:
+                f.write("# Binary Search\n\nA new section about binary search.\n")
+            start = time.perf_counter()
+            changed = kb.update()
+            one_changed = (time.perf_counter() - start) * 1000
+            assert changed == 1
+
+            start = time.perf_counter()
+            kb.update()
+            unchanged = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            kb = KnowledgeBase(folder, index_folder=f"index_{notes}")
+            loaded = time.perf_counter() - start
+
+            # The fake notes are made of these phrases' words, so every search finds a lot
+            search = time_per_call(kb.search, load_testing_phrases()[:20], repeat=2) / 1000
+            print(f"{notes:<8}{full:>15.2f}{one_changed:>16.1f}{unchanged:>22.1f}{loaded:>16.2f}{search:>13.3f}")
+
+
+def run_router_load(router, sessions, question_words=8, questions_per_session=5):
+    """
+    `sessions` chats ask questions at the same time; returns every wait in seconds
+    """
+    waits = []
+
+    def chat(session):
+        for number in range(questions_per_session):
+            question = " ".join(["study"] * question_words) + f" {session} {number}"
+            prompt = f"Student: {question}\nAssistant:"
+            settings = {'max_length': len(prompt.split()) + 50}
+            start = time.perf_counter()
+            router(prompt, **settings)
+            waits.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=chat, args=(session,)) for session in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(waits)
+
+
+def run_model_router_benchmark():
+    """
+    One good-but-slow model vs a router that also has a tiny fast model:
+    waits and how many questions still get the good model, as more chats
+    ask at once and as questions get longer
+    """
+    from generation_backends import StubBackend
+    from model_router import ModelRouter
+
+    target = 0.8
+
+    def make_router(with_tiny):
+        router = ModelRouter(target_seconds=target)
+        # Each model answers one question at a time, like a real model on one CPU
+        router.register(StubBackend(tokens=50, token_latency=0.01, prompt_token_latency=0.002, one_at_a_time=True))
+        if with_tiny:
+            router.register(StubBackend(tokens=50, token_latency=0.001, prompt_token_latency=0.0002,
+                                        one_at_a_time=True))
+        return router
+
+    print(f"Latency target: {target}s (good model: ~0.5s per short answer, tiny model: ~0.05s)")
+    print(f"{'Load':<22}{'setup':<14}{'p50 (s)':>9}{'p90 (s)':>9}{'good model':>12}")
+    loads = [(f"{sessions} chat(s)", sessions, 8) for sessions in [1, 2, 4, 8]]
+    loads.append(("1 chat, 250 words", 1, 250))
+    for label, sessions, words in loads:
+        for setup, with_tiny in [('good only', False), ('router', True)]:
+            router = make_router(with_tiny)
+            waits = run_router_load(router, sessions, question_words=words)
+            chosen = [backend['chosen'] for backend in router.stats()['backends'].values()]
+            if sessions == 8 and with_tiny:
+                busy_router = router
+            print(f"{label:<22}{setup:<14}{waits[len(waits) // 2]:>9.2f}{waits[int(len(waits) * 0.9)]:>9.2f}"
+                  f"{chosen[0] / sum(chosen):>12.0%}")
+
+    print("\nLive histograms with 8 chats (ms per token: calls):")
+    for name, backend in busy_router.stats()['backends'].items():
+        print(f"  {name}: {backend['histogram']}")
+
+
+# Loads the model the way the bot does, in a fresh Python each time
+MODEL_LOAD_SCRIPT = """
+import sys, time
+def memory():
+    lines = dict(line.split(':') for line in open('/proc/self/status') if line.startswith(('RssAnon', 'RssFile')))
+    return [int(lines[key].split()[0]) / 1024 for key in ('RssAnon', 'RssFile')]
+sys.path.insert(0, {repo!r})
+from generation_backends import TransformersBackend
+import transformers, torch
+before = memory()
+start = time.perf_counter()
+backend = TransformersBackend({model_name!r}, pad_token_id=50256, max_length=60)
+loaded = time.perf_counter() - start
+backend('Student: How do I study better?\\nAssistant:', max_new_tokens=5)
+answered = time.perf_counter() - start
+print('RESULT', loaded, answered, *(after - first for after, first in zip(memory(), before)))
+"""
+
+
+def drop_from_page_cache(folder):
+    """
+    Asks the operating system to forget the cached contents of every file
+    in folder, so the next load has to read them from disk again ("cold")
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for path, _, files in os.walk(folder):
+        for name in files:
+            descriptor = os.open(os.path.join(path, name), os.O_RDONLY)
+            try:
+                os.fsync(descriptor)
+                os.posix_fadvise(descriptor, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(descriptor)
+    return True
+
+
+def run_model_registry_benchmark(runs=3):
+    """
+    Startup of the AI backend: looking the model up by name like before vs
+    loading it from the local registry, with a cold and a warm page cache.
+    Set BENCHMARK_MODEL to a local model folder to time that model.
+    """
+    from ai_chatbot import AI_MODEL_NAME
+    from model_registry import ModelRegistry
+
+    repo = os.path.dirname(os.path.abspath(__file__))
+    source = os.environ.get("BENCHMARK_MODEL", AI_MODEL_NAME)
+    local_source = os.path.isdir(source)
+
+    with scratch_directory() as folder:
+        os.makedirs("before")
+        start = time.perf_counter()
+        try:
+            ModelRegistry().add(AI_MODEL_NAME, source if local_source else None)
+        except Exception as e:
+            print(f"⚠️ Could not add {source} to the registry: {e}")
+            return
+        print(f"One-time registry add: {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        ModelRegistry().verify()
+        print(f"Full checksum check:   {time.perf_counter() - start:.2f}s")
+
+        print(f"\n{'Load (after imports)':<30}{'ready (s)':>10}{'+answer (s)':>13}{'anon MB':>9}{'file MB':>9}")
+        rows = [('By name (before), warm', source, "before", False),
+                ('Registry, cold', AI_MODEL_NAME, folder, True),
+                ('Registry, warm', AI_MODEL_NAME, folder, False)]
+        for label, model_name, cwd, cold in rows:
+            results = []
+            for _ in range(runs):
+                if cold and not drop_from_page_cache(os.path.join(folder, "models")):
+                    print(f"{label:<30}(needs posix_fadvise)")
+                    break
+                start = time.perf_counter()
+                result = subprocess.run([sys.executable, "-c", MODEL_LOAD_SCRIPT.format(repo=repo, model_name=model_name)],
+                                        cwd=cwd, capture_output=True, text=True)
+                lines = [line for line in result.stdout.splitlines() if line.startswith('RESULT')]
+                if not lines:
+                    print(f"{label:<30}failed after {time.perf_counter() - start:.1f}s: "
+                          f"{result.stderr.strip().splitlines()[-1][:80] if result.stderr.strip() else '?'}")
+                    break
+                results.append([float(value) for value in lines[-1].split()[1:]])
+            if len(results) == runs:
+                # The median run ignores one unlucky slow start
+                ready, answered, anon, mapped = sorted(results)[runs // 2]
+                print(f"{label:<30}{ready:>10.2f}{answered:>13.2f}{anon:>9.0f}{mapped:>9.0f}")
+    print("\n(anon MB is private memory; file MB is memory-mapped weights the OS can share and reclaim)")
+
+
+def make_student_data(records):
+    """
+    Student data with `records` saved items: half grades, half reminders
+    """
+    data = {'subjects': {}, 'reminders': [], 'goals': [], 'study_sessions': []}
+    for number in range(records // 2):
+        data['subjects'].setdefault(f"Subject {number % 100}", []).append(float(number % 10))
+    for number in range(records - records // 2):
+        data['reminders'].append({'task': f"review chapter {number}", 'time': "in 5 minutes",
+                                  'due_datetime': "2025-01-01T18:00:00", 'created': "2025-01-01 17:55",
+                                  'completed': False, 'notified': False})
+    return data
+
+
+def run_journal_benchmark(sizes=(10, 10_000, 1_000_000)):
+    """
+    Time to save one new grade: rewriting the whole student_data.json
+    (before) vs adding a line to the journal, for small and huge histories
+    """
+    import json
+    from student_journal import StudentDataJournal
+
+    print(f"{'Records':>10}{'rewrite (ms)':>14}{'journal avg (ms)':>18}{'journal p99 (ms)':>18}"
+          f"{'startup (s)':>13}{'compact (s)':>13}")
+    for records in sizes:
+        with scratch_directory():
+            data = make_student_data(records)
+            repeat = 3 if records >= 1_000_000 else 20
+
+            # The old save_student_data()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                with open("student_data.json", 'w') as f:
+                    json.dump(data, f, indent=2)
+            rewrite = (time.perf_counter() - start) / repeat
+            del data
+
+            start = time.perf_counter()
+            journal = StudentDataJournal("student_data.json")
+            journal.load()
+            startup = time.perf_counter() - start
+
+            saves = []
+            for number in range(500):
+                start = time.perf_counter()
+                journal.append(['subjects', 'Math'], float(number % 10))
+                saves.append(time.perf_counter() - start)
+            saves.sort()
+
+            start = time.perf_counter()
+            journal.close()  # folds the 500 lines into student_data.json
+            compact = time.perf_counter() - start
+
+        print(f"{records:>10,}{rewrite * 1000:>14.2f}{sum(saves) / len(saves) * 1000:>18.3f}"
+              f"{saves[int(len(saves) * 0.99)] * 1000:>18.3f}{startup:>13.2f}{compact:>13.2f}")
+    print("\n(the journal fsyncs in the background at most every 0.1s; compacting happens off the input thread)")
+
+
+def run_storage_benchmark(records=10_000, changes=200):
+    """
+    Each storage with `records` items already saved: time to save a grade,
+    to find the due reminders (what the reminder thread does every 30s)
+    and to mark one reminder as announced
+    """
+    import json
+    from datetime import datetime, timedelta
+    from student_storage import MemoryStorage, JsonFileStorage, JournalStorage, SQLiteStorage
+
+    def make_storage(kind, data):
+        if kind == 'memory':
+            return MemoryStorage(data)
+        if kind == 'sqlite':
+            storage = SQLiteStorage("student_data.db", import_json=None)
+            storage.import_data(data)
+            return storage
+        with open("student_data.json", 'w') as f:
+            json.dump(data, f)
+        return JsonFileStorage("student_data.json") if kind == 'json' else JournalStorage("student_data.json")
+
+    data = make_student_data(records)
+    start = datetime(2025, 1, 1)
+    now = start + timedelta(hours=12)
+    for number, reminder in enumerate(data['reminders']):
+        # One per minute: the first 12 hours are past (and mostly announced), the rest is future
+        reminder['due_datetime'] = (start + timedelta(minutes=number)).isoformat()
+        reminder['notified'] = number % 10 != 0
+
+    print(f"{records:,} saved items")
+    print(f"{'Storage':<12}{'save grade (ms)':>17}{'due reminders (ms)':>20}{'mark notified (ms)':>20}")
+    for kind in ['json', 'journal', 'sqlite', 'memory']:
+        with scratch_directory():
+            storage = make_storage(kind, data)
+            save = time_per_call(lambda number: storage.add_grade("Math", float(number % 10)),
+                                 range(changes), repeat=1) / 1000
+            due = time_per_call(lambda _: storage.due_reminders(now), range(20), repeat=1) / 1000
+            ids = [reminder['id'] for reminder in storage.due_reminders(now)][:changes]
+            mark = time_per_call(storage.mark_notified, ids, repeat=1) / 1000
+            storage.close()
+        print(f"{kind:<12}{save:>17.3f}{due:>20.3f}{mark:>20.3f}")
+
+
+BURST_COMMANDS = ["add subject Math grade 8.5", "set reminder review notes in 30 minutes",
+                  "set goal finish chapter 4", "add subject Physics grade 7", "show my subjects"]
+
+
+def run_background_writer_benchmark(records=10_000, commands=100, gap=0.01):
+    """
+    A scripted burst (commands typed / pasted quickly, then a batch of
+    reminders firing at once) with a big student_data.json: writing after
+    every change (before) vs the coalescing background writer
+    """
+    import contextlib
+    import io
+    import json
+    from final_chatbot import AdvancedStudentBot
+    from student_storage import JsonFileStorage
+
+    print(f"{records:,} saved items, {commands} commands {gap * 1000:.0f}ms apart + 20 reminders firing")
+    print(f"{'Writer':<22}{'command avg (ms)':>18}{'worst (ms)':>12}{'writes':>8}{'writes/s':>10}")
+    for label, delay in [('Write every change', 0), ('Background, 0.5s', 0.5)]:
+        with scratch_directory():
+            data = make_student_data(records)
+            for number, reminder in enumerate(data['reminders']):
+                reminder['notified'] = number >= 20  # 20 are due and not announced yet
+            with open("student_data.json", 'w') as f:
+                json.dump(data, f)
+
+            storage = JsonFileStorage("student_data.json", write_delay=delay)
+            with contextlib.redirect_stdout(io.StringIO()):
+                bot = AdvancedStudentBot(storage=storage)
+                bot.running = False  # no reminder thread, we fire them ourselves
+                waits = []
+                start = time.perf_counter()
+                for number in range(commands):
+                    asked = time.perf_counter()
+                    bot.get_response(BURST_COMMANDS[number % len(BURST_COMMANDS)])
+                    waits.append(time.perf_counter() - asked)
+                    time.sleep(gap)
+                asked = time.perf_counter()
+                bot.check_due_reminders()
+                waits.append(time.perf_counter() - asked)
+                bot.shutdown()  # the last write happens here
+                seconds = time.perf_counter() - start
+
+            saved = JsonFileStorage("student_data.json", write_delay=0).export()
+            assert len(saved['goals']) == commands // len(BURST_COMMANDS), "lost a change!"
+        print(f"{label:<22}{sum(waits) / len(waits) * 1000:>18.2f}{max(waits) * 1000:>12.2f}"
+              f"{storage.writes:>8}{storage.writes / seconds:>10.1f}")
+
+
+# One bot process adding grades, starting together with the others at `start_at`
+CONTENTION_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {repo!r})
+from student_storage import JsonFileStorage
+if {locked!r}:
+    storage = JsonFileStorage("student_data.json", write_delay=0)
+else:
+    with open("student_data.json") as f:
+        data = json.load(f)  # the old bots: read once at startup...
+time.sleep(max(0.0, {start_at!r} - time.time()))
+for number in range({grades!r}):
+    if {locked!r}:
+        storage.add_grade("Process {worker}", float(number % 10))
+    else:
+        data['subjects'].setdefault("Process {worker}", []).append(float(number % 10))
+        with open("student_data.json", 'w') as f:
+            json.dump(data, f, indent=2)  # ...and write everything after each change
+"""
+
+
+def run_contention_benchmark(grades=100, records=1_000):
+    """
+    Several bot processes adding grades to the same student_data.json at
+    once: the old read-once / write-everything bots vs JsonFileStorage with
+    the lock file. Counts how many grades actually ended up in the file.
+    """
+    import json
+
+    repo = os.path.dirname(os.path.abspath(__file__))
+    print(f"Every process adds {grades} grades (file starts with {records:,} items)")
+    print(f"{'Setup':<24}{'processes':>10}{'saved':>8}{'lost':>7}{'grades/s':>10}")
+    for label, locked in [('Old (no lock)', False), ('Locked + reload', True)]:
+        for processes in [1, 2, 4, 8]:
+            with scratch_directory() as folder:
+                with open("student_data.json", 'w') as f:
+                    json.dump(make_student_data(records), f)
+                start_at = time.time() + 1.0  # time for every process to start up
+                workers = [subprocess.Popen([sys.executable, "-c", CONTENTION_SCRIPT.format(
+                               repo=repo, locked=locked, start_at=start_at, grades=grades, worker=worker)],
+                               cwd=folder)
+                           for worker in range(processes)]
+                for worker in workers:
+                    worker.wait()
+                seconds = time.time() - start_at
+                with open("student_data.json") as f:
+                    subjects = json.load(f)['subjects']
+            saved = sum(len(subjects.get(f"Process {worker}", [])) for worker in range(processes))
+            lost = grades * processes - saved
+            print(f"{label:<24}{processes:>10}{saved:>8}{lost:>7}{saved / seconds:>10.0f}")
+
+
+def run_profiles_benchmark(students=10_000, records=40, switches=20_000):
+    """
+    One bot process serving many students (10k files in the sharded
+    students/ tree): how long switching to another student takes and how
+    much memory the loaded profiles use, for different cache sizes. Most
+    traffic comes from a smaller group of active students, like a real
+    school; every 10th switch the student also adds a grade.
+    """
+    import contextlib
+    import io
+    import json
+    import random
+    import tracemalloc
+    from advanced_chatbot import AdvancedStudentBot
+    from student_profiles import ProfileCache, student_data_path
+
+    generator = random.Random(42)
+    active = generator.sample(range(students), students // 10)
+    # 80% of switches go to the active 10%, the rest to anyone
+    order = [f"student-{generator.choice(active) if generator.random() < 0.8 else generator.randrange(students)}"
+             for _ in range(switches)]
+
+    def serve(profiles, timings=None):
+        """
+        Plays the traffic; timings gets (seconds, was it already loaded) per switch
+        """
+        with contextlib.redirect_stdout(io.StringIO()):
+            bot = AdvancedStudentBot(profiles=profiles)
+            for number, student_id in enumerate(order):
+                loaded = student_id in profiles
+                start = time.perf_counter()
+                bot.switch_student(student_id)
+                if timings is not None:
+                    timings.append((time.perf_counter() - start, loaded))
+                if number % 10 == 0:
+                    bot.get_response("add subject Math grade 8.5")
+
+    with scratch_directory():
+        text = json.dumps(make_student_data(records))
+        start = time.perf_counter()
+        for number in range(students):
+            path = student_data_path(f"student-{number}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(text)
+        print(f"{students:,} students with {records} items each ({len(text) / 1000:.1f} KB per file), "
+              f"written in {time.perf_counter() - start:.1f}s; {switches:,} switches")
+
+        print(f"{'Cache size':<12}{'hit rate':>10}{'avg (µs)':>10}{'p99 (µs)':>10}{'hit avg (µs)':>14}{'miss avg (µs)':>15}"
+              f"{'memory (MB)':>13}{'threads':>9}")
+        for capacity in [1, 64, 256, 1024, students]:
+            profiles = ProfileCache(capacity=capacity)
+            timings = []
+            serve(profiles, timings)
+            threads = threading.active_count()
+            profiles.close()
+
+            # Same traffic again with tracemalloc on (it slows everything down)
+            tracemalloc.start()
+            profiles = ProfileCache(capacity=capacity)
+            serve(profiles)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            profiles.close()
+
+            ordered = sorted(seconds for seconds, _ in timings)
+            hits = [seconds for seconds, loaded in timings if loaded]
+            misses = [seconds for seconds, loaded in timings if not loaded]
+            print(f"{capacity:<12,}{1 - len(misses) / len(timings):>10.0%}{sum(ordered) / len(ordered) * 1e6:>10.1f}"
+                  f"{ordered[int(len(ordered) * 0.99)] * 1e6:>10.1f}{sum(hits) / max(len(hits), 1) * 1e6:>14.1f}{sum(misses) / max(len(misses), 1) * 1e6:>15.1f}"
+                  f"{memory / 1e6:>13.1f}{threads:>9}")
+
+
+# All benchmarks by name (new ones get added here)
+BENCHMARKS = {
+    'router': run_router_benchmark,
+    'keywords': run_keyword_benchmark,
+    'faq': run_faq_benchmark,
+    'semantic': run_semantic_benchmark,
+    'stress': run_stress_benchmark,
+    'startup': run_startup_benchmark,
+    'response_cache': run_response_cache_benchmark,
+    'batching': run_batching_benchmark,
+    'quantization': run_quantization_benchmark,
+    'prefix_cache': run_prefix_cache_benchmark,
+    'conversation_window': run_conversation_window_benchmark,
+    'deadline': run_deadline_benchmark,
+    'worker_pool': run_worker_pool_benchmark,
+    'stub_pipeline': run_stub_pipeline_benchmark,
+    'semantic_cache': run_semantic_cache_benchmark,
+    'knowledge_base': run_knowledge_base_benchmark,
+    'model_router': run_model_router_benchmark,
+    'model_registry': run_model_registry_benchmark,
+    'journal': run_journal_benchmark,
+    'storage': run_storage_benchmark,
+    'background_writer': run_background_writer_benchmark,
+    'contention': run_contention_benchmark,
+    'profiles': run_profiles_benchmark,
+}
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        print(f"\n⚡ Benchmark: {name}")
+        print("=" * 60)
+        BENCHMARKS[name]()
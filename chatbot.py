@@ -1,6 +1,9 @@
 # Student Helper Chatbot - Milestone 1: Simple FAQ Bot
 # This is our main chatbot file where all the magic happens!
 
+import re
+from difflib import SequenceMatcher
+
 def greet_student():
     """
     This function shows a welcome message to the student.
@@ -15,50 +18,155 @@ def greet_student():
     print("- Type 'quit' to exit")
     print("-" * 50)
 
+# Each answer is stored ONCE here, with a short ID
+FAQ_ANSWERS = {
+    'gpa': "GPA stands for Grade Point Average. It's a number that shows your overall academic performance, usually on a scale of 0-4 or 0-10 depending on your school system.",
+    'cgpa': "CGPA stands for Cumulative Grade Point Average. It's your overall academic performance across all semesters or terms.",
+    'cgpa_calculation': "CGPA (Cumulative Grade Point Average) is calculated by adding all your grade points and dividing by the number of subjects. For example: (8+9+7+8)/4 = 8.0 CGPA",
+    'study_tips': "Here are some great study tips: 1) Create a study schedule 2) Take regular breaks 3) Find a quiet study space 4) Use active learning techniques 5) Get enough sleep!",
+    'time_management': "Time management tips: 1) Use a planner or calendar 2) Prioritize important tasks 3) Break big tasks into smaller ones 4) Avoid procrastination 5) Set realistic goals",
+    'attendance': "Attendance is the percentage of classes you attend. Most schools require at least 75% attendance to be eligible for exams.",
+}
+
+# All the different ways to ask - each one points to an answer ID
+FAQ_ALIASES = {
+    # GPA Questions
+    "what is gpa": 'gpa',
+    "explain gpa": 'gpa',
+    "gpa meaning": 'gpa',
+    
+    # CGPA Questions
+    "what is cgpa": 'cgpa',
+    "explain cgpa": 'cgpa',
+    "cgpa meaning": 'cgpa',
+    "how to calculate cgpa": 'cgpa_calculation',
+    "cgpa calculation": 'cgpa_calculation',
+    
+    # Study Tips Questions
+    "what are study tips": 'study_tips',
+    "give me study tips": 'study_tips',
+    "study tips": 'study_tips',
+    "how to study": 'study_tips',
+    
+    # Time Management Questions
+    "how to manage time": 'time_management',
+    "time management": 'time_management',
+    "time management tips": 'time_management',
+    
+    # Attendance Questions
+    "what is attendance": 'attendance',
+    "attendance meaning": 'attendance',
+    "attendance requirements": 'attendance',
+}
+
+# Little filler words that don't change what the question is about
+FAQ_STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'what', 'whats', 'how', 'to', 'do', 'does',
+    'me', 'my', 'i', 'can', 'you', 'please', 'give', 'explain', 'meaning',
+    'of', 'about', 'tell', 'some', 'for',
+}
+
+def normalize_question(text):
+    """
+    Turns 'Whats GPA?' into 'gpa' - lowercase, no punctuation, no filler words
+    """
+    words = re.sub(r"[^a-z0-9\s]", "", text.lower()).split()
+    kept = [word for word in words if word not in FAQ_STOPWORDS]
+    # If the question was ONLY filler words, keep it as it was
+    return " ".join(kept or words)
+
+def letter_trigrams(text):
+    """
+    Splits text into overlapping 3-letter pieces: 'gpa' -> {' gp', 'gpa', 'pa '}
+    Similar words share most of their pieces, even with a typo.
+    """
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class FaqIndex:
+    """
+    Built once when the program starts.
+    - Exact lookups are a single dictionary check
+    - Typos fall back to a trigram search that only compares a few candidates
+    - Short words (exact_word_length letters or fewer) must be spelled
+      exactly: 'cpa' is only one letter away from 'cgpa', but it isn't a typo
+    """
+
+    def __init__(self, answers, aliases, max_candidates=5, min_similarity=0.75, max_question_length=200,
+                 exact_word_length=3):
+        self.answers = answers
+        self.max_question_length = max_question_length
+        self.max_candidates = max_candidates
+        self.min_similarity = min_similarity
+        self.exact_word_length = exact_word_length
+
+        # question (as written AND normalized) -> answer ID
+        self.exact = {}
+        self.normalized = {}
+        for alias, answer_id in aliases.items():
+            self.exact[alias] = answer_id
+            self.normalized[normalize_question(alias)] = answer_id
+        self.exact.update(self.normalized)
+
+        # trigram -> normalized questions that contain it
+        self.trigram_index = {}
+        for key in self.normalized:
+            for trigram in letter_trigrams(key):
+                self.trigram_index.setdefault(trigram, set()).add(key)
+
+    def find_answer_id(self, question):
+        """
+        Returns the answer ID for a question, or None if we don't know it
+        """
+        # No FAQ question is long - don't waste time on pasted essays
+        question = question.lower().strip()[:self.max_question_length]
+        if question in self.exact:
+            return self.exact[question]
+
+        normalized = normalize_question(question)
+        if normalized in self.exact:
+            return self.exact[normalized]
+
+        # Fuzzy search: count shared trigrams, then check only the best few
+        shared = {}
+        for trigram in letter_trigrams(normalized):
+            for key in self.trigram_index.get(trigram, ()):
+                shared[key] = shared.get(key, 0) + 1
+
+        candidates = sorted(shared, key=shared.get, reverse=True)[:self.max_candidates]
+        short_words = [word for word in normalized.split() if len(word) <= self.exact_word_length]
+        best_key, best_score = None, 0
+        for key in candidates:
+            if any(word not in key.split() for word in short_words):
+                continue
+            score = SequenceMatcher(None, normalized, key).ratio()
+            if score > best_score:
+                best_key, best_score = key, score
+
+        if best_score >= self.min_similarity:
+            return self.normalized[best_key]
+        return None
+
+    def lookup(self, question):
+        """
+        Returns the answer text for a question, or None
+        """
+        answer_id = self.find_answer_id(question)
+        return self.answers[answer_id] if answer_id else None
+
+# Build the index ONE time, not on every question
+FAQ_INDEX = FaqIndex(FAQ_ANSWERS, FAQ_ALIASES)
+
 def get_faq_response(user_question):
     """
     This function takes a student's question and returns an answer.
-    It uses a dictionary (like a phone book) to match questions with answers.
+    It looks the question up in our FAQ index (built once at startup), so
+    small differences like "whats gpa?" or a typo still find the answer.
     """
     
-    # Convert the question to lowercase so "GPA" and "gpa" both work
-    question = user_question.lower().strip()
-    
-    # This is our FAQ database - a dictionary that stores question-answer pairs
-    # Now with multiple ways to ask the same question!
-    faq_database = {
-        # GPA Questions
-        "what is gpa": "GPA stands for Grade Point Average. It's a number that shows your overall academic performance, usually on a scale of 0-4 or 0-10 depending on your school system.",
-        "explain gpa": "GPA stands for Grade Point Average. It's a number that shows your overall academic performance, usually on a scale of 0-4 or 0-10 depending on your school system.",
-        "gpa meaning": "GPA stands for Grade Point Average. It's a number that shows your overall academic performance, usually on a scale of 0-4 or 0-10 depending on your school system.",
-        
-        # CGPA Questions  
-        "what is cgpa": "CGPA stands for Cumulative Grade Point Average. It's your overall academic performance across all semesters or terms.",
-        "explain cgpa": "CGPA stands for Cumulative Grade Point Average. It's your overall academic performance across all semesters or terms.",
-        "cgpa meaning": "CGPA stands for Cumulative Grade Point Average. It's your overall academic performance across all semesters or terms.",
-        "how to calculate cgpa": "CGPA (Cumulative Grade Point Average) is calculated by adding all your grade points and dividing by the number of subjects. For example: (8+9+7+8)/4 = 8.0 CGPA",
-        "cgpa calculation": "CGPA (Cumulative Grade Point Average) is calculated by adding all your grade points and dividing by the number of subjects. For example: (8+9+7+8)/4 = 8.0 CGPA",
-        
-        # Study Tips Questions
-        "what are study tips": "Here are some great study tips: 1) Create a study schedule 2) Take regular breaks 3) Find a quiet study space 4) Use active learning techniques 5) Get enough sleep!",
-        "give me study tips": "Here are some great study tips: 1) Create a study schedule 2) Take regular breaks 3) Find a quiet study space 4) Use active learning techniques 5) Get enough sleep!",
-        "study tips": "Here are some great study tips: 1) Create a study schedule 2) Take regular breaks 3) Find a quiet study space 4) Use active learning techniques 5) Get enough sleep!",
-        "how to study": "Here are some great study tips: 1) Create a study schedule 2) Take regular breaks 3) Find a quiet study space 4) Use active learning techniques 5) Get enough sleep!",
-        
-        # Time Management Questions
-        "how to manage time": "Time management tips: 1) Use a planner or calendar 2) Prioritize important tasks 3) Break big tasks into smaller ones 4) Avoid procrastination 5) Set realistic goals",
-        "time management": "Time management tips: 1) Use a planner or calendar 2) Prioritize important tasks 3) Break big tasks into smaller ones 4) Avoid procrastination 5) Set realistic goals",
-        "time management tips": "Time management tips: 1) Use a planner or calendar 2) Prioritize important tasks 3) Break big tasks into smaller ones 4) Avoid procrastination 5) Set realistic goals",
-        
-        # Attendance Questions
-        "what is attendance": "Attendance is the percentage of classes you attend. Most schools require at least 75% attendance to be eligible for exams.",
-        "attendance meaning": "Attendance is the percentage of classes you attend. Most schools require at least 75% attendance to be eligible for exams.",
-        "attendance requirements": "Attendance is the percentage of classes you attend. Most schools require at least 75% attendance to be eligible for exams."
-    }
-    
-    # Check if the question exists in our database
-    if question in faq_database:
-        return faq_database[question]
+    answer = FAQ_INDEX.lookup(user_question)
+    if answer:
+        return answer
     else:
         return """I'm sorry, I don't know the answer to that question yet. I'm still learning! 
         
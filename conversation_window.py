@@ -0,0 +1,97 @@
+# Student Helper Chatbot - Sliding Conversation Window
+# The AI should remember what we just talked about, but a prompt that keeps
+# growing gets slower with every message (and the model can only read so
+# much). This window keeps only the most recent turns that fit in a fixed
+# number of tokens, and squeezes older turns into a one-line summary.
+
+import re
+from collections import deque
+
+# Words that don't tell us what a message was about
+SUMMARY_STOPWORDS = {
+    'a', 'an', 'the', 'i', 'im', "i'm", 'me', 'my', 'to', 'is', 'are', 'am', 'can',
+    'do', 'does', 'you', 'your', 'some', 'of', 'for', 'with', 'and', 'it', 'be',
+    'how', 'what', 'why', 'when', 'should', 'please', 'give', 'help', 'tell',
+    'about', 'on', 'in', 'at', 'get', 'need', 'want', 'could', 'would', 'this',
+    'that', 'there', 'any', 'so', 'really', 'very', 'just', 'have', 'has',
+}
+
+
+class ConversationWindow:
+    """
+    Ring buffer of recent (student, assistant) turns with a token budget.
+
+    Tokens are counted with the model's own tokenizer (exact), or by words
+    if there is no tokenizer. Each turn is counted once when it is added,
+    so building the context is cheap.
+
+    render() returns text like:
+        Earlier topics: photosynthesis, cgpa
+        Student Question: ...
+        Answer: ...
+    """
+
+    def __init__(self, tokenizer=None, max_tokens=80, max_turns=8, summary_topics=6,
+                 student_label="Student Question:", assistant_label="Answer:"):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.summary_topics = summary_topics
+        self.student_label = student_label
+        self.assistant_label = assistant_label
+
+        # (turn text, token count) - the oldest turn falls out automatically
+        self.turns = deque(maxlen=max_turns)
+        self.topics = deque(maxlen=summary_topics)  # topics of dropped turns
+        self.total_tokens = 0
+        self.summary = ""
+        self.summary_tokens = 0
+
+    def count_tokens(self, text):
+        if self.tokenizer is None:
+            return len(text.split())
+        return len(self.tokenizer(text)["input_ids"])
+
+    def add_turn(self, student_text, assistant_text):
+        """
+        Remembers one question and answer, forgetting old turns if needed
+        """
+        if len(self.turns) == self.turns.maxlen:
+            self._forget_oldest()
+
+        text = f"{self.student_label} {student_text}\n{self.assistant_label} {assistant_text}\n"
+        tokens = self.count_tokens(text)
+        self.turns.append((text, tokens))
+        self.total_tokens += tokens
+
+        # Drop the oldest turns until everything (summary included) fits
+        while self.turns and self.total_tokens + self.summary_tokens > self.max_tokens:
+            self._forget_oldest()
+
+    def _forget_oldest(self):
+        """
+        Drops the oldest turn but keeps a few topic words from its question
+        """
+        text, tokens = self.turns.popleft()
+        self.total_tokens -= tokens
+
+        question = text.split('\n', 1)[0][len(self.student_label):]
+        for word in re.findall(r"[a-z][a-z']+", question.lower()):
+            if word not in SUMMARY_STOPWORDS and word not in self.topics:
+                self.topics.append(word)
+        self.summary = "Earlier topics: " + ", ".join(self.topics) + "\n" if self.topics else ""
+        self.summary_tokens = self.count_tokens(self.summary) if self.summary else 0
+
+    def render(self):
+        """
+        The summary line plus the newest turns - never more than max_tokens
+        """
+        if self.summary_tokens + self.total_tokens > self.max_tokens:
+            return "".join(text for text, _ in self.turns)  # summary alone is too big
+        return self.summary + "".join(text for text, _ in self.turns)
+
+    def clear(self):
+        self.turns.clear()
+        self.topics.clear()
+        self.total_tokens = 0
+        self.summary = ""
+        self.summary_tokens = 0
@@ -2,13 +2,18 @@
 # This version adds natural conversation without heavy AI libraries!
 
 import re
+import sys
 import random
-import json
-import os
 from datetime import datetime, timedelta
 import threading
 import time
 
+from intent_router import IntentRouter, MAX_INPUT_LENGTH
+from student_storage import JsonFileStorage
+from student_profiles import ProfileCache
+from keyword_engine import KeywordAutomaton
+from knowledge_base import KnowledgeBase
+
 def greet_student():
     """
     Welcome message for our conversational chatbot
@@ -32,9 +37,21 @@ def greet_student():
     print("-" * 70)
 
 class ConversationalStudentBot:
-    def __init__(self):
+    def __init__(self, storage=None, student_id=None, profiles=None):
         self.data_file = "student_data.json"
-        self.student_data = self.load_student_data()
+        # Where grades, reminders and goals are kept (see student_storage.py).
+        # With a student_id each student has their own file instead, and
+        # `profiles` keeps the recently used ones loaded (see student_profiles.py)
+        self.profiles = profiles
+        self.student_id = None
+        self.storage = storage
+        # Only a storage the bot makes itself is closed by it - not one passed
+        # in by the caller, and not one that comes from `profiles`
+        self.own_storage = storage is None
+        if student_id is not None:
+            self.switch_student(student_id)
+        elif storage is None:
+            self.storage = JsonFileStorage(self.data_file)
         self.reminder_thread = None
         self.running = True
         self.conversation_context = []
@@ -55,6 +72,18 @@ class ConversationalStudentBot:
             'cgpa_calculation': [r'.*calculate.*cgpa.*', r'.*cgpa.*calculation.*', r'.*find.*cgpa.*']
         }
         
+        # Very long messages (like a pasted transcript) are cut to this size
+        self.max_input_length = MAX_INPUT_LENGTH
+        
+        # Prepare the command table once into a single fast matcher.
+        # The last rule catches grade calculations like 'grades 8 9 7'.
+        self.command_router = IntentRouter(
+            list(self.command_patterns.items()) +
+            [('cgpa_calculation', [r'calculate.*\d+', r'grades.*\d+'])],
+            default=None,
+            max_input_length=self.max_input_length
+        )
+        
         # Conversational response patterns - this is the magic!
         self.conversation_patterns = {
             'struggling': {
@@ -123,6 +152,21 @@ class ConversationalStudentBot:
             }
         }
         
+        self.greetings = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening']
+        self.thanks = ['thank', 'thanks', 'appreciate', 'helpful']
+        
+        # Build the keyword machine once: categories first (in dict order),
+        # then greetings, then thanks - the same priority as before
+        self.keyword_engine = KeywordAutomaton(
+            [(name, data['keywords']) for name, data in self.conversation_patterns.items()] +
+            [('greeting', self.greetings), ('thanks', self.thanks)]
+        )
+        
+        # Answers "explain X" questions from the markdown notes in notes/
+        # (only new or changed notes are read again)
+        self.knowledge_base = KnowledgeBase("notes")
+        self.knowledge_base.update()
+        
         # Start reminder monitoring
         self.start_reminder_monitoring()
     
@@ -132,29 +176,28 @@ class ConversationalStudentBot:
         """
         user_lower = user_input.lower()
         
-        # Check each conversation pattern
-        for pattern_name, pattern_data in self.conversation_patterns.items():
-            # Check if any keywords match
-            if any(keyword in user_lower for keyword in pattern_data['keywords']):
-                # Get a random response from this category
-                response = random.choice(pattern_data['responses'])
-                
-                # Add some personalization based on their data
-                if pattern_name == 'improvement' and self.student_data.get('subjects'):
-                    subjects = list(self.student_data['subjects'].keys())
-                    response += f"\n\n💡 I see you're tracking: {', '.join(subjects[:3])}. Pick one to focus on improving!"
-                
-                if pattern_name == 'time_management':
-                    response += "\n\n⏰ Tip: Try 'set reminder take break in 25 minutes' for Pomodoro!"
-                
-                if pattern_name == 'stress':
-                    response += "\n\n💙 Remember: You can set study reminders to pace yourself better!"
-                
-                return response
+        # One pass over the message finds the best matching category
+        pattern_name = self.keyword_engine.first_match(user_lower)
+        
+        if pattern_name in self.conversation_patterns:
+            # Get a random response from this category
+            response = random.choice(self.conversation_patterns[pattern_name]['responses'])
+            
+            # Add some personalization based on their data
+            subjects = list(self.storage.subjects()) if pattern_name == 'improvement' else []
+            if subjects:
+                response += f"\n\n💡 I see you're tracking: {', '.join(subjects[:3])}. Pick one to focus on improving!"
+            
+            if pattern_name == 'time_management':
+                response += "\n\n⏰ Tip: Try 'set reminder take break in 25 minutes' for Pomodoro!"
+            
+            if pattern_name == 'stress':
+                response += "\n\n💙 Remember: You can set study reminders to pace yourself better!"
+            
+            return response
         
         # Check for greeting patterns
-        greetings = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening']
-        if any(greeting in user_lower for greeting in greetings):
+        if pattern_name == 'greeting':
             return random.choice([
                 "Hello! 👋 I'm here to help with your studies! What's on your mind today?",
                 "Hi there! 😊 Ready to tackle some academic challenges together?",
@@ -163,8 +206,7 @@ class ConversationalStudentBot:
             ])
         
         # Check for gratitude
-        thanks = ['thank', 'thanks', 'appreciate', 'helpful']
-        if any(thank in user_lower for thank in thanks):
+        if pattern_name == 'thanks':
             return random.choice([
                 "You're very welcome! 😊 That's what I'm here for! Any other questions?",
                 "Happy to help! 🌟 Keep up the great work with your studies!",
@@ -181,15 +223,10 @@ class ConversationalStudentBot:
         """
         user_input = user_input.lower().strip()
         
-        # Check for command patterns
-        for intent, patterns in self.command_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, user_input):
-                    return True, intent
-        
-        # Check for grade calculations
-        if re.search(r'calculate.*\d+', user_input) or re.search(r'grades.*\d+', user_input):
-            return True, 'cgpa_calculation'
+        # One scan over the command patterns + grade calculation rules
+        intent = self.command_router.match(user_input)
+        if intent:
+            return True, intent
         
         return False, None
     
@@ -210,31 +247,22 @@ class ConversationalStudentBot:
         """
         Check if any reminders are due and notify
         """
-        if not self.student_data.get('reminders'):
-            return
-        
         current_time = datetime.now()
-        
-        for reminder in self.student_data['reminders']:
-            if not reminder.get('completed', False) and not reminder.get('notified', False):
-                reminder_time = reminder.get('due_datetime')
-                if reminder_time:
-                    try:
-                        reminder_dt = datetime.fromisoformat(reminder_time)
-                        if current_time >= reminder_dt:
-                            # Show notification
-                            print(f"\n\n🔔 REMINDER ALERT! 🔔")
-                            print(f"⏰ Time: {reminder['time']}")
-                            print(f"📝 Task: {reminder['task']}")
-                            print(f"💡 Don't forget to {reminder['task']}!")
-                            print("="*40)
-                            print("💬 Chat with me: ", end="", flush=True)
-                            
-                            # Mark as notified
-                            reminder['notified'] = True
-                            self.save_student_data()
-                    except:
-                        pass
+        # The same storage for the whole check, even if the student changes meanwhile
+        storage = self.storage
+        
+        # Only reminders that are due and not announced yet
+        for reminder in storage.due_reminders(current_time):
+            # Show notification
+            print(f"\n\n🔔 REMINDER ALERT! 🔔")
+            print(f"⏰ Time: {reminder['time']}")
+            print(f"📝 Task: {reminder['task']}")
+            print(f"💡 Don't forget to {reminder['task']}!")
+            print("="*40)
+            print("💬 Chat with me: ", end="", flush=True)
+            
+            # Mark as notified
+            storage.mark_notified(reminder['id'])
     
     def parse_reminder_time(self, time_str):
         """
@@ -286,36 +314,6 @@ class ConversationalStudentBot:
         due_time = current_time + timedelta(minutes=5)
         return due_time, "in 5 minutes (default)"
     
-    def load_student_data(self):
-        """
-        Load student data from file if it exists
-        """
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-            except:
-                pass
-        
-        # Default structure
-        return {
-            'subjects': {},
-            'reminders': [],
-            'goals': [],
-            'study_sessions': []
-        }
-    
-    def save_student_data(self):
-        """
-        Save student data to file
-        """
-        try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.student_data, f, indent=2)
-            return True
-        except:
-            return False
-    
     def add_subject_grade(self, text):
         """
         Extract subject and grade from text
@@ -327,13 +325,9 @@ class ConversationalStudentBot:
             subject = match.group(1).strip().title()
             grade = float(match.group(2))
             
-            if subject not in self.student_data['subjects']:
-                self.student_data['subjects'][subject] = []
-            
-            self.student_data['subjects'][subject].append(grade)
-            self.save_student_data()
+            grades = self.storage.add_grade(subject, grade)
             
-            avg = sum(self.student_data['subjects'][subject]) / len(self.student_data['subjects'][subject])
+            avg = sum(grades) / len(grades)
             
             return f"✅ Added {subject}: {grade}\n📊 Current average in {subject}: {avg:.2f}\n💾 Data saved!"
         
@@ -343,7 +337,8 @@ class ConversationalStudentBot:
         """
         Show all subjects and their progress
         """
-        if not self.student_data['subjects']:
+        subjects = self.storage.subjects()
+        if not subjects:
             return "📚 No subjects added yet! Try: 'add subject Math grade 8.5'"
         
         result = "📊 Your Academic Progress:\n" + "="*40 + "\n"
@@ -351,7 +346,7 @@ class ConversationalStudentBot:
         total_points = 0
         total_subjects = 0
         
-        for subject, grades in self.student_data['subjects'].items():
+        for subject, grades in subjects.items():
             avg = sum(grades) / len(grades)
             total_points += avg
             total_subjects += 1
@@ -396,8 +391,7 @@ class ConversationalStudentBot:
                 'notified': False
             }
             
-            self.student_data['reminders'].append(reminder)
-            self.save_student_data()
+            self.storage.add_reminder(reminder)
             
             return f"⏰ Reminder set!\n📝 Task: {task}\n🕐 Time: {formatted_time}\n⚡ I'll notify you automatically when it's time!\n💾 Reminder saved!"
         
@@ -407,12 +401,13 @@ class ConversationalStudentBot:
         """
         Show all reminders with better formatting
         """
-        if not self.student_data['reminders']:
+        reminders = self.storage.reminders()
+        if not reminders:
             return "⏰ No reminders set! Try: 'set reminder study Math in 5 minutes'"
         
         result = "⏰ Your Study Reminders:\n" + "="*30 + "\n"
         
-        for i, reminder in enumerate(self.student_data['reminders'], 1):
+        for i, reminder in enumerate(reminders, 1):
             if reminder['completed']:
                 status = "✅ Completed"
             elif reminder.get('notified', False):
@@ -441,8 +436,7 @@ class ConversationalStudentBot:
                 'target': 100
             }
             
-            self.student_data['goals'].append(goal)
-            self.save_student_data()
+            self.storage.add_goal(goal)
             
             return f"🎯 Goal set: {goal_text}\n📈 Track your progress with 'show goals'\n💪 You've got this!"
         
@@ -452,12 +446,13 @@ class ConversationalStudentBot:
         """
         Show all goals
         """
-        if not self.student_data['goals']:
+        goals = self.storage.goals()
+        if not goals:
             return "🎯 No goals set! Try: 'set goal study 2 hours daily'"
         
         result = "🎯 Your Study Goals:\n" + "="*25 + "\n"
         
-        for i, goal in enumerate(self.student_data['goals'], 1):
+        for i, goal in enumerate(goals, 1):
             result += f"\n{i}. 📋 {goal['goal']}\n"
             result += f"   📅 Created: {goal['created']}\n"
             result += f"   📈 Progress: {goal['progress']}%\n"
@@ -495,6 +490,10 @@ class ConversationalStudentBot:
 📊 CALCULATIONS:
 • 'calculate cgpa with grades X, Y, Z' - Calculate CGPA
 
+📖 YOUR NOTES:
+• "Explain binary search" - Answered from the markdown notes in 'notes/'
+• Add your own .md notes there - new and changed notes are picked up at start
+
 💾 DATA:
 Your data is automatically saved in 'student_data.json'
 
@@ -514,6 +513,9 @@ Reminders will automatically notify you when due!
         """
         Main response handler - chooses between structured commands and conversational AI
         """
+        # Only look at the first part of very long messages
+        user_input = user_input[:self.max_input_length]
+        
         # Check if it's a structured command
         is_command, intent = self.is_structured_command(user_input)
         
@@ -541,21 +543,46 @@ Reminders will automatically notify you when due!
                 else:
                     return "🧮 CGPA Calculator ready! Format: 'calculate cgpa with grades 8, 9, 7, 8'"
         
+        # Explanations from the student's notes come first
+        notes_response = self.knowledge_base.answer(user_input)
+        if notes_response:
+            return notes_response
+        
         # Use conversational responses for natural questions
         return self.get_conversational_response(user_input)
     
+    def switch_student(self, student_id):
+        """
+        Carries on with another student's grades, reminders and goals
+        """
+        if self.profiles is None:
+            self.profiles = ProfileCache()
+        if self.own_storage and self.storage is not None:
+            # The bot's first storage isn't kept by `profiles`, so nobody
+            # else would ever save and close it
+            self.storage.close()
+        self.storage = self.profiles.get(student_id)
+        self.own_storage = False
+        self.student_id = student_id
+        self.data_file = self.profiles.path(student_id)
+        self.conversation_context = []
+    
     def shutdown(self):
         """
         Properly shutdown the bot
         """
         self.running = False
+        if self.profiles is not None:
+            self.profiles.close()  # closes the current storage too, if it came from there
+        if self.own_storage:
+            self.storage.close()
 
-def main_conversational_chat():
+def main_conversational_chat(student_id=None):
     """
     Main chat loop for the conversational student chatbot
     """
     greet_student()
-    bot = ConversationalStudentBot()
+    bot = ConversationalStudentBot(student_id=student_id)
     
     print("✅ CONVERSATIONAL mode activated! Natural chat + structured commands!")
     print("💡 Try saying: 'I'm struggling with time management, can you help?'")
@@ -581,4 +608,5 @@ def main_conversational_chat():
 # Start the conversational chatbot
 if __name__ == "__main__":
     print("🚀 Starting CONVERSATIONAL Student Helper...")
-    main_conversational_chat()
+    # python conversational_chatbot.py [student ID]
+    main_conversational_chat(sys.argv[1] if len(sys.argv) > 1 else None)
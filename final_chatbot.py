@@ -2,13 +2,16 @@
 # This version includes WORKING real-time reminder notifications!
 
 import re
+import sys
 import random
-import json
-import os
 from datetime import datetime, timedelta
 import threading
 import time
 
+from intent_router import IntentRouter, MAX_INPUT_LENGTH
+from student_storage import JsonFileStorage
+from student_profiles import ProfileCache
+
 def greet_student():
     """
     Welcome message for our advanced chatbot with working reminders
@@ -30,9 +33,21 @@ def greet_student():
     print("-" * 70)
 
 class AdvancedStudentBot:
-    def __init__(self):
+    def __init__(self, storage=None, student_id=None, profiles=None):
         self.data_file = "student_data.json"
-        self.student_data = self.load_student_data()
+        # Where grades, reminders and goals are kept (see student_storage.py).
+        # With a student_id each student has their own file instead, and
+        # `profiles` keeps the recently used ones loaded (see student_profiles.py)
+        self.profiles = profiles
+        self.student_id = None
+        self.storage = storage
+        # Only a storage the bot makes itself is closed by it - not one passed
+        # in by the caller, and not one that comes from `profiles`
+        self.own_storage = storage is None
+        if student_id is not None:
+            self.switch_student(student_id)
+        elif storage is None:
+            self.storage = JsonFileStorage(self.data_file)
         self.reminder_thread = None
         self.running = True
         
@@ -59,6 +74,12 @@ class AdvancedStudentBot:
             'set_goal': [r'.*set.*goal.*', r'.*^goal.*', r'.*target.*']
         }
         
+        # Very long messages (like a pasted transcript) are cut to this size
+        self.max_input_length = MAX_INPUT_LENGTH
+        
+        # Prepare the whole pattern table once into a single fast matcher
+        self.router = IntentRouter(self.patterns, max_input_length=self.max_input_length)
+        
         self.responses = {
             'gpa_question': [
                 "GPA stands for Grade Point Average! 📊 It's your academic performance in numbers. I can help you track your GPA by subject too! Try 'add subject Math grade 8.5'"
@@ -88,31 +109,22 @@ class AdvancedStudentBot:
         """
         Check if any reminders are due and notify
         """
-        if not self.student_data.get('reminders'):
-            return
-        
         current_time = datetime.now()
-        
-        for reminder in self.student_data['reminders']:
-            if not reminder.get('completed', False) and not reminder.get('notified', False):
-                reminder_time = reminder.get('due_datetime')
-                if reminder_time:
-                    try:
-                        reminder_dt = datetime.fromisoformat(reminder_time)
-                        if current_time >= reminder_dt:
-                            # Show notification
-                            print(f"\n\n🔔 REMINDER ALERT! 🔔")
-                            print(f"⏰ Time: {reminder['time']}")
-                            print(f"📝 Task: {reminder['task']}")
-                            print(f"💡 Don't forget to {reminder['task']}!")
-                            print("="*40)
-                            print("💬 Command or question: ", end="", flush=True)
-                            
-                            # Mark as notified
-                            reminder['notified'] = True
-                            self.save_student_data()
-                    except:
-                        pass
+        # The same storage for the whole check, even if the student changes meanwhile
+        storage = self.storage
+        
+        # Only reminders that are due and not announced yet
+        for reminder in storage.due_reminders(current_time):
+            # Show notification
+            print(f"\n\n🔔 REMINDER ALERT! 🔔")
+            print(f"⏰ Time: {reminder['time']}")
+            print(f"📝 Task: {reminder['task']}")
+            print(f"💡 Don't forget to {reminder['task']}!")
+            print("="*40)
+            print("💬 Command or question: ", end="", flush=True)
+            
+            # Mark as notified
+            storage.mark_notified(reminder['id'])
     
     def parse_reminder_time(self, time_str):
         """
@@ -164,36 +176,6 @@ class AdvancedStudentBot:
         due_time = current_time + timedelta(minutes=5)
         return due_time, "in 5 minutes (default)"
     
-    def load_student_data(self):
-        """
-        Load student data from file if it exists
-        """
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-            except:
-                pass
-        
-        # Default structure
-        return {
-            'subjects': {},  # {'Math': [8.5, 9.0], 'Physics': [7.5]}
-            'reminders': [],  # [{'task': 'study Math', 'time': '2024-01-01 18:00', 'completed': False}]
-            'goals': [],     # [{'goal': 'study 2 hours daily', 'target': 2, 'progress': 0}]
-            'study_sessions': []  # Track study time
-        }
-    
-    def save_student_data(self):
-        """
-        Save student data to file
-        """
-        try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.student_data, f, indent=2)
-            return True
-        except:
-            return False
-    
     def add_subject_grade(self, text):
         """
         Extract subject and grade from text like 'add subject Math grade 8.5'
@@ -206,14 +188,10 @@ class AdvancedStudentBot:
             subject = match.group(1).strip().title()
             grade = float(match.group(2))
             
-            if subject not in self.student_data['subjects']:
-                self.student_data['subjects'][subject] = []
-            
-            self.student_data['subjects'][subject].append(grade)
-            self.save_student_data()
+            grades = self.storage.add_grade(subject, grade)
             
             # Calculate current average for this subject
-            avg = sum(self.student_data['subjects'][subject]) / len(self.student_data['subjects'][subject])
+            avg = sum(grades) / len(grades)
             
             return f"✅ Added {subject}: {grade}\n📊 Current average in {subject}: {avg:.2f}\n💾 Data saved!"
         
@@ -223,7 +201,8 @@ class AdvancedStudentBot:
         """
         Show all subjects and their progress
         """
-        if not self.student_data['subjects']:
+        subjects = self.storage.subjects()
+        if not subjects:
             return "📚 No subjects added yet! Try: 'add subject Math grade 8.5'"
         
         result = "📊 Your Academic Progress:\n" + "="*40 + "\n"
@@ -231,7 +210,7 @@ class AdvancedStudentBot:
         total_points = 0
         total_subjects = 0
         
-        for subject, grades in self.student_data['subjects'].items():
+        for subject, grades in subjects.items():
             avg = sum(grades) / len(grades)
             total_points += avg
             total_subjects += 1
@@ -277,8 +256,7 @@ class AdvancedStudentBot:
                 'notified': False
             }
             
-            self.student_data['reminders'].append(reminder)
-            self.save_student_data()
+            self.storage.add_reminder(reminder)
             
             return f"⏰ Reminder set!\n📝 Task: {task}\n🕐 Time: {formatted_time}\n⚡ I'll notify you automatically when it's time!\n💾 Reminder saved!"
         
@@ -288,12 +266,13 @@ class AdvancedStudentBot:
         """
         Show all reminders with better formatting
         """
-        if not self.student_data['reminders']:
+        reminders = self.storage.reminders()
+        if not reminders:
             return "⏰ No reminders set! Try: 'set reminder study Math in 5 minutes'"
         
         result = "⏰ Your Study Reminders:\n" + "="*30 + "\n"
         
-        for i, reminder in enumerate(self.student_data['reminders'], 1):
+        for i, reminder in enumerate(reminders, 1):
             if reminder['completed']:
                 status = "✅ Completed"
             elif reminder.get('notified', False):
@@ -322,8 +301,7 @@ class AdvancedStudentBot:
                 'target': 100  # Default target
             }
             
-            self.student_data['goals'].append(goal)
-            self.save_student_data()
+            self.storage.add_goal(goal)
             
             return f"🎯 Goal set: {goal_text}\n📈 Track your progress with 'show goals'\n💪 You've got this!"
         
@@ -333,12 +311,13 @@ class AdvancedStudentBot:
         """
         Show all goals
         """
-        if not self.student_data['goals']:
+        goals = self.storage.goals()
+        if not goals:
             return "🎯 No goals set! Try: 'set goal study 2 hours daily'"
         
         result = "🎯 Your Study Goals:\n" + "="*25 + "\n"
         
-        for i, goal in enumerate(self.student_data['goals'], 1):
+        for i, goal in enumerate(goals, 1):
             result += f"\n{i}. 📋 {goal['goal']}\n"
             result += f"   📅 Created: {goal['created']}\n"
             result += f"   📈 Progress: {goal['progress']}%\n"
@@ -390,17 +369,16 @@ Reminders will automatically notify you when due!"""
         """
         user_input = user_input.lower().strip()
         
-        for intent, patterns in self.patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, user_input):
-                    return intent
-        
-        return 'unknown'
+        # One scan over the precompiled table (first intent still wins)
+        return self.router.match(user_input)
     
     def get_response(self, user_input):
         """
         Enhanced response handling with new features
         """
+        # Only look at the first part of very long messages
+        user_input = user_input[:self.max_input_length]
+        
         intent = self.match_pattern(user_input)
         
         # Handle new features
@@ -442,18 +420,37 @@ Reminders will automatically notify you when due!"""
         grades = re.findall(r'\b\d+(?:\.\d+)?\b', text)
         return [float(grade) for grade in grades if 0 <= float(grade) <= 10]
     
+    def switch_student(self, student_id):
+        """
+        Carries on with another student's grades, reminders and goals
+        """
+        if self.profiles is None:
+            self.profiles = ProfileCache()
+        if self.own_storage and self.storage is not None:
+            # The bot's first storage isn't kept by `profiles`, so nobody
+            # else would ever save and close it
+            self.storage.close()
+        self.storage = self.profiles.get(student_id)
+        self.own_storage = False
+        self.student_id = student_id
+        self.data_file = self.profiles.path(student_id)
+    
     def shutdown(self):
         """
         Properly shutdown the bot
         """
         self.running = False
+        if self.profiles is not None:
+            self.profiles.close()  # closes the current storage too, if it came from there
+        if self.own_storage:
+            self.storage.close()
 
-def main_advanced_chat():
+def main_advanced_chat(student_id=None):
     """
     Main chat loop for advanced chatbot with working reminders
     """
     greet_student()
-    bot = AdvancedStudentBot()
+    bot = AdvancedStudentBot(student_id=student_id)
     
     print("✅ Advanced features loaded! Reminders will notify automatically!")
     print("💡 Try: 'set reminder test in 1 minute' to see it work!")
@@ -479,4 +476,5 @@ def main_advanced_chat():
 # Start the advanced chatbot
 if __name__ == "__main__":
     print("🚀 Starting Advanced Student Helper with WORKING Reminders...")
-    main_advanced_chat()
+    # python final_chatbot.py [student ID]
+    main_advanced_chat(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,237 @@
+# Student Helper Chatbot - Generation Backends
+# The bots used to call transformers.pipeline directly, so the AI parts
+# could only be tried on a computer with the model downloaded. Now the
+# model sits behind a small "backend" interface. TransformersBackend is the
+# real model; StubBackend is a pretend model that writes made-up (but always
+# the same) answers at a speed we choose - handy for timing everything
+# around the model without downloading anything.
+#
+# Every backend:
+#   backend(prompt, **settings)            -> [{'generated_text': prompt + answer}]
+#   backend.generate_batch(prompts, settings) -> one result like the above per prompt
+#   backend.stream(prompt, settings)       -> a TokenStream to loop over
+#   backend.tokenizer, backend.name, backend.variant, backend.prefix_cache
+
+import random
+import threading
+import time
+import zlib
+from contextlib import nullcontext
+
+from streaming import STOP_TEXTS, StopTextFilter, TokenStream
+
+
+class TransformersBackend:
+    """
+    The real AI model: a transformers text-generation pipeline, plus the
+    system prompt's KV cache (see prefix_cache.py) when a prefix is given.
+    pipeline_settings are passed on to pipeline(...), like max_length=200.
+
+    A model in the local registry (see model_registry.py) loads from disk
+    without going online; any other name is looked up on the hub as before.
+    """
+
+    def __init__(self, model_name, prefix="", quantize=False, registry=None, **pipeline_settings):
+        # Imported here (not at the top) because it is slow to import
+        from transformers import pipeline
+        from model_registry import ModelRegistry
+
+        self.name = model_name
+        self.variant = "int8" if quantize else "fp32"
+
+        registry = registry or ModelRegistry()
+        model = tokenizer = model_name
+        if registry.has(model_name):
+            tokenizer = registry.load_tokenizer(model_name)
+            if not quantize:
+                model = registry.load_model(model_name)
+        if quantize:
+            from quantization import load_quantized_model
+            source = registry.path(model_name) if registry.has(model_name) else None
+            model = load_quantized_model(model_name, source=source)
+
+        self.pipeline = pipeline("text-generation", model=model, tokenizer=tokenizer, **pipeline_settings)
+        self.model = self.pipeline.model
+        self.tokenizer = self.pipeline.tokenizer
+
+        # Every model pads with its own token (GPT-style models have none,
+        # so they use their end-of-text token) - unless pad_token_id was given
+        self.pad_token_id = pipeline_settings.get('pad_token_id', self.tokenizer.pad_token_id)
+        if self.pad_token_id is None:
+            self.pad_token_id = self.tokenizer.eos_token_id
+        if self.model.generation_config.pad_token_id is None:
+            self.model.generation_config.pad_token_id = self.pad_token_id
+
+        # Read the fixed instructions once, so each question only costs
+        # the student's own words
+        self.prefix_cache = None
+        if prefix:
+            try:
+                from prefix_cache import PrefixCache
+                sampling = {key: value for key, value in pipeline_settings.items()
+                            if key in ('do_sample', 'temperature')}
+                self.prefix_cache = PrefixCache(self.model, self.tokenizer, prefix, sampling)
+            except Exception as e:
+                print(f"⚠️ Prompt cache not available ({e}), the AI will just be a bit slower")
+
+        self.batch_generator = None
+
+    def __call__(self, prompt, **settings):
+        if self.prefix_cache is not None:
+            return self.prefix_cache.generate(prompt, **settings)
+        return self.pipeline(prompt, **settings)
+
+    def generate_batch(self, prompts, settings):
+        if self.batch_generator is None:
+            from inference_queue import pipeline_batch_generator
+            self.batch_generator = pipeline_batch_generator(self.pipeline, self.prefix_cache)
+        return self.batch_generator(prompts, settings)
+
+    def stream(self, prompt, settings, stop_texts=STOP_TEXTS):
+        return TokenStream(self.pipeline, prompt, settings, stop_texts, prefix_cache=self.prefix_cache)
+
+
+# Words the stub backend builds its answers from
+STUB_WORDS = [
+    'study', 'plan', 'review', 'notes', 'practice', 'exam', 'break', 'sleep', 'focus',
+    'schedule', 'goals', 'subject', 'chapter', 'questions', 'summary', 'daily', 'small',
+    'steps', 'helps', 'remember', 'try', 'each', 'week', 'your', 'time', 'first', 'then',
+]
+
+
+class StubTokenizer:
+    """
+    Counts every word as one token (enough for ConversationWindow and
+    for the max_length limit)
+    """
+
+    def __call__(self, text, **kwargs):
+        return {"input_ids": [zlib.crc32(word.encode()) for word in text.split()]}
+
+
+class StubBackend:
+    """
+    A pretend model: no download, no torch, and the same prompt always
+    gets the same answer.
+
+        StubBackend(tokens=40, token_latency=0.02)
+
+    writes 40 tokens (fewer if max_length / max_new_tokens says so) and
+    takes token_latency seconds per token, plus prompt_token_latency per
+    prompt word for reading the prompt. Like generate(max_time=...), it
+    stops writing once max_time has passed. With one_at_a_time=True
+    requests wait for each other, like one real model sharing the CPU.
+    """
+
+    name = "stub"
+    prefix_cache = None
+
+    def __init__(self, tokens=40, token_latency=0.02, prompt_token_latency=0.0, seed=0, one_at_a_time=False):
+        self.tokens = tokens
+        self.token_latency = token_latency
+        self.prompt_token_latency = prompt_token_latency
+        self.seed = seed
+        self.variant = f"{tokens} tokens, seed {seed}"
+        self.tokenizer = StubTokenizer()
+        self.busy = threading.Lock() if one_at_a_time else nullcontext()
+
+        # Counters for stats()
+        self.calls = 0
+        self.generated_tokens = 0
+
+    def answer_tokens(self, prompt, settings):
+        """
+        The pieces of the answer this prompt always gets
+        """
+        prompt_tokens = len(prompt.split())
+        count = self.tokens
+        if 'max_new_tokens' in settings:
+            count = min(count, settings['max_new_tokens'])
+        elif 'max_length' in settings:
+            count = min(count, max(0, settings['max_length'] - prompt_tokens))
+
+        chooser = random.Random(zlib.crc32(prompt.encode()) + self.seed)
+        pieces = []
+        for number in range(count):
+            word = chooser.choice(STUB_WORDS)
+            if number == 0 or pieces[-1].endswith('.'):
+                word = word.capitalize()
+            if number % 8 == 7 or number == count - 1:
+                word += '.'
+            pieces.append(' ' + word)
+        return pieces
+
+    def write(self, prompt, settings):
+        """
+        Yields the answer piece by piece at the configured speed
+        """
+        with self.busy:
+            self.calls += 1
+            start = time.perf_counter()
+            max_time = settings.get('max_time')
+            time.sleep(len(prompt.split()) * self.prompt_token_latency)
+
+            for piece in self.answer_tokens(prompt, settings):
+                if max_time is not None and time.perf_counter() - start >= max_time:
+                    break
+                time.sleep(self.token_latency)
+                self.generated_tokens += 1
+                yield piece
+
+    def __call__(self, prompt, **settings):
+        return [{'generated_text': prompt + "".join(self.write(prompt, settings))}]
+
+    def generate_batch(self, prompts, settings):
+        """
+        A batch takes as long as its longest answer, like a real batched
+        generate() that writes one token for every prompt per step
+        """
+        answers = [self.answer_tokens(prompt, settings) for prompt in prompts]
+        with self.busy:
+            self.calls += 1
+            start = time.perf_counter()
+            max_time = settings.get('max_time')
+            time.sleep(max(len(prompt.split()) for prompt in prompts) * self.prompt_token_latency)
+
+            steps = 0
+            longest = max(len(answer) for answer in answers)
+            while steps < longest and (max_time is None or time.perf_counter() - start < max_time):
+                time.sleep(self.token_latency)
+                steps += 1
+
+        self.generated_tokens += sum(min(len(answer), steps) for answer in answers)
+        return [[{'generated_text': prompt + "".join(answer[:steps])}] for prompt, answer in zip(prompts, answers)]
+
+    def stream(self, prompt, settings, stop_texts=STOP_TEXTS):
+        return StubTokenStream(self, prompt, settings, stop_texts)
+
+    def stats(self):
+        return {'calls': self.calls, 'generated_tokens': self.generated_tokens}
+
+
+class StubTokenStream(TokenStream):
+    """
+    TokenStream for the stub backend: same pieces, text and stats(),
+    without starting a real model
+    """
+
+    def __iter__(self):
+        start = time.perf_counter()
+        stop_filter = StopTextFilter(self.stop_texts)
+        for piece in self.ai_pipeline.write(self.prompt, self.settings):
+            self.tokens += 1
+            visible = stop_filter.feed(piece)
+            if visible:
+                if self.first_token_seconds is None:
+                    self.first_token_seconds = time.perf_counter() - start
+                self.text += visible
+                yield visible
+            if stop_filter.stopped:
+                self.stopped_early = True
+                break
+
+        rest = stop_filter.flush()
+        if rest:
+            self.text += rest
+            yield rest
+        self.total_seconds = time.perf_counter() - start
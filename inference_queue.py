@@ -0,0 +1,192 @@
+# Student Helper Chatbot - Micro-Batching Inference Queue
+# Running the AI model costs a fixed overhead per call, no matter if it
+# answers one question or eight. When several students ask at the same
+# time, this queue waits a tiny moment, collects their questions and
+# answers them all in ONE batched call.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+
+
+def pipeline_batch_generator(ai_pipeline, prefix_cache=None):
+    """
+    Wraps a transformers text-generation pipeline so it can answer a list
+    of prompts at once. Prompts of different lengths get padded on the
+    left, so every prompt still ends right where the answer begins.
+    A batch of one goes through prefix_cache (if given) instead, which
+    skips re-reading the shared system prompt.
+    """
+    tokenizer = ai_pipeline.tokenizer
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token  # GPT-style models have no pad token
+    tokenizer.padding_side = 'left'
+
+    def generate_batch(prompts, settings):
+        if prefix_cache is not None and len(prompts) == 1:
+            return [prefix_cache.generate(prompts[0], **settings)]
+        outputs = ai_pipeline(prompts, batch_size=len(prompts), **settings)
+        # One prompt in -> one list of answers out, same shape as a single call
+        return [output if isinstance(output, list) else [output] for output in outputs]
+
+    return generate_batch
+
+
+def resolve(future, result=None, error=None):
+    """
+    Sets a future's result (or error) unless it already has one - stop()
+    and the worker may both try when the queue is shutting down
+    """
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class BatchingScheduler:
+    """
+    Collects requests for up to max_wait seconds (or until max_batch_size
+    requests are waiting), runs generate_batch(prompts, settings) once and
+    hands every caller its own result.
+
+    Requests only share a batch when their settings match. max_length is
+    the exception: the batch uses the largest one, because a longer limit
+    just means the model is ALLOWED to write a bit more.
+    """
+
+    def __init__(self, generate_batch, max_batch_size=8, max_wait=0.02):
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.requests = queue.Queue()
+        self.running = True
+        self.lock = threading.Lock()  # nothing is queued after stop()'s None
+
+        # Counters for stats()
+        self.batches = 0
+        self.requests_done = 0
+
+        self.worker = threading.Thread(target=self._run)
+        self.worker.daemon = True
+        self.worker.start()
+
+    def submit(self, prompt, timeout=120, **settings):
+        """
+        Queues one prompt and waits for its answer (same result as calling
+        the pipeline with a single prompt). Waits at most `timeout`
+        seconds, then raises RuntimeError.
+        """
+        future = self.submit_async(prompt, **settings)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()  # only works if it isn't being generated yet
+            raise RuntimeError(f"The AI did not answer within {timeout} seconds") from None
+
+    def submit_async(self, prompt, **settings):
+        """
+        Queues one prompt and returns a Future for its answer
+        """
+        future = Future()
+        with self.lock:
+            if not self.running:
+                raise RuntimeError("The inference queue has been stopped")
+            self.requests.put((prompt, settings, future))
+        return future
+
+    def _collect_batch(self):
+        """
+        Waits for the first request, then gathers more until the batch is
+        full or the waiting window closes
+        """
+        first = self.requests.get()
+        if first is None:
+            return None
+        batch = [first]
+
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self.requests.put(None)  # stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+            # Callers that gave up (cancelled) are skipped; the rest can't
+            # be cancelled any more
+            batch = [request for request in batch if request[2].set_running_or_notify_cancel()]
+            try:
+                # Group requests whose settings can share one call
+                groups = {}
+                for prompt, settings, future in batch:
+                    shared = {key: value for key, value in settings.items() if key != 'max_length'}
+                    key = tuple(sorted(shared.items()))
+                    groups.setdefault(key, []).append((prompt, settings, future))
+
+                for key, group in groups.items():
+                    self._run_group(dict(key), group)
+            except Exception as e:
+                # Say odd settings that can't be grouped - fail this batch, keep serving
+                for _, _, future in batch:
+                    resolve(future, error=e)
+
+    def _run_group(self, settings, group):
+        lengths = [request[1]['max_length'] for request in group if 'max_length' in request[1]]
+        if lengths:
+            settings['max_length'] = max(lengths)
+
+        try:
+            results = self.generate_batch([prompt for prompt, _, _ in group], settings)
+        except Exception as e:
+            for _, _, future in group:
+                resolve(future, error=e)
+            return
+
+        self.batches += 1
+        self.requests_done += len(group)
+        for (_, _, future), result in zip(group, results):
+            resolve(future, result)
+
+    def stop(self):
+        """
+        Finishes the requests already queued (for up to 5 seconds), then
+        stops the worker. Requests it didn't get to fail with RuntimeError.
+        """
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+            self.requests.put(None)
+        self.worker.join(timeout=5)
+        while True:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                resolve(request[2], error=RuntimeError("The inference queue has been stopped"))
+        self.requests.put(None)  # in case a slow worker is still going
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'requests': self.requests_done,
+            'avg_batch_size': self.requests_done / self.batches if self.batches else 0.0,
+        }
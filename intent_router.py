@@ -0,0 +1,314 @@
+# Student Helper Chatbot - Fast Intent Router
+# All our bots keep a table of intents -> regex patterns, and used to try
+# every pattern one by one with re.search. This file prepares the whole
+# table ONCE, so finding the intent takes a single pass!
+# It also remembers recent answers, because students repeat commands a lot.
+# Patterns like '.*what.*gpa.*' are checked as "find 'what', then 'gpa'
+# after it", which stays fast even if someone pastes a whole transcript.
+
+import re
+import threading
+from collections import OrderedDict
+
+# Stands in for a word that no pattern cares about (like a subject name)
+WORD_MASK = '§'
+
+# The only regex pieces a "simple" pattern may use besides plain letters
+SIMPLE_PIECES = re.compile(r'\.\*|\\d\+?|[()^$]|\?:')
+
+# Longest message we look at - anything after this is ignored
+MAX_INPUT_LENGTH = 2000
+
+DIGIT = re.compile(r'\d')
+
+
+def simplify_pattern(pattern):
+    """
+    Removes the '.*' at the start and end of a pattern.
+    The router already lets a pattern start anywhere in the text, and a
+    trailing '.*' always matches, so both only cost extra backtracking.
+    """
+    if pattern.startswith('.*'):
+        pattern = pattern[2:]
+    if pattern.endswith('.*') and not pattern.endswith('\\.*'):
+        pattern = pattern[:-2]
+    return pattern
+
+
+class KeywordChain:
+    """
+    A pattern like '.*cgpa.*(\d+.*\d+.*\d+.*)' really means:
+    "on one line, find 'cgpa', then a digit, then another digit, then another".
+    Checking that with str.find from left to right reads each line once,
+    so it can never get stuck backtracking like a regex can.
+    """
+
+    def __init__(self, steps, at_start, at_end):
+        self.steps = steps        # words to find in order (DIGIT means "any digit")
+        self.at_start = at_start  # pattern starts with '^'
+        self.at_end = at_end      # pattern ends with '$'
+
+    @classmethod
+    def from_pattern(cls, pattern):
+        """
+        Returns a KeywordChain for simple patterns, or None if the pattern
+        uses regex features we can't turn into plain word searches
+        """
+        pieces = pattern.replace('(?:', '').replace('(', '').replace(')', '').split('.*')
+        filled = [index for index, piece in enumerate(pieces) if piece]
+        if not filled:
+            return None
+
+        at_start = pieces[filled[0]].startswith('^')
+        at_end = pieces[filled[-1]].endswith('$')
+        if at_start:
+            pieces[filled[0]] = pieces[filled[0]][1:]
+        if at_end:
+            pieces[filled[-1]] = pieces[filled[-1]][:-1]
+
+        steps = []
+        for piece in pieces:
+            if piece in ('\\d', '\\d+'):
+                steps.append(DIGIT)
+            elif re.fullmatch(r'[A-Za-z0-9 ]+', piece):
+                steps.append(piece)
+            elif piece:
+                return None  # '^' in the middle, '|', '+', '[abc]', ...
+        if not steps:
+            return None
+        return cls(steps, at_start, at_end)
+
+    def search(self, text, lines):
+        """
+        lines is the text split on newlines ('.*' never crosses a newline)
+        """
+        # Quick exit: the first word isn't anywhere in the text
+        if self.steps[0] is not DIGIT and self.steps[0] not in text:
+            return False
+
+        ends_with_newline = text.endswith('\n')
+        if self.at_start and self.at_end:
+            single_line = len(lines) == 1 or (len(lines) == 2 and ends_with_newline)
+            return single_line and self._fits(lines[0])
+        if self.at_start:
+            return self._fits(lines[0])
+        if self.at_end:
+            # '$' matches at the very end, or just before a final newline
+            if ends_with_newline and self._fits(lines[-2]):
+                return True
+            return self._fits(lines[-1])
+        return any(self._fits(line) for line in lines)
+
+    def _fits(self, line):
+        position = 0
+        last = len(self.steps) - 1
+        for index, step in enumerate(self.steps):
+            size = 1 if step is DIGIT else len(step)
+
+            if self.at_end and index == last:
+                # The last word has to sit exactly at the end of the line
+                found = len(line) - size
+                if found < position or (self.at_start and index == 0 and found != 0):
+                    return False
+                if step is DIGIT:
+                    return bool(DIGIT.fullmatch(line[found]))
+                return line.endswith(step)
+
+            if step is DIGIT:
+                digit = DIGIT.search(line, position)
+                found = digit.start() if digit else -1
+            else:
+                found = line.find(step, position)
+            if found < 0 or (self.at_start and index == 0 and found != 0):
+                return False
+            position = found + size
+        return True
+
+
+class IntentRouter:
+    """
+    Prepares an ordered pattern table like
+        {'gpa_question': [r'.*what.*gpa.*', ...], 'study_tips': [...]}
+    once, so matching a message is quick.
+
+    Simple patterns (plain words joined by '.*') become KeywordChains,
+    which take time proportional to the message length. Tables with
+    fancier regex fall back to one combined regex with a named group per
+    pattern.
+
+    The order of the table still matters: just like the old loop, the
+    FIRST intent (and the first pattern inside it) that matches wins.
+
+    Results are kept in a small LRU cache. The cache key is a "template"
+    of the text where words and numbers the patterns can't see are masked,
+    so 'add subject Math grade 8.5' and 'add subject Physics grade 9'
+    share one entry - as long as no pattern looks for digits. A table with
+    patterns like '\\d+.*\\d+' keeps as many digits as those patterns
+    count, so there '8.5' ('00') and '9' ('0') get separate entries: such
+    a pattern can match one and not the other.
+
+    One router may be used from several threads at once (the chat, the
+    AI batching and routing threads); the cache has a lock.
+    """
+
+    def __init__(self, patterns, default='unknown', cache_size=512, max_input_length=MAX_INPUT_LENGTH):
+        # Accept a dict or a list of (intent, patterns) pairs - the list form
+        # lets the same intent appear twice (e.g. an extra fallback rule)
+        if isinstance(patterns, dict):
+            patterns = list(patterns.items())
+
+        self.default = default
+        self.max_input_length = max_input_length
+
+        # Linear-time keyword chains, if every pattern is simple enough
+        self.chains = []
+        for intent, intent_patterns in patterns:
+            for pattern in intent_patterns:
+                self.chains.append((intent, KeywordChain.from_pattern(pattern)))
+        if not all(chain for _, chain in self.chains):
+            self.chains = None
+
+        # Otherwise: one combined regex, e.g. {'p0': 'gpa_question', 'p1': 'gpa_question', ...}
+        self.group_intents = {}
+        self.combined = None
+        if self.chains is None:
+            alternatives = []
+            for intent, intent_patterns in patterns:
+                for pattern in intent_patterns:
+                    group_name = f"p{len(self.group_intents)}"
+                    self.group_intents[group_name] = intent
+                    # '(?s:.*?)' lets this pattern start anywhere, like re.search
+                    alternatives.append(f"(?P<{group_name}>(?s:.*?){simplify_pattern(pattern)})")
+
+            # We always match at position 0, so the alternatives are tried IN
+            # ORDER. (A plain re.search would let the leftmost match win instead!)
+            self.combined = re.compile("|".join(alternatives))
+
+        # LRU cache: template -> intent (most recently used at the end)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self._learn_masking_rules(patterns)
+
+    def _learn_masking_rules(self, patterns):
+        """
+        Works out which parts of a text the patterns can never notice.
+        Masking is only switched on when every pattern is made of plain
+        words, '.*', '\\d+', anchors and groups - otherwise the cache
+        just uses the text as it is.
+        """
+        self.literals = set()   # every plain word used in a pattern
+        self.digit_limit = 0    # most '\d' a single pattern asks for
+        self.can_mask = True
+
+        for _, intent_patterns in patterns:
+            for pattern in intent_patterns:
+                pieces = SIMPLE_PIECES.split(pattern)
+                if not all(piece.isalpha() or piece == '' for piece in pieces):
+                    self.can_mask = False
+                if '\\d' in pattern and ('^' in pattern or '$' in pattern):
+                    self.can_mask = False  # masking would move digits around the anchor
+                self.literals.update(piece for piece in pieces if piece)
+                self.digit_limit = max(self.digit_limit, pattern.count('\\d'))
+
+        # One regex that spots any pattern word inside a text word
+        longest_first = sorted(self.literals, key=len, reverse=True)
+        self.literal_finder = re.compile('|'.join(map(re.escape, longest_first)) or '(?!)')
+
+    def _mask_word(self, found):
+        word = found.group(0)
+        if self.literal_finder.search(word):
+            return word  # a pattern might be looking at this word
+
+        digits = sum(letter.isdigit() for letter in word)
+        if digits and self.digit_limit:
+            # Keep just enough digits for patterns like '\d+.*\d+.*\d+'
+            return '0' * min(digits, self.digit_limit)
+        return WORD_MASK
+
+    def make_template(self, text):
+        """
+        'add subject math grade 8.5' -> 'add subject § grade 0'
+        """
+        if not self.can_mask:
+            return text
+        template = re.sub(r'\S+', self._mask_word, text)
+        # 'computer science' and 'math' are both just one subject name
+        return re.sub(f'{WORD_MASK}(?:[ \\t]+{WORD_MASK})+', WORD_MASK, template)
+
+    def _remember(self, key, intent):
+        """
+        Called with the lock held
+        """
+        self.cache[key] = intent
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)  # forget the least recently used
+
+    def match(self, text):
+        """
+        Returns the intent for the text, or the default if nothing matches
+        """
+        if self.max_input_length and len(text) > self.max_input_length:
+            text = text[:self.max_input_length]
+
+        if not self.cache_size:
+            return self._scan(text)
+
+        # Fast path: the exact same text was seen recently
+        with self.lock:
+            intent = self.cache.get(text)
+            if intent is not None:
+                self.cache_hits += 1
+                self.cache.move_to_end(text)
+                return intent
+
+        # Same command with different names or numbers?
+        template = self.make_template(text)
+        with self.lock:
+            intent = self.cache.get(template)
+            if intent is not None:
+                self.cache_hits += 1
+                self.cache.move_to_end(template)
+        if intent is None:
+            intent = self._scan(text)  # outside the lock - the slow part
+            with self.lock:
+                self.cache_misses += 1
+                self._remember(template, intent)
+
+        if text != template:
+            with self.lock:
+                self._remember(text, intent)
+        return intent
+
+    def _scan(self, text):
+        if self.chains is not None:
+            lines = text.split('\n')
+            for intent, chain in self.chains:
+                if chain.search(text, lines):
+                    return intent
+            return self.default
+
+        found = self.combined.match(text)
+        if not found:
+            return self.default
+
+        # The pattern's own group closes last, so lastgroup is its name
+        return self.group_intents[found.lastgroup]
+
+    def cache_info(self):
+        """
+        Returns hit/miss counters for the intent cache
+        """
+        with self.lock:
+            lookups = self.cache_hits + self.cache_misses
+            size = len(self.cache)
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': self.cache_hits / lookups if lookups else 0.0,
+            'size': size,
+            'max_size': self.cache_size,
+        }
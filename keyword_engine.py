@@ -0,0 +1,97 @@
+# Student Helper Chatbot - Keyword Engine (keyword trie as one regex)
+# Instead of checking "is keyword in the message?" once for EVERY keyword,
+# we put all keywords in a tree of letters (a "trie") and turn that tree
+# into ONE regular expression. Python's regex engine (written in C) then
+# reads the message once and spots all keywords - so the work grows with
+# the message, not with the number of keywords.
+
+import re
+
+
+class KeywordAutomaton:
+    """
+    Finds which keyword groups appear in a text in one pass.
+
+    Groups are given in priority order, for example:
+        [('stress', ['stress', 'anxiety']), ('greeting', ['hello', 'hi'])]
+    Like the old `keyword in text` checks, keywords match anywhere,
+    even inside other words.
+    """
+
+    def __init__(self, keyword_groups):
+        self.labels = [label for label, _ in keyword_groups]
+
+        # The tree of letters: node -> {letter: next node}, '' marks "a keyword ends here"
+        self.trie = {}
+        # keyword -> bitmask of the groups it belongs to
+        groups_of = {}
+        for priority, (_, keywords) in enumerate(keyword_groups):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                groups_of[keyword] = groups_of.get(keyword, 0) | 1 << priority
+                node = self.trie
+                for letter in keyword:
+                    node = node.setdefault(letter, {})
+                node[''] = True
+
+        # At each place in the text the regex finds the LONGEST keyword
+        # starting there. Every shorter keyword starting at the same place
+        # is a beginning of it, so its groups are added in here too.
+        self.found = {}
+        for keyword in groups_of:
+            self.found[keyword] = 0
+            for end in range(1, len(keyword) + 1):
+                self.found[keyword] |= groups_of.get(keyword[:end], 0)
+
+        self.pattern = re.compile(self._trie_pattern(self.trie)) if groups_of else None
+
+    def _trie_pattern(self, node):
+        """
+        'study', 'stress' -> 'st(?:ress|udy)': shared beginnings are only
+        tried once. Longer keywords are tried first, so the longest wins.
+        """
+        branches = [re.escape(letter) + self._trie_pattern(child)
+                    for letter, child in sorted(node.items()) if letter]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # A keyword may also end here
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    def scan(self, text):
+        """
+        Reads the text once and returns a bitmask of every group that was hit
+        """
+        if self.pattern is None:
+            return 0
+        search = self.pattern.search
+        found = self.found
+
+        hits = 0
+        match = search(text)
+        while match:
+            hits |= found[match.group()]
+            # The next keyword may start inside this one ('thanks' / 'hanks')
+            match = search(text, match.start() + 1)
+        return hits
+
+    def find_all(self, text):
+        """
+        Returns the labels of all groups found in the text, in priority order
+        """
+        hits = self.scan(text)
+        return [label for priority, label in enumerate(self.labels) if hits >> priority & 1]
+
+    def first_match(self, text):
+        """
+        Returns the highest-priority label found in the text, or None
+        """
+        hits = self.scan(text)
+        if not hits:
+            return None
+        # The lowest set bit is the group that comes first in the list
+        return self.labels[(hits & -hits).bit_length() - 1]
@@ -0,0 +1,275 @@
+# Student Helper Chatbot - Local Knowledge Base (BM25 search over notes)
+# "Explain binary search" used to go to the small AI model, which is slow and
+# often makes things up. Now the bot first searches a folder of markdown
+# notes (like the ones in notes/) and answers with the best matching
+# paragraph - in a few milliseconds, and always correct if the notes are!
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import time
+
+from semantic_tier import STOPWORDS
+from semantic_cache import QUESTION_WORDS
+
+# "How does X work?", "What does X mean?" - these say nothing about X
+ASKING_WORDS = {'work', 'works', 'mean', 'means', 'meaning', 'define', 'describe', 'simple', 'terms', 'understand'}
+
+# Paragraphs are joined into passages of about this many words
+PASSAGE_WORDS = 120
+
+
+def search_terms(text):
+    """
+    'Explain binary search!' -> ['binary', 'search']
+    """
+    words = re.findall(r"[a-z0-9][a-z0-9+#'-]*", text.lower())
+    return [word for word in words
+            if word not in STOPWORDS and word not in QUESTION_WORDS and word not in ASKING_WORDS]
+
+
+def split_passages(markdown):
+    """
+    Cuts a markdown note into passages: each one belongs to a heading and
+    holds one or more paragraphs (never many more than PASSAGE_WORDS words)
+    """
+    passages = []
+    heading = ""
+    paragraphs = []
+
+    def finish_section():
+        current = []
+        for paragraph in paragraphs:
+            if current and len(" ".join(current).split()) + len(paragraph.split()) > PASSAGE_WORDS:
+                passages.append({'heading': heading, 'text': "\n".join(current)})
+                current = []
+            current.append(paragraph)
+        if current:
+            passages.append({'heading': heading, 'text': "\n".join(current)})
+
+    for block in re.split(r'\n\s*\n', markdown):
+        block = block.strip()
+        if not block:
+            continue
+        lines = block.splitlines()
+        if lines[0].startswith('#'):
+            finish_section()
+            heading = lines[0].lstrip('#').strip()
+            paragraphs = []
+            block = "\n".join(lines[1:]).strip()
+            if not block:
+                continue
+        paragraphs.append(block)
+    finish_section()
+    return passages
+
+
+class KnowledgeBase:
+    """
+    BM25 search over a folder of markdown notes.
+
+    The index lives in index_folder as one small JSON "segment" per note
+    (its passages and how often each word appears). update() only reads
+    notes whose size or modification time changed, and drops segments of
+    deleted notes - so adding one note to a big folder is quick.
+
+        kb = KnowledgeBase("notes")
+        kb.update()
+        kb.search("explain binary search")  # -> [(score, passage), ...]
+    """
+
+    def __init__(self, notes_folder="notes", index_folder="knowledge_index", k1=1.5, b=0.75, min_coverage=0.5):
+        self.notes_folder = notes_folder
+        self.index_folder = index_folder
+        self.k1 = k1
+        self.b = b
+        # A passage must contain at least this share of the question's
+        # words (rare words weigh more)
+        self.min_coverage = min_coverage
+
+        self.segments = {}   # note path -> segment (passages + word counts)
+        self.postings = {}   # word -> {(note path, passage number): count}
+        self.lengths = {}    # (note path, passage number) -> words in the passage
+        self.total_length = 0
+        self.passage_count = 0
+
+        # Counters for stats()
+        self.indexed_files = 0
+        self.skipped_notes = []  # notes the last update() couldn't read
+        self.searches = 0
+        self.search_seconds = 0.0
+
+        self._load_segments()
+
+    def _segment_path(self, note_path):
+        name = hashlib.sha1(note_path.encode('utf-8')).hexdigest()
+        return os.path.join(self.index_folder, name + '.json')
+
+    def _load_segments(self):
+        """
+        Reads the saved index (no notes are opened here)
+        """
+        if not os.path.isdir(self.index_folder):
+            return
+        for name in os.listdir(self.index_folder):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.index_folder, name), encoding='utf-8') as f:
+                    segment = json.load(f)
+            except (OSError, ValueError):
+                continue  # a broken segment is simply indexed again by update()
+            self._add_segment(segment)
+
+    def _add_segment(self, segment):
+        path = segment['path']
+        self.segments[path] = segment
+        for number, passage in enumerate(segment['passages']):
+            for word, count in passage['counts'].items():
+                self.postings.setdefault(word, {})[(path, number)] = count
+            self.lengths[(path, number)] = passage['length']
+            self.total_length += passage['length']
+            self.passage_count += 1
+
+    def _remove_segment(self, path):
+        segment = self.segments.pop(path)
+        for number, passage in enumerate(segment['passages']):
+            for word in passage['counts']:
+                postings = self.postings[word]
+                del postings[(path, number)]
+                if not postings:
+                    del self.postings[word]
+            del self.lengths[(path, number)]
+            self.total_length -= passage['length']
+            self.passage_count -= 1
+
+    def _find_notes(self):
+        notes = {}
+        for folder, _, files in os.walk(self.notes_folder):
+            for name in files:
+                if name.endswith('.md'):
+                    path = os.path.join(folder, name)
+                    try:
+                        info = os.stat(path)
+                    except OSError:
+                        continue  # deleted meanwhile, or a broken link
+                    notes[os.path.relpath(path, self.notes_folder)] = (info.st_mtime, info.st_size)
+        return notes
+
+    def update(self):
+        """
+        Brings the index up to date with the notes folder.
+        Returns how many notes had to be (re)read. A note that can't be
+        read (no permission, not UTF-8, ...) is skipped and listed in
+        skipped_notes - one bad file shouldn't keep the bot from starting.
+        """
+        self.skipped_notes = []
+        notes = self._find_notes()
+        os.makedirs(self.index_folder, exist_ok=True)
+
+        for path in list(self.segments):
+            if path not in notes:
+                self._remove_segment(path)
+                try:
+                    os.remove(self._segment_path(path))
+                except FileNotFoundError:
+                    pass
+
+        changed = 0
+        for path, (mtime, size) in sorted(notes.items()):
+            old = self.segments.get(path)
+            if old and old['mtime'] == mtime and old['size'] == size:
+                continue
+            try:
+                with open(os.path.join(self.notes_folder, path), encoding='utf-8') as f:
+                    passages = split_passages(f.read())
+            except (OSError, UnicodeDecodeError):
+                self.skipped_notes.append(path)
+                continue  # tried again next time, in case it gets fixed
+
+            segment = {'path': path, 'mtime': mtime, 'size': size, 'passages': []}
+            for passage in passages:
+                # Heading words count twice: a passage is mostly ABOUT its heading
+                terms = search_terms(passage['heading']) * 2 + search_terms(passage['text'])
+                counts = {}
+                for term in terms:
+                    counts[term] = counts.get(term, 0) + 1
+                segment['passages'].append({**passage, 'counts': counts, 'length': len(terms)})
+
+            if old:
+                self._remove_segment(path)
+            self._add_segment(segment)
+            with open(self._segment_path(path), 'w', encoding='utf-8') as f:
+                json.dump(segment, f)
+            changed += 1
+
+        self.indexed_files += changed
+        return changed
+
+    def search(self, question, limit=3):
+        """
+        Returns up to `limit` (score, passage) pairs, best first. Each
+        passage is a dict with 'note', 'heading' and 'text'.
+        """
+        start = time.perf_counter()
+        terms = set(search_terms(question))
+        scores = {}
+        matched_weight = {}
+        total_weight = 0.0
+        average_length = self.total_length / self.passage_count if self.passage_count else 0.0
+
+        for term in terms:
+            postings = self.postings.get(term, {})
+            # Rare words count more (inverse document frequency). A word
+            # that isn't in the notes at all is the rarest of all.
+            idf = math.log(1 + (self.passage_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            total_weight += idf
+            # Repeating a word helps less and less, and long passages are scaled down
+            boost = idf * (self.k1 + 1)
+            short = self.k1 * (1 - self.b)
+            long = self.k1 * self.b / average_length if average_length else 0.0
+            lengths = self.lengths
+            for key, count in postings.items():
+                scores[key] = scores.get(key, 0.0) + boost * count / (count + short + long * lengths[key])
+                matched_weight[key] = matched_weight.get(key, 0.0) + idf
+
+        # "How do I study better?" shares only 'study' with a note about
+        # Pomodoro - that's not what the student asked about
+        relevant = [key for key in scores if matched_weight[key] >= total_weight * self.min_coverage]
+        best = heapq.nlargest(limit, relevant, key=scores.get)
+        results = []
+        for path, number in best:
+            passage = self.segments[path]['passages'][number]
+            results.append((scores[(path, number)],
+                            {'note': path, 'heading': passage['heading'], 'text': passage['text']}))
+
+        self.searches += 1
+        self.search_seconds += time.perf_counter() - start
+        return results
+
+    def answer(self, question):
+        """
+        The best matching note as a chat answer, or None if the notes
+        don't cover the question
+        """
+        results = self.search(question)
+        if not results:
+            return None
+        _, best = results[0]
+        # A long section is split into several passages - show the parts that matched
+        parts = [passage['text'] for _, passage in results
+                 if passage['note'] == best['note'] and passage['heading'] == best['heading']]
+        title = best['heading'] or os.path.splitext(os.path.basename(best['note']))[0]
+        return f"📖 {title} (from your notes):\n" + "\n\n".join(parts)
+
+    def stats(self):
+        return {
+            'notes': len(self.segments),
+            'passages': self.passage_count,
+            'words': len(self.postings),
+            'searches': self.searches,
+            'avg_search_ms': self.search_seconds / self.searches * 1000 if self.searches else 0.0,
+        }
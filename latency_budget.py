@@ -0,0 +1,97 @@
+# Student Helper Chatbot - Latency Budget for AI Answers
+# Sometimes the AI model takes ages (a slow laptop, a long answer). Instead
+# of freezing the chat, we give it a time budget per turn. If the answer
+# isn't ready in time, the student gets a quick pattern-based answer right
+# away. The AI's late answer is not cached - it may have been cut off.
+
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class LatencyBudget:
+    """
+    Runs AI work in a background thread and waits at most `seconds` for it.
+
+    hard_limit is meant for generate(max_time=...): it stops the model
+    completely if it is STILL going long after the deadline, so a late
+    answer can't keep the computer busy forever.
+    """
+
+    def __init__(self, seconds=8.0, hard_limit_factor=2.0):
+        self.seconds = seconds
+        self.hard_limit = seconds * hard_limit_factor
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-budget")
+        # Late streams are read to the end here, so the next turn doesn't
+        # have to wait behind them in `worker`
+        self.drainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-late")
+
+        # Counters for stats()
+        self.on_time = 0
+        self.missed = 0
+        self.late_finished = 0
+
+    def run(self, function, *args):
+        """
+        Runs function(*args) off the input thread.
+        Returns (True, result) if it finished in time, otherwise (False, None).
+        """
+        return self.wait(self.worker.submit(function, *args))
+
+    def wait(self, future):
+        """
+        Waits for a future (from run() or any other queue) until the deadline
+        """
+        try:
+            result = future.result(timeout=self.seconds)
+        except FutureTimeout:
+            self.missed += 1
+            future.add_done_callback(self._count_late)
+            return False, None
+        self.on_time += 1
+        return True, result
+
+    def _count_late(self, future):
+        if not future.cancelled() and future.exception() is None:
+            self.late_finished += 1
+
+    def start_stream(self, pieces):
+        """
+        Waits for the FIRST piece of a streamed answer until the deadline.
+        Returns an iterator over the whole answer, or None if the first piece
+        was too late (or the answer was empty). A late stream is still read
+        to the end in the background, so the model finishes and lets go of
+        its resources the normal way.
+        """
+        pieces = iter(pieces)
+        first_piece = self.worker.submit(next, pieces, None)
+        on_time, first = self.wait(first_piece)
+        if not on_time:
+            first_piece.add_done_callback(lambda _: self._drain(pieces))
+            return None
+        if first is None:
+            return None
+        return itertools.chain([first], pieces)
+
+    def _drain(self, pieces):
+        try:
+            self.drainer.submit(deque, pieces, 0)
+        except RuntimeError:
+            pass  # shut down meanwhile - the bot is closing, let the stream go
+
+    def stats(self):
+        """
+        How many AI turns made the deadline
+        """
+        turns = self.on_time + self.missed
+        return {
+            'budget_seconds': self.seconds,
+            'on_time': self.on_time,
+            'missed': self.missed,
+            'late_finished': self.late_finished,
+            'miss_rate': self.missed / turns if turns else 0.0,
+        }
+
+    def shutdown(self):
+        self.worker.shutdown(wait=False)
+        self.drainer.shutdown(wait=False)
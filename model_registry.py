@@ -0,0 +1,216 @@
+# Student Helper Chatbot - Local Model Registry
+# Every start used to look up "microsoft/DialoGPT-small" on the Hugging Face
+# hub, even with the model already downloaded - slow, and on a computer
+# without internet the bot waited almost a minute just to give up. Now a
+# model is added to a local folder ONCE; after that it loads straight from
+# disk, strictly offline, with checksums that catch a broken download.
+#
+#   python model_registry.py add microsoft/DialoGPT-small   (needs internet, once)
+#   python model_registry.py add my-model /path/to/folder   (copy a local model)
+#   python model_registry.py list
+#   python model_registry.py verify
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+# Registered models (and manifest.json, the list of them) live here
+MODEL_REGISTRY_DIR = "models"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    Checksum of a file, read in 1MB pieces so big weight files fit in memory
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe_files(folder, checksums=True):
+    """
+    {file name: {'size', 'mtime_ns', 'sha256'}} for every file in a model folder
+    """
+    files = {}
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            info = os.stat(path)
+            files[name] = {'size': info.st_size, 'mtime_ns': info.st_mtime_ns}
+            if checksums:
+                files[name]['sha256'] = file_sha256(path)
+    return files
+
+
+class ModelRegistry:
+    """
+    Models saved on disk, with a manifest (manifest.json) that remembers
+    each model's folder and the size and checksum of every file.
+
+        registry = ModelRegistry("models")
+        registry.add("microsoft/DialoGPT-small")       # once, downloads it
+        model, tokenizer = registry.load("microsoft/DialoGPT-small")  # offline
+
+    Weights are always stored as .safetensors. That format is read through
+    a memory map: the operating system pages the weights in when they are
+    used, and several bot processes share one copy of them in memory.
+
+    Loading only compares file sizes and modification times (instant);
+    a file that changed is checksummed again, and a wrong checksum stops
+    the load. verify() checksums everything.
+    """
+
+    def __init__(self, folder=MODEL_REGISTRY_DIR):
+        self.folder = folder
+        self.manifest_path = os.path.join(folder, "manifest.json")
+        self.models = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f).get('models', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        """
+        Writes to a temporary file first, so a crash never leaves half a manifest
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        temporary = self.manifest_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'models': self.models}, f, indent=2)
+        os.replace(temporary, self.manifest_path)
+
+    def has(self, model_name):
+        return model_name in self.models
+
+    def path(self, model_name):
+        """
+        The checked local folder of a registered model.
+        Raises RuntimeError if it isn't registered or its files changed.
+        """
+        if model_name not in self.models:
+            raise RuntimeError(f"{model_name} is not in the model registry - "
+                               f"run: python model_registry.py add {model_name}")
+        entry = self.models[model_name]
+        folder = os.path.join(self.folder, entry['folder'])
+
+        touched = False
+        for name, expected in entry['files'].items():
+            path = os.path.join(folder, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                raise RuntimeError(f"{model_name}: {name} is missing from {folder}") from None
+            if info.st_size == expected['size'] and info.st_mtime_ns == expected['mtime_ns']:
+                continue
+            # Copied or touched files keep their checksum - only then is it read
+            if info.st_size != expected['size'] or file_sha256(path) != expected['sha256']:
+                raise RuntimeError(f"{model_name}: {name} is damaged (checksum mismatch) - add the model again")
+            expected['mtime_ns'] = info.st_mtime_ns
+            touched = True
+
+        if touched:
+            self._save_manifest()
+        return folder
+
+    def load_tokenizer(self, model_name):
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(self.path(model_name), local_files_only=True)
+
+    def load_model(self, model_name):
+        from transformers import AutoModelForCausalLM
+        return AutoModelForCausalLM.from_pretrained(self.path(model_name), local_files_only=True,
+                                                    use_safetensors=True)
+
+    def load(self, model_name):
+        """
+        Returns (model, tokenizer), without touching the network
+        """
+        return self.load_model(model_name), self.load_tokenizer(model_name)
+
+    def add(self, model_name, source=None):
+        """
+        Saves a model into the registry - from the hub, or from the local
+        folder `source`. The model is saved again (not just copied), so the
+        weights end up as .safetensors whatever format they came in.
+        """
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        local = source is not None
+        source = source or model_name
+        model = AutoModelForCausalLM.from_pretrained(source, local_files_only=local)
+        tokenizer = AutoTokenizer.from_pretrained(source, local_files_only=local)
+
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        folder = os.path.join(self.folder, safe_name)
+        temporary = folder + '.tmp'
+        shutil.rmtree(temporary, ignore_errors=True)
+        model.save_pretrained(temporary)
+        tokenizer.save_pretrained(temporary)
+        if not any(name.endswith('.safetensors') for name in os.listdir(temporary)):
+            shutil.rmtree(temporary)
+            raise RuntimeError(f"{model_name} could not be saved as safetensors")
+
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(temporary, folder)
+        self.models[model_name] = {
+            'folder': safe_name,
+            'source': source,
+            'added': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'files': describe_files(folder),
+        }
+        self._save_manifest()
+        return folder
+
+    def remove(self, model_name):
+        entry = self.models.pop(model_name)
+        self._save_manifest()
+        shutil.rmtree(os.path.join(self.folder, entry['folder']), ignore_errors=True)
+
+    def verify(self, model_name=None):
+        """
+        Checksums every file. Returns {model name: [problems]} (empty lists if all is well)
+        """
+        problems = {}
+        for name in ([model_name] if model_name else list(self.models)):
+            entry = self.models[name]
+            folder = os.path.join(self.folder, entry['folder'])
+            problems[name] = []
+            for file_name, expected in entry['files'].items():
+                path = os.path.join(folder, file_name)
+                if not os.path.exists(path):
+                    problems[name].append(f"{file_name} is missing")
+                elif file_sha256(path) != expected['sha256']:
+                    problems[name].append(f"{file_name} has the wrong checksum")
+        return problems
+
+
+if __name__ == "__main__":
+    registry = ModelRegistry()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+
+    if command == 'add' and len(sys.argv) > 2:
+        print(f"📦 Adding {sys.argv[2]}...")
+        print(f"✅ Saved in {registry.add(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)}")
+    elif command == 'remove' and len(sys.argv) > 2:
+        registry.remove(sys.argv[2])
+        print(f"🗑️ Removed {sys.argv[2]}")
+    elif command == 'verify':
+        for name, problems in registry.verify().items():
+            print(f"{'✅' if not problems else '❌'} {name}" + "".join(f"\n   - {problem}" for problem in problems))
+    elif command == 'list':
+        if not registry.models:
+            print("No models registered yet. Try: python model_registry.py add microsoft/DialoGPT-small")
+        for name, entry in registry.models.items():
+            size = sum(info['size'] for info in entry['files'].values()) / 1e6
+            print(f"📦 {name}: {size:.1f} MB in {os.path.join(registry.folder, entry['folder'])} (added {entry['added']})")
+    else:
+        print("Usage: python model_registry.py [list | add NAME [FOLDER] | remove NAME | verify]")
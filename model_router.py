@@ -0,0 +1,302 @@
+# Student Helper Chatbot - Latency-Based Model Router
+# A bigger model gives nicer answers but is slower, and when many questions
+# arrive at once it gets slower still. The router keeps several models
+# (backends) ready and, for every question, picks the best one that can
+# still answer within our latency target - judging by how fast each model
+# has actually been over the last few calls.
+
+import bisect
+import threading
+import time
+from collections import deque
+
+# Histogram buckets: 0.1ms, 0.2ms, 0.4ms, ... up to about 13s (per token)
+BUCKET_BOUNDS = [0.0001 * 2 ** number for number in range(18)]
+
+# What a failed request counts as (per token): slower than anything real,
+# so the router stays away from a broken backend until it ages out
+FAILURE_SECONDS = BUCKET_BOUNDS[-1]
+
+
+class LatencyHistogram:
+    """
+    Histogram of the last `window` measurements from the last `max_age`
+    seconds. Old measurements drop out, so the numbers follow the current
+    load - and a model that was slow a minute ago gets another chance.
+    """
+
+    def __init__(self, window=200, max_age=30.0, bounds=BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket is "slower than everything"
+        self.recent = deque()  # (time, bucket)
+        self.window = window
+        self.max_age = max_age
+        self.total = 0
+
+    def _forget_old(self):
+        too_old = time.monotonic() - self.max_age
+        while self.recent and (len(self.recent) > self.window or self.recent[0][0] < too_old):
+            self.counts[self.recent.popleft()[1]] -= 1
+
+    def record(self, seconds):
+        bucket = bisect.bisect_left(self.bounds, seconds)
+        self.recent.append((time.monotonic(), bucket))
+        self.counts[bucket] += 1
+        self.total += 1
+        self._forget_old()
+
+    def percentile(self, fraction):
+        """
+        An upper limit for `fraction` of the recent measurements
+        (None if there are no recent measurements)
+        """
+        self._forget_old()
+        if not self.recent:
+            return None
+        needed = fraction * len(self.recent)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= needed:
+                return self.bounds[min(bucket, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+    def snapshot(self):
+        """
+        {bucket upper limit in ms: count} for the buckets that are in use
+        """
+        self._forget_old()
+        labels = [bound * 1000 for bound in self.bounds] + [float('inf')]
+        return {label: count for label, count in zip(labels, self.counts) if count}
+
+
+def request_size(prompt, settings):
+    """
+    Roughly how much work a request is: the prompt's words plus the
+    number of tokens the model may write
+    """
+    prompt_words = len(prompt.split())
+    if 'max_new_tokens' in settings:
+        new_tokens = settings['max_new_tokens']
+    elif 'max_length' in settings:
+        new_tokens = max(settings['max_length'] - prompt_words, 1)
+    else:
+        new_tokens = 50
+    return prompt_words + new_tokens
+
+
+class RoutedBackend:
+    """
+    One registered backend with its live latency numbers
+    """
+
+    def __init__(self, backend, preference, intents=None, max_input_words=None):
+        self.backend = backend
+        self.preference = preference  # lower = better answers
+        self.intents = set(intents) if intents else None
+        self.max_input_words = max_input_words
+        self.histogram = LatencyHistogram()
+        self.in_flight = 0
+        self.chosen = 0
+        self.failures = 0
+
+    def allows(self, prompt, intent):
+        if self.intents is not None and intent not in self.intents:
+            return False
+        return self.max_input_words is None or len(prompt.split()) <= self.max_input_words
+
+    def estimate(self, size, fraction):
+        """
+        Expected seconds for a request of this size, counting the requests
+        already waiting for this model. An untried backend looks instant,
+        so it gets tried (and measured) - but only one request at a time.
+        """
+        per_token = self.histogram.percentile(fraction)
+        if per_token is None:
+            return 0.0 if self.in_flight == 0 else float('inf')
+        return per_token * size * (self.in_flight + 1)
+
+
+class RoutedStream:
+    """
+    Wraps a backend's TokenStream so the router can time it
+    """
+
+    def __init__(self, router, entry, size, stream):
+        self.router = router
+        self.entry = entry
+        self.size = size
+        self.stream = stream
+        self.released = False
+
+    def __iter__(self):
+        start = time.perf_counter()
+        try:
+            yield from self.stream
+        except Exception:
+            self.close(failed=True)
+            raise
+        finally:
+            self.close(time.perf_counter() - start)
+
+    def close(self, seconds=None, failed=False):
+        """
+        Gives the backend's slot back (once). Called when reading ends,
+        or by whoever drops the stream without reading it - then nothing
+        is timed (seconds=None).
+        """
+        with self.router.lock:
+            if self.released:
+                return
+            self.released = True
+        self.router.finish(self.entry, self.size, seconds, failed)
+
+    def __del__(self):
+        # A stream that was never read at all still frees its slot
+        if not self.__dict__.get('released', True):
+            self.close()
+
+    def __getattr__(self, name):
+        # text, tokens, first_token_seconds, stats(), ... come from the real stream
+        return getattr(self.stream, name)
+
+
+class ModelRouter:
+    """
+    Sends each request to one of several backends (see generation_backends.py).
+
+        router = ModelRouter(target_seconds=2.0)
+        router.register(TransformersBackend("microsoft/DialoGPT-small"))   # best answers first
+        router.register(TransformersBackend("sshleifer/tiny-gpt2"))
+        router(prompt, max_length=100)
+
+    For every request it takes the first registered backend that is
+    allowed for this question (intent, input length) and whose recent
+    `percentile` latency says it will finish within target_seconds. If none
+    can, the one expected to be fastest is used.
+
+    The router works like a backend itself, so it can be passed anywhere a
+    backend goes (UltimateStudentBot(ai_backend=router), the batching queue).
+    """
+
+    name = "router"
+    prefix_cache = None
+
+    def __init__(self, target_seconds=2.0, percentile=0.9, intent_of=None):
+        self.target_seconds = target_seconds
+        self.percentile = percentile
+        # intent_of(prompt) -> intent name, used by register(..., intents=[...])
+        self.intent_of = intent_of
+        self.entries = []
+        # Reentrant: a dropped stream may give its slot back from inside
+        # a locked section (garbage collection can run __del__ anywhere)
+        self.lock = threading.RLock()
+        self.over_target = 0
+
+    @property
+    def variant(self):
+        return " + ".join(f"{entry.backend.name} ({entry.backend.variant})" for entry in self.entries)
+
+    @property
+    def tokenizer(self):
+        return self.entries[0].backend.tokenizer if self.entries else None
+
+    def register(self, backend, intents=None, max_input_words=None):
+        """
+        Adds a backend. Register the one with the best answers first.
+        intents / max_input_words limit which questions it may answer.
+        """
+        self.entries.append(RoutedBackend(backend, len(self.entries), intents, max_input_words))
+
+    def choose(self, prompt, settings):
+        """
+        Picks a backend for this request and marks it as busy.
+        Returns (entry, request size).
+        """
+        if not self.entries:
+            raise RuntimeError("No backends registered with the router")
+        intent = self.intent_of(prompt) if self.intent_of else None
+        size = request_size(prompt, settings)
+
+        with self.lock:
+            allowed = [entry for entry in self.entries if entry.allows(prompt, intent)] or self.entries
+            estimates = {id(entry): entry.estimate(size, self.percentile) for entry in allowed}
+            in_time = [entry for entry in allowed if estimates[id(entry)] <= self.target_seconds]
+            if in_time:
+                chosen = min(in_time, key=lambda entry: entry.preference)
+            else:
+                chosen = min(allowed, key=lambda entry: estimates[id(entry)])
+                self.over_target += 1
+            chosen.in_flight += 1
+            chosen.chosen += 1
+        return chosen, size
+
+    def finish(self, entry, size, seconds=None, failed=False):
+        """
+        Marks the backend as free again and records how long it took
+        (seconds=None: don't record, e.g. an abandoned stream). A failed
+        request records FAILURE_SECONDS instead - a backend that fails
+        quickly must not look like the fastest one.
+        """
+        with self.lock:
+            entry.in_flight -= 1
+            if failed:
+                entry.failures += 1
+                entry.histogram.record(FAILURE_SECONDS)
+            elif seconds is not None:
+                entry.histogram.record(seconds / size)
+
+    def __call__(self, prompt, **settings):
+        entry, size = self.choose(prompt, settings)
+        start = time.perf_counter()
+        try:
+            result = entry.backend(prompt, **settings)
+        except Exception:
+            self.finish(entry, size, failed=True)
+            raise
+        self.finish(entry, size, time.perf_counter() - start)
+        return result
+
+    def generate_batch(self, prompts, settings):
+        """
+        The whole batch goes to one backend, chosen for its longest prompt
+        """
+        longest = max(prompts, key=lambda prompt: len(prompt.split()))
+        entry, size = self.choose(longest, settings)
+        start = time.perf_counter()
+        try:
+            results = entry.backend.generate_batch(prompts, settings)
+        except Exception:
+            self.finish(entry, size, failed=True)
+            raise
+        self.finish(entry, size, time.perf_counter() - start)
+        return results
+
+    def stream(self, prompt, settings, **options):
+        entry, size = self.choose(prompt, settings)
+        try:
+            stream = entry.backend.stream(prompt, settings, **options)
+        except Exception:
+            self.finish(entry, size, failed=True)
+            raise
+        return RoutedStream(self, entry, size, stream)
+
+    def stats(self):
+        """
+        Live numbers per backend: how often it was picked and how fast it
+        has been lately (milliseconds per token of work)
+        """
+        backends = {}
+        with self.lock:
+            for number, entry in enumerate(self.entries):
+                p50 = entry.histogram.percentile(0.5)
+                p90 = entry.histogram.percentile(0.9)
+                backends[f"{number}: {entry.backend.name}"] = {
+                    'chosen': entry.chosen,
+                    'in_flight': entry.in_flight,
+                    'failures': entry.failures,
+                    'p50_ms_per_token': p50 * 1000 if p50 is not None else None,
+                    'p90_ms_per_token': p90 * 1000 if p90 is not None else None,
+                    'histogram': entry.histogram.snapshot(),
+                }
+        return {'target_seconds': self.target_seconds, 'over_target': self.over_target, 'backends': backends}
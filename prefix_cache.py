@@ -0,0 +1,99 @@
+# Student Helper Chatbot - Reusing the System Prompt's KV Cache
+# Every AI prompt starts with the same instructions ("You are a helpful
+# study assistant..."). The model used to read those words again for every
+# single question. Here it reads them ONCE, keeps what it worked out (the
+# "past key values"), and only reads the student's new words each time.
+
+import copy
+import time
+
+
+class PrefixCache:
+    """
+    Remembers the model's attention state for a fixed prompt prefix.
+
+        cache = PrefixCache(model, tokenizer, "You are a helpful ...")
+        cache.generate(full_prompt, max_length=200)
+
+    If a prompt doesn't start with the prefix, it's simply processed the
+    normal way.
+    """
+
+    def __init__(self, model, tokenizer, prefix, default_settings=None):
+        import torch
+
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix = prefix
+        # Settings a pipeline would add on its own (like do_sample=True)
+        self.default_settings = default_settings or {}
+
+        # The last token could merge with the student's text ('\n\n' + 'Student'
+        # is tokenized differently than '\n\n' alone), so we leave it out
+        prefix_ids = tokenizer(prefix, return_tensors="pt")["input_ids"]
+        self.prefix_ids = prefix_ids[:, :-1]
+
+        # Counters for stats()
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+        self.processed_tokens = 0
+
+        self.past_key_values = None
+        self.prefill_seconds = 0.0
+        if self.prefix_ids.shape[-1]:
+            start = time.perf_counter()
+            with torch.no_grad():
+                output = model(self.prefix_ids, use_cache=True)
+            self.past_key_values = output.past_key_values
+            self.prefill_seconds = time.perf_counter() - start
+
+    def prepare(self, prompt):
+        """
+        Returns the keyword arguments for model.generate: the full input_ids
+        plus a copy of the prefix cache when the prompt starts with our prefix
+        """
+        import torch
+
+        inputs = dict(self.tokenizer(prompt, return_tensors="pt"))
+        input_ids = inputs["input_ids"]
+        size = self.prefix_ids.shape[-1]
+
+        if (self.past_key_values is not None and input_ids.shape[-1] > size
+                and torch.equal(input_ids[:, :size], self.prefix_ids)):
+            self.hits += 1
+            self.reused_tokens += size
+            self.processed_tokens += input_ids.shape[-1] - size
+            # generate() adds to the cache, so every call gets its own copy
+            inputs["past_key_values"] = copy.deepcopy(self.past_key_values)
+        else:
+            self.misses += 1
+            self.processed_tokens += input_ids.shape[-1]
+        return inputs
+
+    def generate(self, prompt, **settings):
+        """
+        Same result format as calling a text-generation pipeline
+        """
+        import torch
+
+        settings = {**self.default_settings, **settings}
+        settings.pop('num_return_sequences', None)
+        inputs = self.prepare(prompt)
+        with torch.no_grad():
+            output = self.model.generate(**inputs, **settings)
+        new_tokens = output[0, inputs["input_ids"].shape[-1]:]
+        return [{'generated_text': prompt + self.tokenizer.decode(new_tokens, skip_special_tokens=True)}]
+
+    def stats(self):
+        """
+        How many prompt tokens we skipped thanks to the cache
+        """
+        total = self.reused_tokens + self.processed_tokens
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'reused_tokens': self.reused_tokens,
+            'processed_tokens': self.processed_tokens,
+            'saved_fraction': self.reused_tokens / total if total else 0.0,
+        }
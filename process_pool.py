@@ -0,0 +1,297 @@
+# Student Helper Chatbot - AI Worker Processes
+# Python threads take turns (the "GIL"), so while the AI model is busy
+# writing an answer, the chat and the reminder thread have to wait for
+# their turn. Here the model lives in separate worker PROCESSES instead:
+# they get questions through a queue and send answers back, while the main
+# program stays free to chat and fire reminders on time.
+
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+
+# A worker that dies this many times while loading the model is given up on
+MAX_LOAD_ATTEMPTS = 3
+
+
+def worker_main(worker_id, model_name, pipeline_settings, prefix, quantize, threads, requests, responses):
+    """
+    Runs inside a worker process: loads the model, then answers requests
+    until it receives None
+    """
+    try:
+        import torch
+        from generation_backends import TransformersBackend
+
+        torch.set_num_threads(threads)  # share the CPU fairly between workers
+        backend = TransformersBackend(model_name, prefix=prefix, quantize=quantize, **pipeline_settings)
+    except Exception as e:
+        responses.send(('failed', worker_id, None, repr(e)))
+        return
+
+    responses.send(('ready', worker_id, None, None))
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, prompt, settings = request
+        try:
+            result = backend(prompt, **settings)
+            responses.send(('done', worker_id, request_id, result))
+        except Exception as e:
+            responses.send(('error', worker_id, request_id, repr(e)))
+
+
+class InferenceWorkerPool:
+    """
+    Hosts the text-generation pipeline in `workers` separate processes.
+
+    submit_async(prompt, **settings) returns a Future, just like
+    BatchingScheduler, so the bot can use either one. A worker that crashes
+    is started again; the request it was working on fails with a
+    RuntimeError, so the caller can fall back to a pattern answer.
+
+    Every worker has its own request queue and gets one request at a time,
+    so we always know which request a worker took - even if it dies before
+    saying anything. Requests wait here until a worker is free. Answers
+    come back through a pipe per worker: a worker killed in the middle of
+    sending can only break its own pipe, which is replaced on restart.
+    """
+
+    def __init__(self, model_name, pipeline_settings, prefix="", workers=1, quantize=False,
+                 check_interval=0.5):
+        self.model_name = model_name
+        self.pipeline_settings = pipeline_settings
+        self.prefix = prefix
+        self.workers = workers
+        self.quantize = quantize
+        self.check_interval = check_interval
+        self.threads = max(1, (os.cpu_count() or 1) // workers)
+
+        # 'spawn' starts clean processes (forking a process with threads and
+        # torch loaded can deadlock)
+        self.context = multiprocessing.get_context("spawn")
+
+        self.pending = {}          # request id -> Future
+        self.waiting = deque()     # (request id, prompt, settings) no worker has yet
+        self.idle = set()          # workers with the model loaded and nothing to do
+        self.assigned = {}         # worker id -> request id it is working on
+        self.processes = {}        # worker id -> Process
+        self.request_queues = {}   # worker id -> its own request queue
+        self.response_pipes = {}   # worker id -> the end of its pipe we read
+        self.load_attempts = {}    # worker id -> deaths before the model loaded
+        self.request_ids = itertools.count()
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.running = True
+
+        # Counters for stats()
+        self.restarts = 0
+        self.completed = 0
+        self.failed_ids = set()  # workers that couldn't load the model at all
+        self.last_error = None
+
+        for worker_id in range(workers):
+            self._start_worker(worker_id)
+
+        self.collector = threading.Thread(target=self._collect_responses)
+        self.collector.daemon = True
+        self.collector.start()
+
+        self.watchdog = threading.Thread(target=self._watch_workers)
+        self.watchdog.daemon = True
+        self.watchdog.start()
+
+    @property
+    def failed_workers(self):
+        return len(self.failed_ids)
+
+    def _start_worker(self, worker_id):
+        # A fresh queue and pipe, so nothing from the dead worker is left over
+        self.request_queues[worker_id] = self.context.Queue()
+        reader, writer = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=worker_main,
+            args=(worker_id, self.model_name, self.pipeline_settings, self.prefix, self.quantize,
+                  self.threads, self.request_queues[worker_id], writer)
+        )
+        process.daemon = True
+        process.start()
+        writer.close()  # the worker has its own copy; reading then ends when it dies
+        with self.lock:
+            self.response_pipes[worker_id] = reader
+        self.processes[worker_id] = process
+
+    def wait_until_ready(self, timeout=300):
+        """
+        True once at least one worker has loaded the model (False if none
+        could, or none did within `timeout` seconds)
+        """
+        if not self.ready.wait(timeout):
+            self.last_error = self.last_error or f"the model did not load within {timeout} seconds"
+            return False
+        return self.failed_workers < self.workers
+
+    def submit_async(self, prompt, **settings):
+        if not self.running:
+            raise RuntimeError("The worker pool has been stopped")
+        future = Future()
+        with self.lock:
+            if self.failed_workers >= self.workers:
+                future.set_exception(RuntimeError(f"No AI worker could load the model: {self.last_error}"))
+                return future
+            request_id = next(self.request_ids)
+            self.pending[request_id] = future
+            self.waiting.append((request_id, prompt, settings))
+            self._dispatch()
+        return future
+
+    def submit(self, prompt, timeout=120, **settings):
+        """
+        Waits for the answer (at most `timeout` seconds, then RuntimeError)
+        """
+        future = self.submit_async(prompt, **settings)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()  # only works if no worker has taken it yet
+            raise RuntimeError(f"The AI worker did not answer within {timeout} seconds") from None
+
+    def __call__(self, prompt, **settings):
+        """
+        Lets the pool be used just like a pipeline: pool(prompt, max_length=...)
+        """
+        return self.submit(prompt, **settings)
+
+    def _dispatch(self):
+        """
+        Called with the lock held: hands waiting requests to idle workers
+        """
+        while self.waiting and self.idle:
+            request_id, prompt, settings = self.waiting.popleft()
+            future = self.pending.get(request_id)
+            if future is None or not future.set_running_or_notify_cancel():
+                self.pending.pop(request_id, None)
+                continue  # nobody is waiting for this one any more
+            worker_id = self.idle.pop()
+            self.assigned[worker_id] = request_id
+            self.request_queues[worker_id].put((request_id, prompt, settings))
+
+    def _fail_waiting(self, message):
+        """
+        Called with the lock held: fails every request no worker took yet
+        """
+        while self.waiting:
+            future = self.pending.pop(self.waiting.popleft()[0], None)
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError(message))
+
+    def _worker_failed(self, worker_id, error):
+        """
+        Called with the lock held: this worker will never load the model
+        """
+        self.failed_ids.add(worker_id)
+        self.last_error = error
+        if self.failed_workers >= self.workers:
+            self._fail_waiting(f"No AI worker could load the model: {error}")
+            self.ready.set()  # nobody will ever be ready - stop waiting
+
+    def _collect_responses(self):
+        while self.running:
+            with self.lock:
+                pipes = list(self.response_pipes.values())
+            for pipe in multiprocessing.connection.wait(pipes, timeout=self.check_interval):
+                try:
+                    message = pipe.recv()
+                except (EOFError, OSError):
+                    # The worker is gone - the watchdog starts a new one
+                    with self.lock:
+                        for worker_id, reader in list(self.response_pipes.items()):
+                            if reader is pipe:
+                                del self.response_pipes[worker_id]
+                    pipe.close()
+                    continue
+                self._handle_response(*message)
+
+    def _handle_response(self, kind, worker_id, request_id, payload):
+        with self.lock:
+            if kind == 'ready':
+                self.load_attempts.pop(worker_id, None)
+                self.idle.add(worker_id)
+                self._dispatch()
+                self.ready.set()
+                return
+            if kind == 'failed':
+                self._worker_failed(worker_id, payload)
+                return
+            if self.assigned.get(worker_id) == request_id:
+                del self.assigned[worker_id]
+                self.idle.add(worker_id)
+            future = self.pending.pop(request_id, None)
+            self._dispatch()
+        if future is None or future.done():
+            return  # failed already (the worker was restarted, or the pool stopped)
+        if kind == 'done':
+            self.completed += 1
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(f"AI worker error: {payload}"))
+
+    def _watch_workers(self):
+        """
+        Restarts workers that died (out of memory, segfault, killed, ...)
+        """
+        while self.running:
+            time.sleep(self.check_interval)
+            for worker_id, process in list(self.processes.items()):
+                if process.is_alive() or not self.running or worker_id in self.failed_ids:
+                    continue  # restarting can't fix a model that doesn't load
+                with self.lock:
+                    loaded = worker_id in self.idle or worker_id in self.assigned
+                    self.idle.discard(worker_id)
+                    request_id = self.assigned.pop(worker_id, None)
+                    future = self.pending.pop(request_id, None) if request_id is not None else None
+                    if not loaded:
+                        self.load_attempts[worker_id] = self.load_attempts.get(worker_id, 0) + 1
+                        if self.load_attempts[worker_id] >= MAX_LOAD_ATTEMPTS:
+                            self._worker_failed(worker_id, f"AI worker {worker_id} keeps crashing "
+                                                           f"while loading the model")
+                if future is not None and not future.done():
+                    future.set_exception(RuntimeError(f"AI worker {worker_id} crashed"))
+                if worker_id in self.failed_ids:
+                    continue
+                self.restarts += 1
+                self._start_worker(worker_id)
+
+    def stop(self):
+        """
+        Asks every worker to finish, and stops the ones that don't
+        """
+        if not self.running:
+            return
+        self.running = False
+        for request_queue in self.request_queues.values():
+            request_queue.put(None)
+        for process in self.processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        with self.lock:
+            self.waiting.clear()
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("The worker pool has been stopped"))
+            self.pending.clear()
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'alive': sum(process.is_alive() for process in self.processes.values()),
+            'completed': self.completed,
+            'restarts': self.restarts,
+        }
@@ -0,0 +1,208 @@
+# Student Helper Chatbot - Int8 Quantized AI Model
+# The AI model normally stores every weight as a 32-bit float. On a laptop
+# without a graphics card we can squeeze the big layers into 8-bit
+# integers instead: about 4x less memory for those layers and faster
+# answers, with almost the same replies. This is OPT-IN - pass
+# quantize=True to setup_ai_model() or UltimateStudentBot().
+
+import os
+import re
+import warnings
+
+# Quantized models are saved here so the next start can skip quantizing
+QUANTIZED_CACHE_DIR = "quantized_models"
+
+
+def linear_from_conv1d(conv):
+    """
+    GPT-2 style models (like DialoGPT) use a 'Conv1D' layer that is really
+    a Linear layer with its weight stored the other way round. Dynamic
+    quantization only knows nn.Linear, so we convert it first.
+    """
+    import torch
+
+    in_features, out_features = conv.weight.shape
+    linear = torch.nn.Linear(in_features, out_features)
+    with torch.no_grad():
+        linear.weight.copy_(conv.weight.t())
+        linear.bias.copy_(conv.bias)
+    return linear
+
+
+def replace_conv1d_layers(model):
+    """
+    Swaps every GPT-2 'Conv1D' layer for an equivalent nn.Linear
+    """
+    try:
+        from transformers.pytorch_utils import Conv1D
+    except ImportError:
+        return model
+
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                setattr(parent, name, linear_from_conv1d(child))
+    return model
+
+
+def quantize_model(model):
+    """
+    Turns every Linear layer of the model into an int8 dynamically
+    quantized one (weights stored as int8, activations quantized on the fly)
+    """
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    model = replace_conv1d_layers(model).eval()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # torch warns that this API will move
+        return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def empty_quantized_model(model_name, local_files_only=False):
+    """
+    Builds the int8 model's SHAPE without quantizing anything - the real
+    weights come from the cache file afterwards
+    """
+    import torch
+    import torch.ao.nn.quantized.dynamic as quantized
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    # Random starting weights would be thrown away anyway, so skip making them
+    try:
+        from transformers.initialization import no_init_weights
+    except ImportError:
+        try:
+            from transformers.modeling_utils import no_init_weights
+        except ImportError:
+            from contextlib import nullcontext as no_init_weights
+
+    try:
+        from transformers.pytorch_utils import Conv1D
+    except ImportError:
+        Conv1D = None
+
+    with no_init_weights():
+        model = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(model_name, local_files_only=local_files_only))
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if type(child) is torch.nn.Linear:
+                shape = (child.in_features, child.out_features, child.bias is not None)
+            elif Conv1D is not None and isinstance(child, Conv1D):
+                shape = (child.weight.shape[0], child.weight.shape[1], True)
+            else:
+                continue
+            in_features, out_features, has_bias = shape
+            setattr(parent, name, quantized.Linear(in_features, out_features, bias_=has_bias, dtype=torch.qint8))
+    return model.eval()
+
+
+def int8_state_dict(model):
+    """
+    The model's weights as plain tensors. An int8 layer is saved as its raw
+    int8 numbers plus scale and zero point, which torch can save and load
+    safely (pickling the quantized tensors directly is fragile).
+    """
+    import torch
+    import torch.ao.nn.quantized.dynamic as quantized
+
+    state = {}
+    quantized_names = set()
+    for name, module in model.named_modules():
+        if isinstance(module, quantized.Linear):
+            weight, bias = module._weight_bias()
+            if weight.qscheme() not in (torch.per_tensor_affine, torch.per_tensor_symmetric):
+                raise ValueError(f"Unsupported int8 scheme in {name}")
+            state[f"{name}.int8_weight"] = weight.int_repr()
+            state[f"{name}.scale"] = torch.tensor(weight.q_scale(), dtype=torch.float64)
+            state[f"{name}.zero_point"] = torch.tensor(weight.q_zero_point())
+            if bias is not None:
+                state[f"{name}.bias"] = bias.detach()
+            quantized_names.add(name + ".")
+
+    for key, value in model.state_dict().items():
+        if isinstance(value, torch.Tensor) and not any(key.startswith(prefix) for prefix in quantized_names):
+            state[key] = value
+    return state
+
+
+def load_int8_state_dict(model, state):
+    """
+    Puts weights saved by int8_state_dict back into an empty_quantized_model
+    """
+    import torch
+    import torch.ao.nn.quantized.dynamic as quantized
+
+    state = dict(state)
+    for name, module in model.named_modules():
+        if isinstance(module, quantized.Linear):
+            weight = torch._make_per_tensor_quantized_tensor(
+                state.pop(f"{name}.int8_weight"),
+                state.pop(f"{name}.scale").item(),
+                int(state.pop(f"{name}.zero_point").item()))
+            module.set_weight_bias(weight, state.pop(f"{name}.bias", None))
+
+    # Everything else (embeddings, layer norms, ...) is a normal tensor
+    targets = dict(model.named_parameters())
+    targets.update(model.named_buffers())
+    with torch.no_grad():
+        for key, value in state.items():
+            if key in targets:
+                targets[key].copy_(value)
+    return model
+
+
+def quantized_cache_path(model_name, cache_dir=QUANTIZED_CACHE_DIR):
+    """
+    One file per model and torch version (the int8 format can change between versions)
+    """
+    import torch
+
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+    return os.path.join(cache_dir, f"{safe_name}-int8-torch{torch.__version__}.pt")
+
+
+def load_quantized_model(model_name, cache_dir=QUANTIZED_CACHE_DIR, source=None):
+    """
+    Returns the int8 model, from the disk cache if we quantized it before.
+    source is a local folder to read the model from instead of the hub
+    (like the model registry's copy, see model_registry.py).
+    """
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    path = quantized_cache_path(model_name, cache_dir)
+    if os.path.exists(path):
+        try:
+            model = empty_quantized_model(source or model_name, local_files_only=source is not None)
+            return load_int8_state_dict(model, torch.load(path, weights_only=True))
+        except Exception as e:
+            print(f"⚠️ Quantized model cache unreadable ({e}), quantizing again...")
+
+    model = quantize_model(AutoModelForCausalLM.from_pretrained(source or model_name,
+                                                                local_files_only=source is not None))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = path + ".tmp"
+        torch.save(int8_state_dict(model), temp_path)
+        os.replace(temp_path, path)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not cache the quantized model: {e}")
+    return model
+
+
+def model_size_bytes(model):
+    """
+    How many bytes the model's weights take (int8 layers count as packed)
+    """
+    import torch.ao.nn.quantized.dynamic as quantized
+
+    tensors = list(model.parameters()) + list(model.buffers())
+    for module in model.modules():
+        if isinstance(module, quantized.Linear):
+            weight, bias = module._weight_bias()
+            tensors += [weight] if bias is None else [weight, bias]
+
+    # Shared weights (like GPT-2's tied embeddings) only count once
+    unique = {tensor.data_ptr(): tensor for tensor in tensors}
+    return sum(tensor.numel() * tensor.element_size() for tensor in unique.values())
@@ -0,0 +1,217 @@
+# Student Helper Chatbot - AI Response Cache
+# Asking the AI model the same question twice used to cost the full
+# generation time twice. This cache remembers answers in memory (fast) and
+# on disk (so they survive a restart), and forgets the least recently used
+# ones when it gets too big.
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+
+def normalize_prompt(prompt):
+    """
+    'What is  GPA?' and 'what is gpa' should share one cache entry
+    """
+    prompt = re.sub(r'\s+', ' ', prompt.lower()).strip()
+    return prompt.rstrip('?!. ')
+
+
+class ResponseCache:
+    """
+    Two-level LRU cache for AI answers.
+
+    The key is the normalized prompt PLUS the generation settings
+    (model name, max_length, temperature, ...), so changing a setting never
+    returns an answer made with the old one.
+
+    Cacheable policy: with do_sample=True the model gives a different answer
+    every time, so those answers are NOT cached unless cache_sampled=True
+    says that reusing one of them is fine. Answers shorter than min_length
+    (empty or broken generations) are never cached - one of them would be
+    served again for every repeat of the question.
+    """
+
+    def __init__(self, folder="ai_response_cache", memory_size=256,
+                 disk_max_bytes=5_000_000, cache_sampled=False, min_length=10):
+        self.folder = folder
+        self.memory_size = memory_size
+        self.disk_max_bytes = disk_max_bytes
+        self.cache_sampled = cache_sampled
+        self.min_length = min_length
+
+        self.memory = OrderedDict()  # key -> entry (most recently used at the end)
+        self.disk_index = None       # key -> file size, read on first use
+        self.lock = threading.Lock()
+
+        # Counters for stats()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.saved_seconds = 0.0
+
+    def is_cacheable(self, params):
+        """
+        Sampled answers are only reused when we explicitly allow it
+        """
+        return self.cache_sampled or not params.get('do_sample', False)
+
+    def make_key(self, prompt, params):
+        settings = json.dumps(params, sort_keys=True, default=str)
+        text = normalize_prompt(prompt) + '\n' + settings
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.folder, key + '.json')
+
+    def _load_disk_index(self):
+        """
+        Looks at the cache folder once, so we know what is stored and how big it is
+        """
+        if self.disk_index is not None:
+            return
+        self.disk_index = OrderedDict()
+        if not os.path.isdir(self.folder):
+            return
+
+        files = []
+        for name in os.listdir(self.folder):
+            if name.endswith('.json'):
+                info = os.stat(os.path.join(self.folder, name))
+                files.append((info.st_mtime, name[:-5], info.st_size))
+
+        # Oldest first, just like the memory LRU (file time = last used)
+        for _, key, size in sorted(files):
+            self.disk_index[key] = size
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get(self, prompt, params):
+        """
+        Returns the cached answer, or None
+        """
+        if not self.is_cacheable(params):
+            return None
+
+        key = self.make_key(prompt, params)
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory_hits += 1
+                self.memory.move_to_end(key)
+            else:
+                entry = self._read_from_disk(key)
+                if entry is None:
+                    self.misses += 1
+                    return None
+                self.disk_hits += 1
+                self._remember(key, entry)
+
+            self.saved_seconds += entry.get('seconds', 0.0)
+            return entry['response']
+
+    def _read_from_disk(self, key):
+        self._load_disk_index()
+        if key not in self.disk_index:
+            return None
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(self._path(key))  # mark as recently used
+        except (OSError, ValueError):
+            # Someone deleted or broke the file - just treat it as a miss
+            self.disk_index.pop(key, None)
+            return None
+        self.disk_index.move_to_end(key)
+        return entry
+
+    def put(self, prompt, params, response, seconds=0.0):
+        """
+        Stores an answer. seconds is how long the model took, so a later
+        hit knows how much time it saved.
+        """
+        if not self.is_cacheable(params) or len(str(response).strip()) < self.min_length:
+            with self.lock:
+                self.skipped += 1
+            return
+
+        key = self.make_key(prompt, params)
+        entry = {
+            'prompt': prompt,
+            'params': params,
+            'response': response,
+            'seconds': seconds,
+        }
+        with self.lock:
+            self._remember(key, entry)
+            self._write_to_disk(key, entry)
+
+    def _write_to_disk(self, key, entry):
+        self._load_disk_index()
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            data = json.dumps(entry, default=str)
+            # Write to a temp file first so a crash never leaves half an entry
+            temp_path = self._path(key) + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            print(f"⚠️ Could not save AI answer to cache: {e}")
+            return
+
+        self.disk_index[key] = len(data.encode('utf-8'))
+        self.disk_index.move_to_end(key)
+        self._evict_from_disk()
+
+    def _evict_from_disk(self):
+        """
+        Deletes the least recently used files until we fit in disk_max_bytes
+        """
+        total = sum(self.disk_index.values())
+        while total > self.disk_max_bytes and len(self.disk_index) > 1:
+            key, size = self.disk_index.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Forgets everything, in memory and on disk
+        """
+        with self.lock:
+            self.memory.clear()
+            self._load_disk_index()
+            for key in list(self.disk_index):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self.disk_index.clear()
+
+    def stats(self):
+        """
+        Hit rate and how much generation time the cache saved
+        """
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'skipped': self.skipped,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'saved_seconds': self.saved_seconds,
+            'memory_entries': len(self.memory),
+            'disk_entries': len(self.disk_index or {}),
+        }
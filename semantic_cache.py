@@ -0,0 +1,269 @@
+# Student Helper Chatbot - Semantic Answer Cache
+# The normal answer cache only helps when a question is asked with exactly
+# the same words. "How do I study better?" and "How can I study more
+# effectively?" mean the same thing, but both used to cost a full AI answer.
+# This cache turns every answered question into a vector of numbers and
+# reuses an old answer when a new question points in (almost) the same
+# direction.
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+# NumPy does the fast matrix math for us
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from semantic_tier import STOPWORDS
+
+# Words that only say "this is a question" - they don't change the topic
+QUESTION_WORDS = {
+    'how', 'what', 'why', 'explain', 'tell', 'more', 'could', 'would', 'way', 'ways',
+    'best', 'tips', 'help', 'need', 'want', 'get', 'any', 'good',
+}
+
+# Different words students use for the same thing
+SYNONYMS = {
+    'effectively': 'better', 'effective': 'better', 'efficiently': 'better', 'well': 'better',
+    'improve': 'better', 'stressed': 'stress', 'anxious': 'stress', 'anxiety': 'stress',
+    'worried': 'stress', 'procrastinating': 'procrastinate', 'procrastination': 'procrastinate',
+    'manage': 'management', 'managing': 'management', 'exams': 'exam', 'test': 'exam',
+    'tests': 'exam', 'studying': 'study', 'learn': 'study',
+}
+
+
+def embed_question(text, dimensions=512):
+    """
+    Turns a question into a vector of length 1.
+
+    Words, word pairs and 3-letter pieces of words are "hashed" into a
+    fixed number of slots, so we never need a vocabulary list and every
+    vector has the same size. The 3-letter pieces make 'procrastinate'
+    and 'procrastinating' look alike.
+    """
+    words = [SYNONYMS.get(word, word) for word in re.findall(r"[a-z0-9']+", text.lower())]
+    words = [word for word in words if word not in STOPWORDS and word not in QUESTION_WORDS]
+
+    features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [padded[start:start + 3] for start in range(len(padded) - 2)]
+
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature in features:
+        number = zlib.crc32(feature.encode('utf-8'))
+        # The sign spreads out collisions, so they cancel instead of adding up
+        vector[number % dimensions] += 1.0 if number & 0x80000000 else -1.0
+    length = np.linalg.norm(vector)
+    return vector / length if length else vector
+
+
+class SemanticAnswerCache:
+    """
+    Nearest-neighbour cache for AI answers.
+
+    All question vectors live in ONE preallocated matrix (capacity rows),
+    stored on disk as a memory-mapped .npy file, so a lookup is a single
+    matrix-vector product. A cached answer is only reused for the same
+    model settings (params), and when the similarity is at least threshold.
+    When the cache is full, the least recently used row is replaced.
+
+    The answers are written to disk after every save_every new ones (and
+    by flush(), which also runs when the program ends) - not after each
+    one, since the file holds ALL answers. The vectors go to their file
+    straight away, so after a crash a row may hold a newer vector than
+    its saved answer. Every saved answer therefore keeps a checksum of its
+    vector, and rows whose vector doesn't match are dropped on loading -
+    the AI simply writes those answers again.
+
+        cache = SemanticAnswerCache("ai_semantic_cache")
+        cache.put("how do I study better", {'model': 'x'}, "Make a plan ...")
+        cache.get("how can I study more effectively", {'model': 'x'})  # -> "Make a plan ..."
+    """
+
+    def __init__(self, folder="ai_semantic_cache", capacity=1024, dimensions=512, threshold=0.75, embed=None,
+                 save_every=20):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("The semantic cache needs numpy: pip install numpy")
+
+        self.folder = folder
+        self.capacity = capacity
+        self.dimensions = dimensions
+        self.threshold = threshold
+        self.save_every = save_every
+        self.embed = embed or (lambda text: embed_question(text, dimensions))
+        self.lock = threading.Lock()
+
+        # One entry per row: the question, its answer and the settings id
+        self.entries = [None] * capacity
+        self.last_used = np.zeros(capacity, dtype=np.int64)  # 0 means "empty row"
+        self.param_ids = np.zeros(capacity, dtype=np.int64)
+        self.clock = 0
+        self.unsaved = 0     # answers added since the last save
+        self.dirty = False   # anything (also "recently used") changed since then
+
+        # Counters for stats()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lookup_seconds = 0.0
+
+        os.makedirs(folder, exist_ok=True)
+        self.vectors_path = os.path.join(folder, "vectors.npy")
+        self.entries_path = os.path.join(folder, "entries.json")
+        self.vectors = self._open_vectors()
+        self._load_entries()
+
+    def _open_vectors(self):
+        """
+        Opens the vector file (or creates it) without reading it into memory
+        """
+        if os.path.exists(self.vectors_path):
+            try:
+                vectors = np.load(self.vectors_path, mmap_mode='r+')
+                if vectors.shape == (self.capacity, self.dimensions) and vectors.dtype == np.float32:
+                    return vectors
+            except (OSError, ValueError):
+                pass  # broken or made with other settings - start over
+        return np.lib.format.open_memmap(self.vectors_path, mode='w+', dtype=np.float32,
+                                         shape=(self.capacity, self.dimensions))
+
+    def _load_entries(self):
+        try:
+            with open(self.entries_path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get('capacity') != self.capacity or saved.get('dimensions') != self.dimensions:
+            return
+
+        self.clock = saved['clock']
+        for row, entry in saved['rows'].items():
+            row = int(row)
+            if entry.get('vector_check') != self._vector_check(row):
+                continue  # the row got a new vector, but its answer wasn't saved
+            self.entries[row] = entry
+            self.last_used[row] = entry['last_used']
+            self.param_ids[row] = entry['params_id']
+
+    def _vector_check(self, row):
+        return zlib.crc32(self.vectors[row].tobytes())
+
+    def _params_id(self, params):
+        return zlib.crc32(json.dumps(params, sort_keys=True, default=str).encode('utf-8')) + 1
+
+    def _nearest(self, vector, params_id):
+        """
+        Returns (row, similarity) of the most similar question with the same settings
+        """
+        scores = self.vectors @ vector
+        scores[(self.last_used == 0) | (self.param_ids != params_id)] = -1.0
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def get(self, question, params):
+        """
+        Returns the answer to the most similar earlier question, or None
+        """
+        start = time.perf_counter()
+        vector = self.embed(question)
+        answer = None
+        with self.lock:
+            if vector.any():
+                row, score = self._nearest(vector, self._params_id(params))
+                if score >= self.threshold:
+                    self.clock += 1
+                    self.last_used[row] = self.clock
+                    self.entries[row]['last_used'] = self.clock
+                    answer = self.entries[row]['answer']
+                    self._changed()
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self.lookup_seconds += time.perf_counter() - start
+        return answer
+
+    def put(self, question, params, answer):
+        """
+        Remembers an answer. Asking (nearly) the same question again
+        replaces the old answer instead of using up another row.
+        """
+        vector = self.embed(question)
+        if not vector.any():
+            return
+        params_id = self._params_id(params)
+
+        with self.lock:
+            row, score = self._nearest(vector, params_id)
+            if score < 0.999:
+                row = int(np.argmin(self.last_used))  # an empty row, or the oldest one
+                if self.last_used[row]:
+                    self.evictions += 1
+
+            self.clock += 1
+            self.vectors[row] = vector
+            self.last_used[row] = self.clock
+            self.param_ids[row] = params_id
+            self.entries[row] = {'question': question, 'answer': answer,
+                                 'params_id': params_id, 'last_used': self.clock,
+                                 'vector_check': self._vector_check(row)}
+            self.unsaved += 1
+            self._changed()
+            if self.unsaved >= self.save_every:
+                self._save_entries()
+
+    def _changed(self):
+        """
+        Called with the lock held: something needs saving (at the latest
+        when the program ends)
+        """
+        if not self.dirty:
+            self.dirty = True
+            atexit.register(self.flush)
+
+    def _save_entries(self):
+        """
+        Writes the answers next to the vector file (to a temporary file
+        first, so a crash never leaves half a file behind)
+        """
+        self.vectors.flush()  # vectors first, so no saved answer points at a missing vector
+        rows = {str(row): entry for row, entry in enumerate(self.entries) if entry is not None}
+        saved = {'capacity': self.capacity, 'dimensions': self.dimensions, 'clock': self.clock, 'rows': rows}
+        temporary = self.entries_path + '.tmp'
+        try:
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(saved, f)
+            os.replace(temporary, self.entries_path)
+        except OSError:
+            return  # the answers still work from memory; the next save tries again
+        self.unsaved = 0
+        if self.dirty:
+            self.dirty = False
+            atexit.unregister(self.flush)
+
+    def flush(self):
+        """
+        Makes sure everything (including which answers were used recently) is on disk
+        """
+        with self.lock:
+            if self.dirty:
+                self._save_entries()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': int(np.count_nonzero(self.last_used)),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'avg_lookup_ms': self.lookup_seconds / lookups * 1000 if lookups else 0.0,
+        }
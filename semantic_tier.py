@@ -0,0 +1,148 @@
+# Student Helper Chatbot - Semantic Intent Tier (TF-IDF)
+# When none of our regex patterns match, we used to ask the big AI model
+# straight away (slow!). This tier first compares the question with example
+# questions we already have good answers for - using a bit of math instead
+# of a whole neural network.
+
+import math
+import random
+import re
+import time
+
+# NumPy does the fast matrix math for us
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Little words that appear in almost every question and only add noise
+STOPWORDS = {
+    'a', 'an', 'the', 'i', 'im', "i'm", 'me', 'my', 'to', 'is', 'are', 'am', 'can',
+    'do', 'does', 'you', 'your', 'some', 'of', 'for', 'with', 'and', 'it', 'be',
+    'should', 'please', 'give', 'really', 'so', 'too', 'about', 'on', 'in', 'at',
+    # Question words: "how do I cook pasta" must not look like "how are you"
+    'how', 'what', 'whats', "what's", 'why', 'when', 'where', 'which', 'who',
+}
+
+
+def tokenize(text):
+    """
+    'How can I study better?' -> ['how', 'study', 'better', 'how study', 'study better']
+    Word pairs help tell 'time management' apart from just 'time'.
+    """
+    words = [word for word in re.findall(r"[a-z0-9']+", text.lower()) if word not in STOPWORDS]
+    pairs = [f"{first} {second}" for first, second in zip(words, words[1:])]
+    return words + pairs
+
+
+class SemanticIntentTier:
+    """
+    Scores a question against example questions for every intent.
+
+    intents looks like:
+        {'stress': {'examples': ['i feel stressed', ...], 'responses': [...]}, ...}
+
+    All examples become rows of one TF-IDF matrix, so scoring a new question
+    is a single matrix-vector product.
+    """
+
+    def __init__(self, intents, threshold=0.55):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("The semantic tier needs numpy: pip install numpy")
+
+        self.intents = intents
+        self.threshold = threshold
+
+        # Counters for the deflection report
+        self.answered = 0
+        self.passed_on = 0
+        self.total_seconds = 0.0
+
+        example_tokens = []
+        self.row_intents = []
+        for intent, data in intents.items():
+            for example in data['examples']:
+                example_tokens.append(tokenize(example))
+                self.row_intents.append(intent)
+
+        # Vocabulary: every word (or word pair) we have seen -> column number
+        self.vocabulary = {}
+        document_counts = {}
+        for tokens in example_tokens:
+            for token in set(tokens):
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+                document_counts[token] = document_counts.get(token, 0) + 1
+
+        # Rare words tell us more than common ones (IDF = inverse document frequency)
+        total = len(example_tokens)
+        self.idf = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for token, column in self.vocabulary.items():
+            self.idf[column] = math.log((1 + total) / (1 + document_counts[token])) + 1
+        self.unknown_idf = float(self.idf.mean())  # a word in no example counts like a typical word
+
+        # One row per example, scaled to length 1 so dot product = cosine similarity
+        self.matrix = np.zeros((total, len(self.vocabulary)), dtype=np.float32)
+        for row, tokens in enumerate(example_tokens):
+            for token in tokens:
+                self.matrix[row, self.vocabulary[token]] += 1
+        self.matrix *= self.idf
+        self.matrix /= np.linalg.norm(self.matrix, axis=1, keepdims=True) + 1e-9
+
+    def vectorize(self, text):
+        """
+        Turns a question into a TF-IDF vector with the same columns as the matrix.
+
+        Words none of our examples use have no column, but they still count
+        towards the vector's length (like a typical word): the one shared
+        word in "i love pizza and chess a lot" ('lot', as in "thanks a lot")
+        mustn't make it look like a perfect match.
+        """
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        unknown = 0
+        for token in tokenize(text):
+            column = self.vocabulary.get(token)
+            if column is not None:
+                vector[column] += 1
+            elif ' ' not in token:
+                unknown += 1  # (new pairs of known words are just rewording)
+        vector *= self.idf
+        length = math.sqrt(float(vector @ vector) + unknown * self.unknown_idf ** 2)
+        return vector / length if length else vector
+
+    def classify(self, text):
+        """
+        Returns (best intent, similarity score) - the score is between 0 and 1
+        """
+        scores = self.matrix @ self.vectorize(text)
+        best_row = int(np.argmax(scores))
+        return self.row_intents[best_row], float(scores[best_row])
+
+    def respond(self, text):
+        """
+        Returns a canned answer if the question is close enough to one of our
+        examples, or None so the caller can try the AI model instead
+        """
+        start = time.perf_counter()
+        intent, score = self.classify(text)
+        self.total_seconds += time.perf_counter() - start
+
+        if score >= self.threshold:
+            self.answered += 1
+            return random.choice(self.intents[intent]['responses'])
+
+        self.passed_on += 1
+        return None
+
+    def stats(self):
+        """
+        How many questions this tier answered vs passed on to the AI
+        """
+        checked = self.answered + self.passed_on
+        return {
+            'answered': self.answered,
+            'passed_on': self.passed_on,
+            'deflection_rate': self.answered / checked if checked else 0.0,
+            'avg_ms': self.total_seconds / checked * 1000 if checked else 0.0,
+        }
@@ -6,6 +6,8 @@ import re
 import random
 from datetime import datetime
 
+from intent_router import IntentRouter, MAX_INPUT_LENGTH
+
 def greet_student():
     """
     Welcome message for our smart chatbot
@@ -71,6 +73,12 @@ class SmartStudentBot:
             ]
         }
         
+        # Very long messages (like a pasted transcript) are cut to this size
+        self.max_input_length = MAX_INPUT_LENGTH
+        
+        # Prepare the whole pattern table once into a single fast matcher
+        self.router = IntentRouter(self.patterns, max_input_length=self.max_input_length)
+        
         # Multiple response variations to sound more natural
         self.responses = {
             'gpa_question': [
@@ -123,17 +131,16 @@ class SmartStudentBot:
         """
         user_input = user_input.lower().strip()
         
-        for intent, patterns in self.patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, user_input):
-                    return intent
-        
-        return 'unknown'
+        # One scan over the precompiled table (first intent still wins)
+        return self.router.match(user_input)
     
     def get_response(self, user_input):
         """
         Generates an intelligent response based on user input
         """
+        # Only look at the first part of very long messages
+        user_input = user_input[:self.max_input_length]
+        
         intent = self.match_pattern(user_input)
         
         # Special handling for CGPA calculation
@@ -0,0 +1,180 @@
+# Student Helper Chatbot - Streaming AI Answers
+# On a normal computer the AI needs a few seconds for a full answer, and we
+# used to show nothing until it was completely done. Streaming prints the
+# answer word by word while the model is still writing it - just like
+# ChatGPT does!
+
+import threading
+import time
+
+# The model sometimes starts writing the student's next message itself
+STOP_TEXTS = ("Student:",)
+
+
+class StopTextFilter:
+    """
+    Passes text through until one of the stop texts shows up.
+    A piece that MIGHT be the start of a stop text ('Stud...') is held back
+    until we know for sure, so 'Student:' is never half-printed.
+    """
+
+    def __init__(self, stop_texts=STOP_TEXTS):
+        self.stop_texts = stop_texts
+        self.pending = ""
+        self.stopped = False
+
+    def feed(self, piece):
+        """
+        Returns the text that is safe to show now
+        """
+        if self.stopped:
+            return ""
+        self.pending += piece
+
+        for stop_text in self.stop_texts:
+            position = self.pending.find(stop_text)
+            if position >= 0:
+                self.stopped = True
+                safe, self.pending = self.pending[:position], ""
+                return safe
+
+        # Keep back the longest ending that could still grow into a stop text
+        keep = 0
+        for stop_text in self.stop_texts:
+            for size in range(min(len(stop_text) - 1, len(self.pending)), 0, -1):
+                if stop_text.startswith(self.pending[-size:]):
+                    keep = max(keep, size)
+                    break
+        safe = self.pending[:len(self.pending) - keep]
+        self.pending = self.pending[len(self.pending) - keep:]
+        return safe
+
+    def flush(self):
+        """
+        The answer is finished - whatever was held back is normal text after all
+        """
+        rest, self.pending = self.pending, ""
+        return "" if self.stopped else rest
+
+
+class TokenStream:
+    """
+    Runs model.generate in a background thread and lets us loop over the
+    answer as it is written:
+
+        stream = TokenStream(ai_pipeline, prompt, {'max_length': 200})
+        for piece in stream:
+            print(piece, end="", flush=True)
+
+    Afterwards stream.text is the full answer, stream.tokens the number of
+    tokens generated and stream.first_token_seconds the time to the first
+    visible piece.
+    """
+
+    def __init__(self, ai_pipeline, prompt, settings, stop_texts=STOP_TEXTS, prefix_cache=None):
+        self.ai_pipeline = ai_pipeline
+        self.prompt = prompt
+        self.settings = dict(settings)
+        self.stop_texts = stop_texts
+        self.prefix_cache = prefix_cache  # skips re-reading the system prompt
+
+        self.text = ""
+        self.tokens = 0
+        self.first_token_seconds = None
+        self.total_seconds = None
+        self.stopped_early = False
+
+    def __iter__(self):
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+        tokenizer = self.ai_pipeline.tokenizer
+        model = self.ai_pipeline.model
+        if self.prefix_cache is not None and self.prefix_cache.model is model:
+            inputs = self.prefix_cache.prepare(self.prompt)
+        else:
+            inputs = tokenizer(self.prompt, return_tensors="pt")
+        prompt_length = inputs["input_ids"].shape[-1]
+        stream = self
+
+        class StopAtNewTurn(StoppingCriteria):
+            """
+            Counts tokens and stops generating once a stop text appears
+            """
+            def __call__(self, input_ids, scores, **kwargs):
+                new_tokens = input_ids[0, prompt_length:]
+                stream.tokens = len(new_tokens)
+                written = tokenizer.decode(new_tokens, skip_special_tokens=True)
+                return any(stop_text in written for stop_text in stream.stop_texts)
+
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self.settings.pop('num_return_sequences', None)
+        errors = []
+
+        def generate():
+            try:
+                model.generate(**inputs, streamer=streamer,
+                               stopping_criteria=StoppingCriteriaList([StopAtNewTurn()]),
+                               **self.settings)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()  # otherwise the loop below would wait forever
+
+        generation = threading.Thread(target=generate)
+
+        start = time.perf_counter()
+        generation.daemon = True
+        generation.start()
+
+        stop_filter = StopTextFilter(self.stop_texts)
+        for piece in streamer:
+            visible = stop_filter.feed(piece)
+            if visible:
+                if self.first_token_seconds is None:
+                    self.first_token_seconds = time.perf_counter() - start
+                self.text += visible
+                yield visible
+            if stop_filter.stopped:
+                self.stopped_early = True
+                break
+
+        rest = stop_filter.flush()
+        if rest:
+            self.text += rest
+            yield rest
+        generation.join()
+        self.total_seconds = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+
+    def stats(self):
+        """
+        Time-to-first-token and token count for this turn
+        """
+        return {
+            'first_token_seconds': self.first_token_seconds,
+            'total_seconds': self.total_seconds,
+            'tokens': self.tokens,
+            'stopped_early': self.stopped_early,
+        }
+
+
+def hold_back_short_answers(pieces, min_length, on_too_short=None):
+    """
+    Waits until the answer is at least min_length characters long before
+    showing anything. If the whole answer stays shorter, on_too_short()
+    decides what to show instead (or nothing, if it returns None).
+    """
+    buffered = ""
+    for piece in pieces:
+        if buffered is None:
+            yield piece
+            continue
+        buffered += piece
+        if len(buffered.strip()) >= min_length:
+            yield buffered.lstrip()
+            buffered = None
+
+    if buffered is not None and on_too_short:
+        replacement = on_too_short(buffered.strip())
+        if replacement:
+            yield replacement
@@ -0,0 +1,407 @@
+# Student Helper Chatbot - Append-Only Journal for Student Data
+# Every new grade, reminder or goal used to rewrite ALL of student_data.json,
+# so saving got slower the longer a student used the bot. Now each change is
+# one short line added to the end of a journal file. At startup the journal
+# is replayed on top of student_data.json (the "snapshot"), and every now
+# and then a background thread folds the journal into a new snapshot, so
+# the journal never grows forever.
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Lets several programs take turns writing the same file (not on Windows)
+try:
+    import fcntl
+    FILE_LOCKING_AVAILABLE = True
+except ImportError:
+    FILE_LOCKING_AVAILABLE = False
+
+DEFAULT_STUDENT_DATA = {'subjects': {}, 'reminders': [], 'goals': [], 'study_sessions': []}
+
+# Key inside the snapshot that says which journal lines it already contains
+POSITION_KEY = 'journal_position'
+
+
+@contextmanager
+def data_file_lock(data_file):
+    """
+    Only one program at a time gets past this for the same data_file. The
+    lock is "advisory": it only works if every program writing the file
+    uses it. It sits on a separate .lock file, because data_file itself is
+    replaced by a new file on every write.
+    """
+    if not FILE_LOCKING_AVAILABLE:
+        yield
+        return
+    with open(data_file + '.lock', 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def journal_path_for(data_file):
+    """
+    'student_data.json' -> 'student_data.journal.jsonl'
+    """
+    return os.path.splitext(data_file)[0] + '.journal.jsonl'
+
+
+def apply_change(data, change):
+    """
+    Applies one journal line to the data. 'path' leads from the top of the
+    data to the thing that changes, e.g.
+        {'op': 'append', 'path': ['subjects', 'Math'], 'value': 8.5}
+        {'op': 'set', 'path': ['reminders', 3, 'notified'], 'value': True}
+    """
+    *parents, last = change['path']
+    target = data
+    for key in parents:
+        target = target[key]
+    if change['op'] == 'append':
+        target.setdefault(last, []).append(change['value'])
+    elif change['op'] == 'set':
+        target[last] = change['value']
+    else:
+        raise ValueError(f"Unknown journal operation: {change['op']}")
+
+
+def read_snapshot(data_file):
+    """
+    Returns (data, journal position) - a missing or broken file is a fresh start
+    """
+    try:
+        with open(data_file, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    for key, empty in DEFAULT_STUDENT_DATA.items():
+        data.setdefault(key, type(empty)())
+    return data, data.pop(POSITION_KEY, 0)
+
+
+def replay(data, path, position, offset=0):
+    """
+    Applies the journal lines after `position` to data, starting `offset`
+    bytes into the file. Returns (last position seen, bytes read). A
+    half-written last line (the program died while writing it) is cut off,
+    so new lines are never glued to it - only call this with
+    data_file_lock held, or that line could be one still being written.
+    """
+    if not os.path.exists(path):
+        return position, offset
+    with open(path, 'rb+') as f:
+        f.seek(offset)
+        good_end = offset
+        for line in f:
+            try:
+                change = json.loads(line)
+            except ValueError:
+                f.truncate(good_end)
+                break
+            good_end += len(line)
+            if change['n'] > position:
+                apply_change(data, change)
+                position = change['n']
+    return position, good_end
+
+
+def file_signature(path):
+    """
+    (inode, modification time, size) - changes whenever the file is
+    written or swapped for a new one. None if there is no file.
+    """
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return (info.st_ino, info.st_mtime_ns, info.st_size)
+
+
+def write_snapshot(data_file, data, position):
+    """
+    Writes student_data.json the way it always looked (plus the journal
+    position), to a temporary file first so a crash never leaves half a file
+    """
+    temporary = data_file + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump({**data, POSITION_KEY: position}, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, data_file)
+
+
+class StudentDataJournal:
+    """
+    Keeps the student data in memory and logs every change to a journal.
+
+        journal = StudentDataJournal("student_data.json")
+        data = journal.load()
+        journal.append(['subjects', 'Math'], 8.5)     # data changes too
+
+    Lines are handed to the operating system straight away (so they survive
+    the program crashing), but the slow fsync() that makes them survive a
+    power cut is done for many lines at once, at most sync_interval seconds
+    after a change. After compact_every changes the journal is moved aside
+    and a background thread folds it into a new snapshot.
+
+    Several bots may share one journal. Every change takes the data file
+    lock (see data_file_lock), first reads the lines the others added since
+    last time, and only then numbers and writes its own line - so the
+    numbers keep going up whoever writes, and replay() never skips a line.
+    A bot that finds the journal swapped for a new one (another bot
+    compacted it) reads everything again.
+    """
+
+    def __init__(self, data_file="student_data.json", sync_interval=0.1, compact_every=1000):
+        self.data_file = data_file
+        self.journal_path = journal_path_for(data_file)
+        self.compacting_path = self.journal_path + '.compacting'
+        self.sync_interval = sync_interval
+        self.compact_every = compact_every
+
+        self.data = None
+        self.position = 0
+        self.journal_start = 0      # position just before the journal's first line
+        self.journal_inode = None   # which journal file we have read...
+        self.journal_offset = 0     # ...and how far
+        self.snapshot = None        # file_signature() of the snapshot we read
+        self.lock = threading.Lock()
+        self.unsynced = threading.Event()
+        self.journal = None
+        self.sync_thread = None
+        self.compaction_thread = None
+        self.running = False
+
+        # Counters for stats()
+        self.changes = 0
+        self.syncs = 0
+        self.compactions = 0
+        self.reloads = 0
+
+    @property
+    def changes_since_snapshot(self):
+        return self.position - self.journal_start
+
+    def load(self):
+        """
+        Reads the snapshot, replays the journal on top and returns the data
+        """
+        with data_file_lock(self.data_file):
+            with self.lock:
+                if os.path.exists(self.compacting_path) and self.data is None:
+                    # A compaction was interrupted - finish it first
+                    self._fold_compacting()
+                self._read_files()
+                if not self.running:
+                    self.running = True
+                    self.sync_thread = threading.Thread(target=self._sync_loop, daemon=True)
+                    self.sync_thread.start()
+        return self.data
+
+    def _read_files(self):
+        """
+        Called with both locks held: reads the snapshot, a journal that is
+        being compacted (if any) and the journal, and (re)opens the journal
+        for our own lines. The data dict is updated in place, so whoever
+        holds it sees the new data.
+        """
+        self.snapshot = file_signature(self.data_file)
+        data, position = read_snapshot(self.data_file)
+        position, _ = replay(data, self.compacting_path, position)
+
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = open(self.journal_path, 'ab')
+        self.journal_inode = os.fstat(self.journal.fileno()).st_ino
+        self.journal_start = position
+        self.position, self.journal_offset = replay(data, self.journal_path, position)
+
+        if self.data is None:
+            self.data = data
+        else:
+            self.data.clear()
+            self.data.update(data)
+            self.reloads += 1
+
+    def _others_wrote(self):
+        """
+        Cheap check (two stat calls, no locks) for lines or a snapshot
+        written by another bot since we last looked
+        """
+        try:
+            info = os.stat(self.journal_path)
+        except OSError:
+            return True
+        return (info.st_ino != self.journal_inode or info.st_size != self.journal_offset
+                or file_signature(self.data_file) != self.snapshot)
+
+    def _catch_up(self):
+        """
+        Called with both locks held: applies what other bots wrote since
+        we last looked
+        """
+        if not self._others_wrote():
+            return
+        try:
+            same_journal = os.stat(self.journal_path).st_ino == self.journal_inode
+        except OSError:
+            same_journal = False
+        if same_journal and file_signature(self.data_file) == self.snapshot:
+            # Only new lines at the end of the journal
+            self.position, self.journal_offset = replay(self.data, self.journal_path,
+                                                        self.position, self.journal_offset)
+        else:
+            # Compacted, or student_data.json written by a bot without a journal
+            self._read_files()
+
+    def refresh(self):
+        """
+        Picks up what other bots changed (nearly free when they changed nothing)
+        """
+        if self.journal is None or not self._others_wrote():
+            return
+        with data_file_lock(self.data_file):
+            with self.lock:
+                if self.journal is not None:
+                    self._catch_up()
+
+    def append(self, path, value):
+        """
+        Adds value to the list at path (made if missing)
+        """
+        self._change({'op': 'append', 'path': list(path), 'value': value})
+
+    def set(self, path, value):
+        self._change({'op': 'set', 'path': list(path), 'value': value})
+
+    def _change(self, change):
+        if self.data is None:
+            self.load()
+        with data_file_lock(self.data_file):
+            with self.lock:
+                self._catch_up()
+                apply_change(self.data, change)
+                self.position += 1
+                line = (json.dumps({'n': self.position, **change}) + '\n').encode('utf-8')
+                self.journal.write(line)
+                self.journal.flush()  # before the lock is let go, so the others see it
+                self.journal_offset += len(line)
+                self.changes += 1
+                if self.changes_since_snapshot >= self.compact_every:
+                    self._start_compaction()
+        self.unsynced.set()
+
+    def _sync_loop(self):
+        """
+        Background thread: one fsync() for all lines of the last sync_interval
+        """
+        while self.running:
+            self.unsynced.wait()
+            time.sleep(self.sync_interval)  # let more changes pile up
+            self.sync()
+
+    def sync(self):
+        """
+        Makes sure every journal line is on disk
+        """
+        with self.lock:
+            if self.journal is None or not self.unsynced.is_set():
+                return
+            self.unsynced.clear()
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self.syncs += 1
+
+    def _start_compaction(self):
+        """
+        Called with both locks held: moves the journal aside (new lines go
+        to a fresh one) and folds the old one into the snapshot in the
+        background
+        """
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return  # the next compaction will pick these lines up
+        if os.path.exists(self.compacting_path):
+            return  # another compaction hasn't finished - it or load() will
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.journal.close()
+        os.replace(self.journal_path, self.compacting_path)
+        self.journal = open(self.journal_path, 'ab')
+        self.journal_inode = os.fstat(self.journal.fileno()).st_ino
+        self.journal_offset = 0
+        self.journal_start = self.position
+        self.compaction_thread = threading.Thread(target=self._compact, daemon=True)
+        self.compaction_thread.start()
+
+    def _fold_compacting(self):
+        """
+        Called with the data file lock held: writes the snapshot with the
+        moved-aside journal folded in, then deletes that journal
+        """
+        data, position = read_snapshot(self.data_file)
+        position, _ = replay(data, self.compacting_path, position)
+        write_snapshot(self.data_file, data, position)
+        os.remove(self.compacting_path)
+
+    def _compact(self):
+        # Works on the files only, so the live data is never locked for long.
+        # The file lock keeps other bots from writing in between our read
+        # and write (see student_storage.py).
+        with data_file_lock(self.data_file):
+            if not os.path.exists(self.compacting_path):
+                return  # another bot finished it for us
+            ours = file_signature(self.data_file) == self.snapshot
+            self._fold_compacting()
+            if ours:
+                # We already have everything that went into the new
+                # snapshot, so _catch_up() doesn't need to read it back
+                with self.lock:
+                    self.snapshot = file_signature(self.data_file)
+        self.compactions += 1
+
+    def compact(self):
+        """
+        Folds the whole journal into the snapshot right now
+        """
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()  # wait for one that is already running
+        with data_file_lock(self.data_file):
+            with self.lock:
+                self._catch_up()
+                self._start_compaction()
+                thread = self.compaction_thread
+        if thread is not None:
+            thread.join()
+
+    def close(self, compact=True):
+        """
+        Saves everything (call this before the program ends). With compact,
+        student_data.json itself is brought up to date too, so programs that
+        only read that file see the latest data.
+        """
+        if self.journal is None:
+            return
+        if compact and self.changes_since_snapshot:
+            self.compact()
+        elif self.compaction_thread is not None:
+            self.compaction_thread.join()
+        self.running = False
+        self.unsynced.set()  # wake the sync thread so it can stop
+        self.sync()
+        with self.lock:
+            self.journal.close()
+            self.journal = None
+
+    def stats(self):
+        return {
+            'changes': self.changes,
+            'syncs': self.syncs,
+            'compactions': self.compactions,
+            'reloads': self.reloads,
+            'journal_lines': self.changes_since_snapshot,
+        }
@@ -0,0 +1,114 @@
+# Student Helper Chatbot - Per-Student Profiles
+# Every bot used to keep its data in one student_data.json, so one folder
+# meant one student. Now a bot can be given a student ID, and each student
+# gets their own file in a "sharded" folder tree:
+#
+#   students/3f/a2/alice-3fa2c81b09d4e7f1.json
+#
+# The two folder levels come from a hash of the ID, so students are spread
+# evenly over up to 65536 small folders (no folder ever holds millions of
+# files, which makes file systems slow). One server process can serve
+# thousands of students: only the most recently used profiles are kept in
+# memory, and the least recently used one is saved and dropped when there
+# are too many.
+#
+#   profiles = ProfileCache(capacity=256)
+#   bot = UltimateStudentBot(student_id="alice", profiles=profiles)
+#   bot.switch_student("bob")
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from student_storage import JsonFileStorage
+
+# Every student's data lives somewhere under this folder
+STUDENTS_DIR = "students"
+
+
+def student_data_path(student_id, root=STUDENTS_DIR, levels=2):
+    """
+    Where a student's data file goes. The file name keeps (a safe part of)
+    the ID so people can still find it, plus part of the hash so two IDs
+    that look alike once cleaned up ("a b" and "a_b") never share a file.
+    """
+    digest = hashlib.sha1(str(student_id).encode('utf-8')).hexdigest()
+    folders = [digest[2 * level:2 * level + 2] for level in range(levels)]
+    safe_id = re.sub(r'[^A-Za-z0-9_.-]+', '_', str(student_id))[:40]
+    return os.path.join(root, *folders, f"{safe_id}-{digest[:16]}.json")
+
+
+class ProfileCache:
+    """
+    The loaded storages of the most recently used students (at most
+    `capacity` of them), oldest first. get() moves a student to the end;
+    when there are too many, the one at the front is closed - which writes
+    its last changes - and forgotten. It is read from disk again the next
+    time that student comes back.
+
+    make_storage(path) opens one student's data; JsonFileStorage by default,
+    since every student's file is small.
+    """
+
+    def __init__(self, root=STUDENTS_DIR, capacity=256, make_storage=None):
+        self.root = root
+        self.capacity = capacity
+        self.make_storage = make_storage or JsonFileStorage
+        self.profiles = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Counters for stats()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, student_id):
+        return student_data_path(student_id, self.root)
+
+    def get(self, student_id):
+        """
+        The storage of one student, loaded from disk if it isn't in memory
+        """
+        evicted = []
+        with self.lock:
+            storage = self.profiles.get(student_id)
+            if storage is not None:
+                self.profiles.move_to_end(student_id)
+                self.hits += 1
+                return storage
+
+            self.misses += 1
+            path = self.path(student_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            storage = self.make_storage(path)
+            self.profiles[student_id] = storage
+            while len(self.profiles) > self.capacity:
+                evicted.append(self.profiles.popitem(last=False)[1])
+                self.evictions += 1
+
+        # Saving can touch the disk, so it happens outside the lock
+        for old in evicted:
+            old.close()
+        return storage
+
+    def __contains__(self, student_id):
+        return student_id in self.profiles
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def close(self):
+        """
+        Saves every loaded profile (call this before the program ends)
+        """
+        with self.lock:
+            storages = list(self.profiles.values())
+            self.profiles.clear()
+        for storage in storages:
+            storage.close()
+
+    def stats(self):
+        return {'loaded': len(self.profiles), 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
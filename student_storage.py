@@ -0,0 +1,583 @@
+# Student Helper Chatbot - Storage for Student Data
+# The bots used to keep everything in one JSON "blob" and rewrite it after
+# every change. Now they talk to a storage object instead, with the same
+# few methods whatever is underneath:
+#
+#   MemoryStorage     - just a dict, nothing on disk (tests and benchmarks)
+#   JsonFileStorage   - student_data.json, rewritten in the background after changes
+#   JournalStorage    - student_data.json plus a journal of changes (see student_journal.py)
+#   SQLiteStorage     - a real database file (student_data.db) with indexes
+#
+# Every storage has:
+#   add_grade(subject, grade) -> that subject's grades   subjects() -> {subject: [grades]}
+#   add_reminder(reminder) -> id       reminders()       due_reminders(now)   mark_notified(id)
+#   add_goal(goal)                     goals()
+#   add_study_session(session)         study_sessions()
+#   export() -> everything as one dict, like student_data.json
+#   close()
+
+import atexit
+import copy
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from student_journal import DEFAULT_STUDENT_DATA, StudentDataJournal, apply_change, data_file_lock
+
+
+def reminder_is_due(reminder, now):
+    """
+    True for a reminder that isn't done or announced yet and whose time has come
+    """
+    if reminder.get('completed', False) or reminder.get('notified', False):
+        return False
+    try:
+        return now >= datetime.fromisoformat(reminder['due_datetime'])
+    except (KeyError, TypeError, ValueError):
+        return False  # old reminders without a due time are only shown, never announced
+
+
+class MemoryStorage:
+    """
+    Student data in a dict. The other dict-based storages build on this
+    one and only change how a change gets saved (_change, and _saved once
+    the lock is let go) and how changes made by other programs are noticed
+    (_refresh).
+    """
+
+    def __init__(self, data=None):
+        self.data = copy.deepcopy(data) if data is not None else copy.deepcopy(DEFAULT_STUDENT_DATA)
+        for key, empty in DEFAULT_STUDENT_DATA.items():
+            self.data.setdefault(key, type(empty)())
+        # The reminder thread and the chat change data at the same time
+        self.lock = threading.RLock()
+
+    def _change(self, op, path, value):
+        apply_change(self.data, {'op': op, 'path': path, 'value': value})
+
+    def _saved(self):
+        pass
+
+    def _refresh(self):
+        pass
+
+    def add_grade(self, subject, grade):
+        self._refresh()
+        with self.lock:
+            self._change('append', ['subjects', subject], grade)
+            grades = list(self.data['subjects'][subject])
+        self._saved()
+        return grades
+
+    def subjects(self):
+        self._refresh()
+        with self.lock:
+            return {subject: list(grades) for subject, grades in self.data['subjects'].items()}
+
+    def add_reminder(self, reminder):
+        self._refresh()
+        with self.lock:
+            self._change('append', ['reminders'], reminder)
+            reminder_id = len(self.data['reminders']) - 1
+        self._saved()
+        return reminder_id
+
+    def reminders(self):
+        """
+        All reminders, oldest first, each with its 'id'
+        """
+        self._refresh()
+        with self.lock:
+            return [{**reminder, 'id': number} for number, reminder in enumerate(self.data['reminders'])]
+
+    def due_reminders(self, now):
+        return [reminder for reminder in self.reminders() if reminder_is_due(reminder, now)]
+
+    def mark_notified(self, reminder_id):
+        self._refresh()
+        with self.lock:
+            self._change('set', ['reminders', reminder_id, 'notified'], True)
+        self._saved()
+
+    def add_goal(self, goal):
+        self._refresh()
+        with self.lock:
+            self._change('append', ['goals'], goal)
+        self._saved()
+
+    def goals(self):
+        self._refresh()
+        with self.lock:
+            return [dict(goal) for goal in self.data['goals']]
+
+    def add_study_session(self, session):
+        self._refresh()
+        with self.lock:
+            self._change('append', ['study_sessions'], session)
+        self._saved()
+
+    def study_sessions(self):
+        self._refresh()
+        with self.lock:
+            return [dict(session) for session in self.data['study_sessions']]
+
+    def export(self):
+        self._refresh()
+        with self.lock:
+            return copy.deepcopy(self.data)
+
+    def close(self):
+        pass
+
+
+class JsonFileStorage(MemoryStorage):
+    """
+    The original storage: the whole student_data.json is written again
+    after a change.
+
+    Writing happens in a background thread, so the chat never waits for the
+    disk. A change only marks the data as "dirty"; the writer waits
+    write_delay seconds for more changes and then writes them all at once,
+    so a burst of commands (or several reminders firing together) costs one
+    write instead of one each. flush() writes right away - close() does
+    that, and so does Python when the program ends. write_delay=0 writes
+    straight after every change instead, like the bots used to.
+
+    Several bots may share the file (say final_chatbot.py and
+    conversational_chatbot.py running at the same time). Writers take
+    turns through a lock file, and a writer that finds the file changed
+    by someone else reads it again and puts its own changes on top, so
+    nobody's grades get lost. Before every read the file's size and
+    modification time are checked (cheap), and it is only read again if
+    they changed.
+    """
+
+    def __init__(self, data_file="student_data.json", write_delay=0.5):
+        self.data_file = data_file
+        data, self.signature = self._read_file()
+        super().__init__(data)
+
+        # Our changes that aren't in the file yet
+        self.pending = []
+
+        self.write_delay = write_delay
+        self.dirty = False
+        self.wake_writer = threading.Event()
+        self.write_lock = threading.Lock()  # one write at a time
+        self.closed = threading.Event()
+        self.writer_thread = None  # started by a change, stops when all is written
+
+        # Counters for stats()
+        self.changes = 0
+        self.writes = 0
+        self.reloads = 0
+
+    def _read_file(self):
+        """
+        Returns (data or None, signature of the file that was read)
+        """
+        try:
+            with open(self.data_file, 'r') as f:
+                info = os.fstat(f.fileno())
+                return json.load(f), (info.st_ino, info.st_mtime_ns, info.st_size)
+        except (OSError, ValueError):
+            return None, None
+
+    def _file_changed(self):
+        try:
+            info = os.stat(self.data_file)
+        except OSError:
+            return False
+        return (info.st_ino, info.st_mtime_ns, info.st_size) != self.signature
+
+    def _refresh(self):
+        """
+        Picks up what other programs wrote since we last looked
+        """
+        if self._file_changed():
+            with self.lock:
+                self._reload()
+
+    def _reload(self):
+        """
+        Called with self.lock held: reads the file again and puts our
+        unsaved changes back on top
+        """
+        data, signature = self._read_file()
+        if data is None:
+            return
+        for key, empty in DEFAULT_STUDENT_DATA.items():
+            data.setdefault(key, type(empty)())
+
+        # Items we appended may land further down the list now - a later
+        # change to one of them (like 'notified') has to follow it there.
+        # The pending changes are rewritten to the new places, so they
+        # match self.data again for the next change and the next reload.
+        moved = {}
+        for change in self.pending:
+            path = list(change['path'])
+            for cut in range(1, len(path)):
+                path[cut] = moved.get((tuple(path[:cut]), path[cut]), path[cut])
+            change['path'] = path
+            apply_change(data, {**change, 'value': copy.deepcopy(change['value'])})
+            if change['op'] == 'append':
+                target = data
+                for key in path:
+                    target = target[key]
+                moved[(tuple(path), change['index'])] = len(target) - 1
+                change['index'] = len(target) - 1
+
+        self.data = data
+        self.signature = signature
+        self.reloads += 1
+
+    def _change(self, op, path, value):
+        change = {'op': op, 'path': path, 'value': value}
+        if op == 'append':
+            # Remember where the item went, for _reload()
+            *parents, last = path
+            target = self.data
+            for key in parents:
+                target = target[key]
+            change['index'] = len(target.get(last, []))
+        apply_change(self.data, change)
+        # Our own copy: the dict in self.data may still change (say a
+        # reminder gets 'notified'), but the queued change must not
+        self.pending.append({**change, 'value': copy.deepcopy(value)})
+        self.changes += 1
+        self.dirty = True
+        if self.write_delay:
+            if self.writer_thread is None:
+                self.writer_thread = threading.Thread(target=self._write_loop, daemon=True)
+                self.writer_thread.start()
+                atexit.register(self.flush)
+            self.wake_writer.set()
+
+    def _saved(self):
+        # With write_delay=0 the change is written straight away - here,
+        # not in _change(), because save() has to take the data file lock
+        # BEFORE self.lock (like the writer thread and the journal do)
+        if not self.write_delay:
+            self.flush()
+
+    def _write_loop(self):
+        while True:
+            self.wake_writer.wait()
+            self.closed.wait(self.write_delay)  # let the rest of the burst arrive
+            self.wake_writer.clear()
+            if self.closed.is_set():
+                break  # close() writes the rest
+            self.flush()
+            with self.lock:
+                if not self.wake_writer.is_set() and not self.dirty:
+                    # All written - stop until the next change, so thousands
+                    # of quiet students don't keep a thread each
+                    self.writer_thread = None
+                    atexit.unregister(self.flush)
+                    break
+
+    def flush(self):
+        """
+        Writes the data now if anything changed since the last write
+        """
+        if not self.dirty:
+            return True
+        with self.write_lock:
+            if not self.dirty:
+                return True
+            self.dirty = False
+            if self.save():
+                return True
+            self.dirty = True  # try again next time
+            return False
+
+    def save(self):
+        """
+        Writes everything to a temporary file and then swaps it in, so a
+        crash never leaves half a student_data.json behind. The file lock
+        is held from reading the latest version until ours is in place.
+        """
+        try:
+            with data_file_lock(self.data_file):
+                with self.lock:
+                    if self._file_changed():
+                        self._reload()
+                    text = json.dumps(self.data, indent=2)
+                    written = len(self.pending)
+                temporary = self.data_file + '.tmp'
+                with open(temporary, 'w') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # One step, so a read in between can't see our new file
+                # while our changes still look unsaved (it would reload
+                # the file and put them on top a second time)
+                with self.lock:
+                    os.replace(temporary, self.data_file)
+                    info = os.stat(self.data_file)
+                    self.signature = (info.st_ino, info.st_mtime_ns, info.st_size)
+                    del self.pending[:written]
+            self.writes += 1
+            return True
+        except (OSError, TypeError, ValueError):
+            return False
+
+    def close(self):
+        """
+        Writes what is left and stops the writer. Changes made after this
+        (if any) are written straight away.
+        """
+        with self.lock:
+            self.write_delay = 0
+            writer, self.writer_thread = self.writer_thread, None
+        if writer is not None:
+            self.closed.set()  # wakes the writer so it can stop
+            self.wake_writer.set()
+            writer.join()
+            atexit.unregister(self.flush)
+        self.flush()
+
+    def stats(self):
+        return {'changes': self.changes, 'writes': self.writes, 'reloads': self.reloads}
+
+
+class JournalStorage(MemoryStorage):
+    """
+    student_data.json plus an append-only journal: a change costs one short
+    line instead of a rewrite of everything (see student_journal.py).
+    Several bots can share the journal; before every read we pick up the
+    lines the others added (and a student_data.json written by a bot that
+    doesn't use the journal).
+    """
+
+    def __init__(self, data_file="student_data.json", **journal_settings):
+        super().__init__()
+        self.journal = StudentDataJournal(data_file, **journal_settings)
+        self.data = self.journal.load()
+
+    def _refresh(self):
+        # The journal updates self.data in place
+        with self.lock:
+            self.journal.refresh()
+
+    def _change(self, op, path, value):
+        if op == 'append':
+            self.journal.append(path, value)
+        else:
+            self.journal.set(path, value)
+
+    def save(self):
+        self.journal.compact()
+        return True
+
+    def close(self):
+        self.journal.close()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subjects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS grades (
+    id INTEGER PRIMARY KEY,
+    subject_id INTEGER NOT NULL REFERENCES subjects(id),
+    grade REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS grades_by_subject ON grades (subject_id);
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    time TEXT,
+    due_datetime TEXT,
+    created TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    notified INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS reminders_pending ON reminders (completed, notified, due_datetime);
+CREATE TABLE IF NOT EXISTS goals (
+    id INTEGER PRIMARY KEY,
+    goal TEXT NOT NULL,
+    created TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    target REAL NOT NULL DEFAULT 100,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS study_sessions (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL
+);
+"""
+
+REMINDER_COLUMNS = ['task', 'time', 'due_datetime', 'created', 'completed', 'notified']
+GOAL_COLUMNS = ['goal', 'created', 'progress', 'target']
+
+
+class SQLiteStorage:
+    """
+    Student data in an SQLite database (Python's built-in sqlite3).
+
+    Every change is one small transaction on one row, so saving doesn't
+    get slower as the history grows, and "which reminders are due?" is
+    answered from the (completed, notified, due_datetime) index instead of
+    looking at every reminder.
+
+        storage = SQLiteStorage("student_data.db")
+        storage.add_grade("Math", 8.5)
+
+    A new database starts with the contents of import_json (the old
+    student_data.json), if that file exists.
+
+    Keys of a reminder or goal that have no column of their own are kept
+    as JSON in its `extra` column, so nothing a bot adds gets lost.
+    """
+
+    def __init__(self, path="student_data.db", import_json="student_data.json"):
+        self.path = path
+        is_new = path == ":memory:" or not os.path.exists(path)
+        # One connection shared by the chat and the reminder thread
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        with self.lock:
+            if path != ":memory:":
+                # Readers don't wait for writers, and a commit needs fewer fsyncs
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+            # Databases made before the `extra` column existed get it now
+            for table in ['reminders', 'goals']:
+                columns = [row['name'] for row in self.connection.execute(f"PRAGMA table_info({table})")]
+                if 'extra' not in columns:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN extra TEXT")
+        if is_new and import_json and os.path.exists(import_json):
+            self.import_data(JsonFileStorage(import_json).export())
+
+    def import_data(self, data):
+        """
+        Copies a student_data.json-style dict into the database (one transaction)
+        """
+        with self.lock, self.connection:
+            for subject, grades in data.get('subjects', {}).items():
+                subject_id = self._subject_id(subject)
+                self.connection.executemany("INSERT INTO grades (subject_id, grade) VALUES (?, ?)",
+                                            [(subject_id, grade) for grade in grades])
+            for reminder in data.get('reminders', []):
+                self._insert_reminder(reminder)
+            for goal in data.get('goals', []):
+                self._insert_goal(goal)
+            for session in data.get('study_sessions', []):
+                self.connection.execute("INSERT INTO study_sessions (session) VALUES (?)", (json.dumps(session),))
+
+    def _subject_id(self, subject):
+        self.connection.execute("INSERT OR IGNORE INTO subjects (name) VALUES (?)", (subject,))
+        return self.connection.execute("SELECT id FROM subjects WHERE name = ?", (subject,)).fetchone()[0]
+
+    def _extra(self, record, columns):
+        """
+        The keys that have no column of their own, as JSON (None if there are none)
+        """
+        extra = {key: value for key, value in record.items() if key not in columns and key != 'id'}
+        return json.dumps(extra) if extra else None
+
+    def _with_extra(self, row):
+        record = dict(row)
+        extra = record.pop('extra')
+        if extra:
+            record.update(json.loads(extra))
+        return record
+
+    def _insert_reminder(self, reminder):
+        values = [reminder.get(column) for column in REMINDER_COLUMNS]
+        values[4] = int(bool(values[4]))
+        values[5] = int(bool(values[5]))
+        values.append(self._extra(reminder, REMINDER_COLUMNS))
+        cursor = self.connection.execute(
+            f"INSERT INTO reminders ({', '.join(REMINDER_COLUMNS)}, extra) VALUES (?, ?, ?, ?, ?, ?, ?)", values)
+        return cursor.lastrowid
+
+    def _insert_goal(self, goal):
+        self.connection.execute(f"INSERT INTO goals ({', '.join(GOAL_COLUMNS)}, extra) VALUES (?, ?, ?, ?, ?)",
+                                (goal['goal'], goal.get('created'), goal.get('progress', 0), goal.get('target', 100),
+                                 self._extra(goal, GOAL_COLUMNS)))
+
+    def add_grade(self, subject, grade):
+        with self.lock:
+            with self.connection:
+                subject_id = self._subject_id(subject)
+                self.connection.execute("INSERT INTO grades (subject_id, grade) VALUES (?, ?)", (subject_id, grade))
+            rows = self.connection.execute("SELECT grade FROM grades WHERE subject_id = ? ORDER BY id",
+                                           (subject_id,))
+            return [row[0] for row in rows]
+
+    def subjects(self):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT subjects.name, grades.grade FROM subjects JOIN grades ON grades.subject_id = subjects.id "
+                "ORDER BY subjects.id, grades.id")
+            subjects = {}
+            for name, grade in rows:
+                subjects.setdefault(name, []).append(grade)
+            return subjects
+
+    def _reminder(self, row):
+        reminder = self._with_extra(row)
+        reminder['completed'] = bool(reminder['completed'])
+        reminder['notified'] = bool(reminder['notified'])
+        return reminder
+
+    def add_reminder(self, reminder):
+        with self.lock, self.connection:
+            return self._insert_reminder(reminder)
+
+    def reminders(self):
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT id, {', '.join(REMINDER_COLUMNS)}, extra FROM reminders ORDER BY id")
+            return [self._reminder(row) for row in rows]
+
+    def due_reminders(self, now):
+        """
+        Reminders to announce now - found through the reminders_pending index
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT id, {', '.join(REMINDER_COLUMNS)}, extra FROM reminders "
+                "WHERE completed = 0 AND notified = 0 AND due_datetime <= ? ORDER BY due_datetime",
+                (now.isoformat(),))
+            # ISO text sorts like time; reminder_is_due double-checks odd formats
+            return [reminder for reminder in map(self._reminder, rows) if reminder_is_due(reminder, now)]
+
+    def mark_notified(self, reminder_id):
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE reminders SET notified = 1 WHERE id = ?", (reminder_id,))
+
+    def add_goal(self, goal):
+        with self.lock, self.connection:
+            self._insert_goal(goal)
+
+    def goals(self):
+        with self.lock:
+            rows = self.connection.execute(f"SELECT {', '.join(GOAL_COLUMNS)}, extra FROM goals ORDER BY id")
+            return [self._with_extra(row) for row in rows]
+
+    def add_study_session(self, session):
+        with self.lock, self.connection:
+            self.connection.execute("INSERT INTO study_sessions (session) VALUES (?)", (json.dumps(session),))
+
+    def study_sessions(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT session FROM study_sessions ORDER BY id")
+            return [json.loads(row[0]) for row in rows]
+
+    def export(self):
+        reminders = [{key: value for key, value in reminder.items() if key != 'id'} for reminder in self.reminders()]
+        return {'subjects': self.subjects(), 'reminders': reminders,
+                'goals': self.goals(), 'study_sessions': self.study_sessions()}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,71 @@
+# Student Helper Chatbot - Answer Caching Tests
+# A cached answer is served again for every similar question, so empty,
+# too-short and late answers must never get into the caches.
+# Run with:  python -m pytest -q
+
+import time
+
+import pytest
+
+from generation_backends import StubBackend
+from response_cache import ResponseCache
+from ultimate_chatbot import UltimateStudentBot
+
+QUESTION = "can you explain how photosynthesis works"
+
+
+def test_response_cache_skips_empty_and_short_answers(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    cache.put("prompt", {}, "")
+    cache.put("prompt", {}, "ok")
+    assert cache.get("prompt", {}) is None
+    assert cache.stats()['skipped'] == 2
+
+    cache.put("prompt", {}, "Plants turn sunlight into sugar.")
+    assert cache.get("prompt", {}) == "Plants turn sunlight into sugar."
+
+
+@pytest.fixture
+def make_bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the bot's files go here
+    bots = []
+
+    def make(backend, **options):
+        bot = UltimateStudentBot(ai_backend=backend, background_warmup=False, **options)
+        bots.append(bot)
+        return bot
+
+    yield make
+    for bot in bots:
+        bot.shutdown()
+
+
+def cached(bot):
+    student_prompt, _, cache_params = bot.make_ai_request(QUESTION)
+    return bot.recall_answer(QUESTION, student_prompt, cache_params)
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_short_answer_is_not_cached(make_bot, stream):
+    bot = make_bot(StubBackend(tokens=1, token_latency=0))
+    answer = bot.get_conversational_response(QUESTION, stream=stream)
+    if stream and answer is not None:
+        list(answer)
+    assert cached(bot) is None
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_late_answer_is_not_cached(make_bot, stream):
+    bot = make_bot(StubBackend(tokens=10, token_latency=0.05), ai_deadline=0.02)
+    answer = bot.get_conversational_response(QUESTION, stream=stream)
+    if stream and answer is not None:
+        list(answer)
+    time.sleep(1)  # the late answer finishes in the background meanwhile
+    assert cached(bot) is None
+
+
+def test_good_answer_is_cached(make_bot):
+    bot = make_bot(StubBackend(tokens=10, token_latency=0))
+    answer = bot.get_conversational_response(QUESTION)
+    assert answer is not None
+    assert cached(bot) is not None
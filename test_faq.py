@@ -0,0 +1,28 @@
+# Student Helper Chatbot - FAQ Lookup Tests
+# Run with:  python -m pytest -q
+
+import pytest
+
+from chatbot import FAQ_INDEX
+
+
+@pytest.mark.parametrize('question, answer_id', [
+    ("what is gpa", 'gpa'),
+    ("Whats CGPA?", 'cgpa'),
+    ("attendence", 'attendance'),
+    ("time managment", 'time_management'),
+    ("cgpa calculaton", 'cgpa_calculation'),
+    ("studdy tips", 'study_tips'),
+])
+def test_finds_questions_with_typos(question, answer_id):
+    assert FAQ_INDEX.find_answer_id(question) == answer_id
+
+
+@pytest.mark.parametrize('question', [
+    "what is a cpa",
+    "what is gp",
+    "what is the weather",
+    "asdfghjkl",
+])
+def test_short_words_are_not_mistaken_for_others(question):
+    assert FAQ_INDEX.find_answer_id(question) is None
@@ -0,0 +1,37 @@
+# Student Helper Chatbot - Keyword Engine Tests
+# The engine must give the same answers as the old `keyword in text`
+# checks, also for keywords hidden inside other keywords.
+# Run with:  python -m pytest -q
+
+from keyword_engine import KeywordAutomaton
+
+GROUPS = [
+    ('stress', ['stress', 'anxiety']),
+    ('greeting', ['hello', 'hi', 'hey']),
+    ('thanks', ['thank', 'thanks', 'hanks']),
+]
+
+
+def old_find_all(text):
+    return [label for label, keywords in GROUPS if any(keyword in text for keyword in keywords)]
+
+
+def test_finds_every_group_in_priority_order():
+    engine = KeywordAutomaton(GROUPS)
+    assert engine.find_all("hi, thanks - exams give me stress") == ['stress', 'greeting', 'thanks']
+    assert engine.first_match("hi, thanks - exams give me stress") == 'stress'
+    assert engine.first_match("all quiet now") is None
+
+
+def test_keywords_inside_other_keywords():
+    engine = KeywordAutomaton(GROUPS)
+    # 'thank' starts where 'thanks' does, 'hanks' starts inside it, 'hi' inside 'this'
+    for text in ["thanks", "thank", "chanks", "this", "they", "shelloo"]:
+        assert engine.find_all(text) == old_find_all(text), text
+
+
+def test_long_messages():
+    engine = KeywordAutomaton(GROUPS)
+    filler = "lorem ipsum dolor sit amet " * 4000
+    assert engine.first_match(filler) is None
+    assert engine.find_all(filler + "anxiety" + filler) == ['stress']
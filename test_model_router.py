@@ -0,0 +1,66 @@
+# Student Helper Chatbot - Model Router Tests
+# Run with:  python -m pytest -q
+
+import pytest
+
+from generation_backends import StubBackend
+from model_router import ModelRouter
+
+PROMPT = "Student: how do I study better?\nAssistant:"
+
+
+class BrokenBackend(StubBackend):
+    """
+    Fails straight away - as fast as a backend can possibly answer
+    """
+
+    name = "broken"
+
+    def __call__(self, prompt, **settings):
+        self.calls += 1
+        raise RuntimeError("model crashed")
+
+    def generate_batch(self, prompts, settings):
+        self.calls += 1
+        raise RuntimeError("model crashed")
+
+    def stream(self, prompt, settings, **options):
+        self.calls += 1
+        raise RuntimeError("model crashed")
+
+
+def make_router():
+    router = ModelRouter(target_seconds=2.0)
+    broken = BrokenBackend(token_latency=0)
+    working = StubBackend(token_latency=0)
+    router.register(broken)   # "best answers", so the router tries it first
+    router.register(working)
+    return router, broken, working
+
+
+@pytest.mark.parametrize('call', [
+    lambda router: router(PROMPT, max_new_tokens=5),
+    lambda router: router.generate_batch([PROMPT], {'max_new_tokens': 5}),
+    lambda router: list(router.stream(PROMPT, {'max_new_tokens': 5})),
+])
+def test_failing_backend_does_not_look_fast(call):
+    router, broken, working = make_router()
+    for _ in range(10):
+        try:
+            call(router)
+        except RuntimeError:
+            pass
+
+    assert broken.calls == 1  # tried once, then avoided
+    assert working.calls == 9
+    backends = router.stats()['backends']
+    assert backends['0: broken']['failures'] == 1
+    assert all(backend['in_flight'] == 0 for backend in backends.values())
+
+
+def test_unread_stream_gives_its_slot_back():
+    router = ModelRouter()
+    router.register(StubBackend(token_latency=0))
+    stream = router.stream(PROMPT, {'max_new_tokens': 5})
+    del stream
+    assert all(backend['in_flight'] == 0 for backend in router.stats()['backends'].values())
@@ -0,0 +1,45 @@
+# Student Helper Chatbot - Semantic Answer Cache Tests
+# Run with:  python -m pytest -q
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from semantic_cache import SemanticAnswerCache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CRASHING_PROGRAM = """
+import os, sys
+sys.path.insert(0, sys.argv[1])
+from semantic_cache import SemanticAnswerCache
+cache = SemanticAnswerCache(sys.argv[2], capacity=2)
+cache.put("how do i study better", {}, "study answer")
+cache.put("how do i manage my time", {}, "time answer")
+cache.flush()
+cache.put("what is photosynthesis", {}, "plants answer")  # replaces a row, not saved yet
+os._exit(1)  # crash
+"""
+
+
+def test_reworded_question_gets_the_saved_answer(tmp_path):
+    cache = SemanticAnswerCache(str(tmp_path / "cache"))
+    cache.put("how do i study better", {'model': 'x'}, "Make a plan")
+    cache.flush()
+
+    reopened = SemanticAnswerCache(str(tmp_path / "cache"))
+    assert reopened.get("how can i study more effectively", {'model': 'x'}) == "Make a plan"
+    assert reopened.get("how can i study more effectively", {'model': 'y'}) is None
+
+
+def test_crash_never_pairs_a_new_question_with_an_old_answer(tmp_path):
+    folder = str(tmp_path / "cache")
+    subprocess.run([sys.executable, "-c", CRASHING_PROGRAM, HERE, folder], check=False)
+
+    reopened = SemanticAnswerCache(folder, capacity=2)
+    assert reopened.get("what is photosynthesis", {}) is None
+    assert reopened.get("how do i manage my time", {}) == "time answer"
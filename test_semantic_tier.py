@@ -0,0 +1,46 @@
+# Student Helper Chatbot - Semantic Intent Tier Tests
+# The tier answers from canned responses before the AI gets a chance, so a
+# question it wrongly "recognises" never reaches the notes or the AI.
+# Run with:  python -m pytest -q
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from ultimate_chatbot import UltimateStudentBot
+
+
+@pytest.fixture(scope="module")
+def tier(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(tmp_path_factory.mktemp("bot"))  # the bot's files go here
+        bot = UltimateStudentBot(enable_ai=False)
+        yield bot.semantic_tier
+        bot.shutdown()
+
+
+@pytest.mark.parametrize('question, intent', [
+    ("what does gpa stand for", 'gpa_question'),
+    ("how can i study better", 'study_tips'),
+    ("how do i manage my time", 'time_management'),
+    ("i feel so stressed", 'stress'),
+    ("how can i improve my grades", 'improvement'),
+    ("hi there", 'greeting'),
+    ("thank you so much", 'thanks'),
+])
+def test_recognises_student_questions(tier, question, intent):
+    assert tier.classify(question)[0] == intent
+    assert tier.respond(question) is not None
+
+
+@pytest.mark.parametrize('question', [
+    "how do i cook pasta",
+    "how are you doing with the weather",
+    "how does a car engine work",
+    "what does lol stand for",
+    "how to stop smoking",
+    "i love pizza and chess a lot",
+    "what is the capital of france",
+])
+def test_leaves_off_topic_questions_to_the_ai(tier, question):
+    assert tier.respond(question) is None
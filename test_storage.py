@@ -0,0 +1,256 @@
+# Student Helper Chatbot - Storage Tests
+# Checks that every storage (see student_storage.py) keeps the same data
+# the same way, that the journal survives a half-written line, and that
+# bots sharing one file don't lose each other's changes.
+# Run with:  python -m pytest -q
+
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from student_journal import StudentDataJournal, journal_path_for
+from student_storage import JournalStorage, JsonFileStorage, MemoryStorage, SQLiteStorage
+
+NOW = datetime(2024, 5, 1, 12, 0)
+
+
+def make_reminder(task, minutes_from_now):
+    return {
+        'task': task,
+        'time': f"in {minutes_from_now} minutes",
+        'due_datetime': (NOW + timedelta(minutes=minutes_from_now)).isoformat(),
+        'created': NOW.isoformat(),
+        'completed': False,
+        'notified': False,
+    }
+
+
+def make_goal(goal):
+    return {'goal': goal, 'created': NOW.isoformat(), 'progress': 0, 'target': 100}
+
+
+STORAGES = {
+    'memory': lambda folder: MemoryStorage(),
+    'json': lambda folder: JsonFileStorage(str(folder / "student_data.json"), write_delay=0),
+    'journal': lambda folder: JournalStorage(str(folder / "student_data.json"), compact_every=3),
+    'sqlite': lambda folder: SQLiteStorage(str(folder / "student_data.db"), import_json=None),
+}
+
+
+def fill(storage):
+    """
+    The same changes for every storage. Returns what the storage said back.
+    """
+    said = {'Math': storage.add_grade('Math', 8.5)}
+    storage.add_grade('Physics', 9)
+    said['Math again'] = storage.add_grade('Math', 7)
+
+    # Keys a bot adds on its own must survive every storage too
+    late = storage.add_reminder({**make_reminder('hand in essay', 30), 'subject': 'English', 'tags': ['essay']})
+    early = storage.add_reminder(make_reminder('read chapter 3', -10))
+    storage.add_reminder(make_reminder('call study group', -5))
+    said['due before'] = [reminder['task'] for reminder in storage.due_reminders(NOW)]
+    storage.mark_notified(early)
+    said['due after'] = [reminder['task'] for reminder in storage.due_reminders(NOW)]
+    said['late due later'] = [reminder['task'] for reminder in storage.due_reminders(NOW + timedelta(hours=1))
+                              if reminder['id'] == late]
+
+    storage.add_goal({**make_goal('study 2 hours daily'), 'deadline': '2024-06-01'})
+    storage.add_study_session({'subject': 'Math', 'minutes': 45})
+    return said
+
+
+@pytest.mark.parametrize('kind', STORAGES)
+def test_every_storage_keeps_the_same_data(kind, tmp_path):
+    reference = MemoryStorage()
+    expected_said = fill(reference)
+
+    storage = STORAGES[kind](tmp_path)
+    assert fill(storage) == expected_said
+    assert storage.subjects() == reference.subjects()
+    assert [reminder['task'] for reminder in storage.reminders()] == \
+        [reminder['task'] for reminder in reference.reminders()]
+    assert storage.goals() == reference.goals()
+    assert storage.study_sessions() == reference.study_sessions()
+    assert storage.export() == reference.export()
+    storage.close()
+
+
+@pytest.mark.parametrize('kind', ['json', 'journal', 'sqlite'])
+def test_data_is_there_after_a_restart(kind, tmp_path):
+    storage = STORAGES[kind](tmp_path)
+    fill(storage)
+    saved = storage.export()
+    storage.close()
+
+    reopened = STORAGES[kind](tmp_path)
+    assert reopened.export() == saved
+    reopened.close()
+
+
+def test_old_sqlite_database_gets_the_extra_column(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "student_data.db")
+    old = sqlite3.connect(path)
+    old.executescript("""
+        CREATE TABLE reminders (id INTEGER PRIMARY KEY, task TEXT NOT NULL, time TEXT, due_datetime TEXT,
+                                created TEXT, completed INTEGER NOT NULL DEFAULT 0,
+                                notified INTEGER NOT NULL DEFAULT 0);
+        CREATE TABLE goals (id INTEGER PRIMARY KEY, goal TEXT NOT NULL, created TEXT,
+                            progress REAL NOT NULL DEFAULT 0, target REAL NOT NULL DEFAULT 100);
+        INSERT INTO goals (goal) VALUES ('pass Math');
+    """)
+    old.close()
+
+    storage = SQLiteStorage(path, import_json=None)
+    storage.add_goal({**make_goal('read more'), 'deadline': '2024-06-01'})
+    assert [goal['goal'] for goal in storage.goals()] == ['pass Math', 'read more']
+    assert storage.goals()[1]['deadline'] == '2024-06-01'
+    storage.close()
+
+
+def test_journal_replay_cuts_off_a_torn_last_line(tmp_path):
+    data_file = str(tmp_path / "student_data.json")
+    journal = StudentDataJournal(data_file, compact_every=1000)
+    journal.load()
+    journal.append(['subjects', 'Math'], 8.5)
+    journal.append(['subjects', 'Math'], 9)
+    journal.close(compact=False)
+
+    # The program died in the middle of writing the next line
+    with open(journal_path_for(data_file), 'ab') as f:
+        f.write(b'{"n": 3, "op": "append", "path": ["subj')
+
+    journal = StudentDataJournal(data_file, compact_every=1000)
+    assert journal.load()['subjects'] == {'Math': [8.5, 9]}
+    journal.append(['subjects', 'Physics'], 7)  # must not be glued to the torn line
+    journal.close(compact=False)
+
+    with open(journal_path_for(data_file), 'rb') as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['n'] for line in lines] == [1, 2, 3]
+
+    journal = StudentDataJournal(data_file)
+    assert journal.load()['subjects'] == {'Math': [8.5, 9], 'Physics': [7]}
+    journal.close()
+
+
+def test_journal_shared_by_two_bots_loses_nothing(tmp_path):
+    data_file = str(tmp_path / "student_data.json")
+    first = JournalStorage(data_file, compact_every=5)
+    second = JournalStorage(data_file, compact_every=5)
+    for number in range(20):
+        first.add_grade('Math', number)
+        second.add_grade('Physics', number)
+    assert first.subjects() == second.subjects() == {'Math': list(range(20)), 'Physics': list(range(20))}
+    first.close()
+    second.close()
+
+    reopened = JournalStorage(data_file)
+    assert reopened.subjects() == {'Math': list(range(20)), 'Physics': list(range(20))}
+    reopened.close()
+
+
+def test_json_storage_merges_changes_from_another_bot(tmp_path):
+    data_file = str(tmp_path / "student_data.json")
+    first = JsonFileStorage(data_file, write_delay=0)
+    second = JsonFileStorage(data_file, write_delay=0)
+    first.add_grade('Math', 8)
+    second.add_grade('Physics', 9)
+    first.add_grade('Math', 7)
+    assert first.subjects() == second.subjects() == {'Math': [8, 7], 'Physics': [9]}
+    first.close()
+    second.close()
+
+
+def test_unsaved_changes_follow_their_reminder_through_reloads(tmp_path):
+    data_file = str(tmp_path / "student_data.json")
+    slow = JsonFileStorage(data_file, write_delay=60)  # keeps its changes pending
+    other = JsonFileStorage(data_file, write_delay=0)
+
+    slow.add_reminder(make_reminder('mine', -1))
+    other.add_reminder(make_reminder('first of the other bot', -1))
+    mine = [reminder['id'] for reminder in slow.reminders() if reminder['task'] == 'mine'][0]
+    slow.mark_notified(mine)
+    other.add_reminder(make_reminder('second of the other bot', -1))
+
+    # Two reloads with other changes in between: 'notified' must stay on ours
+    notified = [reminder['task'] for reminder in slow.reminders() if reminder['notified']]
+    assert notified == ['mine']
+
+    # ...and in the file, where the queued changes end up
+    slow.flush()
+    reopened = JsonFileStorage(data_file)
+    assert [reminder['task'] for reminder in reopened.reminders() if reminder['notified']] == ['mine']
+    assert len(reopened.reminders()) == 3
+    slow.close()
+    other.close()
+
+
+@pytest.mark.parametrize('write_delay', [0, 60])  # 60: we write with flush() ourselves
+def test_reading_while_saving_never_duplicates_changes(write_delay, tmp_path):
+    data_file = str(tmp_path / "student_data.json")
+    storage = JsonFileStorage(data_file, write_delay=write_delay)
+    stop = threading.Event()
+
+    def keep_reading():
+        while not stop.is_set():
+            storage.subjects()  # reloads the file whenever it looks changed
+
+    reader = threading.Thread(target=keep_reading)
+    reader.start()
+    try:
+        for number in range(200):
+            storage.add_grade('Math', number)
+            storage.flush()
+    finally:
+        stop.set()
+        reader.join()
+    storage.close()
+
+    assert storage.subjects() == {'Math': list(range(200))}
+    assert JsonFileStorage(data_file).subjects() == {'Math': list(range(200))}
+
+
+class WatchedStorage(MemoryStorage):
+    """
+    Remembers whether somebody closed it
+    """
+
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+BOTS = {
+    'advanced': ('advanced_chatbot', 'AdvancedStudentBot', {}),
+    'conversational': ('conversational_chatbot', 'ConversationalStudentBot', {}),
+    'final': ('final_chatbot', 'AdvancedStudentBot', {}),
+    'ultimate': ('ultimate_chatbot', 'UltimateStudentBot', {'enable_ai': False}),
+}
+
+
+def make_bot(kind, **options):
+    module, bot_class, defaults = BOTS[kind]
+    return getattr(__import__(module), bot_class)(**defaults, **options)
+
+
+@pytest.mark.parametrize('kind', BOTS)
+def test_bot_never_closes_a_storage_it_was_given(kind, tmp_path, monkeypatch):
+    from student_profiles import ProfileCache
+
+    monkeypatch.chdir(tmp_path)  # the bot's files go here
+    given = WatchedStorage()
+    bot = make_bot(kind, storage=given, profiles=ProfileCache(root=str(tmp_path / "students")))
+    bot.switch_student('student-1')
+    bot.shutdown()
+    assert not given.closed
+
+    given = WatchedStorage()
+    bot = make_bot(kind, storage=given)
+    bot.shutdown()
+    assert not given.closed
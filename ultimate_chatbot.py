@@ -2,20 +2,35 @@
 # This version adds natural conversation capabilities while keeping all existing features!
 
 import re
+import sys
 import random
-import json
-import os
 from datetime import datetime, timedelta
 import threading
 import time
+import importlib.util
+import itertools
 
-# Check if transformers is available for conversational AI
-try:
-    from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
-    CONVERSATIONAL_AI_AVAILABLE = True
-    print("🧠 Conversational AI libraries loaded successfully!")
-except ImportError:
-    CONVERSATIONAL_AI_AVAILABLE = False
+from intent_router import IntentRouter, MAX_INPUT_LENGTH
+from semantic_tier import SemanticIntentTier, NUMPY_AVAILABLE
+from response_cache import ResponseCache
+from semantic_cache import SemanticAnswerCache
+from knowledge_base import KnowledgeBase
+from inference_queue import BatchingScheduler
+from streaming import hold_back_short_answers
+from generation_backends import TransformersBackend
+from model_router import ModelRouter
+from latency_budget import LatencyBudget
+from process_pool import InferenceWorkerPool
+from student_storage import JournalStorage
+from student_profiles import ProfileCache
+
+# Check if transformers is installed for conversational AI.
+# We only LOOK for it here - importing it takes seconds, so the actual
+# import happens later in a background thread (see start_ai_warmup).
+CONVERSATIONAL_AI_AVAILABLE = importlib.util.find_spec("transformers") is not None
+if CONVERSATIONAL_AI_AVAILABLE:
+    print("🧠 Conversational AI libraries found! The AI will warm up in the background.")
+else:
     print("⚠️ Conversational AI not available. Install with: pip install transformers torch")
 
 def greet_student():
@@ -40,17 +55,90 @@ def greet_student():
     print("-" * 70)
 
 class UltimateStudentBot:
-    def __init__(self):
+    def __init__(self, enable_ai=True, background_warmup=True, max_batch_size=8, batch_wait=0.02,
+                 quantize=False, ai_deadline=8.0, ai_workers=0, ai_backend=None, ai_models=None,
+                 ai_latency_target=2.0, storage=None, student_id=None, profiles=None):
         self.data_file = "student_data.json"
-        self.student_data = self.load_student_data()
+        # Where grades, reminders and goals are kept (see student_storage.py).
+        # By default changes are added to a journal instead of rewriting
+        # the whole file every time (see student_journal.py).
+        # With a student_id each student has their own file instead, and
+        # `profiles` keeps the recently used ones loaded (see student_profiles.py)
+        self.profiles = profiles
+        self.student_id = None
+        self.storage = storage
+        # Only a storage the bot makes itself is closed by it - not one passed
+        # in by the caller, and not one that comes from `profiles`
+        self.own_storage = storage is None
+        if student_id is not None:
+            self.switch_student(student_id)
+        elif storage is None:
+            self.storage = JournalStorage(self.data_file)
         self.reminder_thread = None
         self.running = True
         self.conversation_context = []
         
-        # Initialize conversational AI if available
+        # Initialize conversational AI if available.
+        # With background_warmup the model loads in a separate thread, so
+        # commands work straight away and get_response uses the pattern
+        # answers until the AI is ready.
         self.conversational_ai = None
-        if CONVERSATIONAL_AI_AVAILABLE:
-            self.setup_conversational_ai()
+        self.ai_warmup_thread = None
+        self.ai_ready = threading.Event()
+        self.ai_model_name = "microsoft/DialoGPT-small"
+        self.ai_sampling = {'do_sample': True, 'temperature': 0.7}
+        self.quantize = quantize  # int8 model: less memory, faster on CPU
+        
+        # A ready-made backend (like StubBackend) instead of loading the
+        # real model - see generation_backends.py
+        self.ai_backend = ai_backend
+        
+        # Several models to choose from, best answers first - each question
+        # goes to the best one that can answer within ai_latency_target
+        # seconds (see model_router.py). Each entry is a model name, or a
+        # dict like {'name': ..., 'intents': ['study_tips'], 'max_input_words': 60}
+        self.ai_models = ai_models
+        self.ai_latency_target = ai_latency_target
+        
+        # Every AI prompt starts with these instructions
+        self.ai_instructions = ("You are a helpful study assistant chatbot for students. You give friendly, "
+                                "encouraging advice about studying, academics, and student life. "
+                                "Keep responses concise and practical.\n\n")
+        self.prefix_cache = None
+        
+        # Remembers AI answers (also after a restart). Our model samples, so
+        # we explicitly allow reusing a sampled answer - a good study tip is
+        # still a good study tip the second time.
+        self.response_cache = ResponseCache("ai_response_cache", cache_sampled=True)
+        
+        # Reuses an answer for a question that means the same thing in
+        # other words ("study better" / "study more effectively")
+        # (only with the AI on - without it there are no answers to reuse)
+        ai_enabled = (CONVERSATIONAL_AI_AVAILABLE or ai_backend is not None) and enable_ai
+        self.semantic_cache = SemanticAnswerCache("ai_semantic_cache") if NUMPY_AVAILABLE and ai_enabled else None
+        
+        # When several chats ask the AI at once, their questions are
+        # answered together in one batch (see inference_queue.py)
+        self.inference_queue = None
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait
+        
+        # ai_workers > 0 runs the model in that many separate processes
+        # instead of inside this one (see process_pool.py)
+        self.ai_workers = ai_workers
+        
+        # Time-to-first-token and token count of every streamed answer
+        self.turn_stats = []
+        
+        # Longest we wait for the AI before using a pattern answer instead
+        self.latency_budget = LatencyBudget(seconds=ai_deadline)
+        if ai_enabled:
+            if background_warmup:
+                self.start_ai_warmup()
+            else:
+                self.setup_conversational_ai()
+        else:
+            self.ai_ready.set()  # no AI coming - nobody should wait for it
         
         # Enhanced patterns for structured commands
         self.command_patterns = {
@@ -75,60 +163,285 @@ class UltimateStudentBot:
             'set_goal': [r'.*set.*goal.*', r'.*^goal.*', r'.*target.*']
         }
         
+        # Very long messages (like a pasted transcript) are cut to this size
+        self.max_input_length = MAX_INPUT_LENGTH
+        
+        # Prepare the command table once into a single fast matcher.
+        # The last rule catches grade calculations like 'grades 8 9 7'.
+        self.command_router = IntentRouter(
+            list(self.command_patterns.items()) +
+            [('cgpa_calculation', [r'calculate.*\d+', r'grades.*\d+'])],
+            default=None,
+            max_input_length=self.max_input_length
+        )
+        
+        # Example questions + ready answers for the semantic tier.
+        # Questions that are close enough to an example get an instant answer
+        # instead of waiting for the AI model.
+        self.semantic_intents = {
+            'gpa_question': {
+                'examples': ['what is gpa', 'what does gpa stand for', 'explain grade point average',
+                             'gpa meaning', 'how does gpa work'],
+                'responses': [
+                    "GPA stands for Grade Point Average! 📊 It's a single number that shows your academic performance, usually on a 0-4.0 or 0-10 scale. Track yours with 'add subject Math grade 8.5'!"
+                ]
+            },
+            'cgpa_question': {
+                'examples': ['what is cgpa', 'difference between gpa and cgpa', 'explain cumulative grade point average',
+                             'cgpa meaning', 'what does cgpa stand for'],
+                'responses': [
+                    "CGPA stands for Cumulative Grade Point Average! 🎓 GPA can be for one semester, while CGPA covers ALL your semesters. Try 'show my progress' to see yours!"
+                ]
+            },
+            'study_tips': {
+                'examples': ['how can i study better', 'how do i study more effectively', 'give me study tips',
+                             'best study methods', 'effective study techniques', 'i need advice on studying',
+                             'how to focus while studying', 'how to memorize things'],
+                'responses': [
+                    "📚 Smart study tips:\n🎯 Active recall: test yourself instead of re-reading\n⏰ Pomodoro: 25 min focus + 5 min break\n🔄 Spaced repetition: review at growing intervals\n💡 Explain concepts to someone else\n😴 Sleep 7-8 hours so your memory can consolidate\n\nTry 'set reminder take break in 25 minutes'!"
+                ]
+            },
+            'time_management': {
+                'examples': ['how do i manage my time', 'time management tips', 'i have no time for everything',
+                             'help me organize my schedule',
+                             'i keep procrastinating', 'how to stop procrastination', 'how to plan my week',
+                             'i always miss deadlines'],
+                'responses': [
+                    "⏰ Time management tips:\n📅 Use a planner\n🎯 Do urgent AND important tasks first\n🧱 Time blocking: give each task its own slot\n🐸 Eat the frog: hardest task first\n🚫 Phone away while studying\n\nTry 'set reminder start homework at 6:00pm'!"
+                ]
+            },
+            'exam_prep': {
+                'examples': ['how do i prepare for exams', 'exam preparation tips', 'how to get ready for my test',
+                             'i have an exam tomorrow', 'best way to revise for finals', 'how to study for a test'],
+                'responses': [
+                    "🎯 Exam prep strategy:\n📚 Start early - no cramming!\n📋 Make a schedule working back from the exam date\n📝 Practice with past papers\n👥 Teach the material to a friend\n😴 Sleep well the night before\n\nYou've got this! 💪"
+                ]
+            },
+            'stress': {
+                'examples': ['i feel stressed', 'i am so anxious about school', 'i feel overwhelmed',
+                             'too much pressure from my studies', 'i am worried about my grades'],
+                'responses': [
+                    "😌 Feeling stressed is normal, but let's manage it together! Try: 1) Break tasks into smaller chunks 2) Use the Pomodoro technique 3) Take regular breaks 4) Get enough sleep. I can set study reminders to help you pace yourself: 'set reminder take break in 25 minutes'"
+                ]
+            },
+            'motivation': {
+                'examples': ['i have no motivation', 'i want to give up', 'motivate me to study',
+                             'i feel lazy', 'i am not motivated', 'i need some motivation'],
+                'responses': [
+                    "🌟 Stay motivated! Remember why you started studying. Every small step counts! Set achievable goals with 'set goal [your goal]' and celebrate your progress. You've got this! 💪"
+                ]
+            },
+            'struggling': {
+                'examples': ['i am struggling with my classes', 'this subject is too difficult', 'i find math really hard',
+                             'i am having trouble understanding', 'i am failing a class'],
+                'responses': [
+                    "I understand you're facing some challenges! 💪 That's totally normal for students. What specific area are you struggling with? You can track your progress with 'add subject [name] grade [grade]' to see improvements over time!"
+                ]
+            },
+            'improvement': {
+                'examples': ['how can i improve my grades', 'i want better marks', 'how to raise my cgpa',
+                             'how do i get good grades', 'what should i do to improve my cgpa'],
+                'responses': [
+                    "📈 Great mindset! To improve: 1) Track your current performance with 'show my progress' 2) Set specific goals with 'set goal [target]' 3) Use active study techniques 4) Regular practice. What subject would you like to focus on improving?"
+                ]
+            },
+            'greeting': {
+                'examples': ['hello', 'hi there', 'hey', 'good morning', 'good evening', 'how is it going'],
+                'responses': [
+                    "Hello! 👋 I'm here to help with your studies! What's on your mind today?",
+                    "Hi there! 😊 Ready to tackle some academic challenges together?"
+                ]
+            },
+            'thanks': {
+                'examples': ['thank you', 'thanks a lot', 'that was helpful', 'i appreciate it'],
+                'responses': [
+                    "You're very welcome! 😊 That's what I'm here for! Any other questions?",
+                    "Happy to help! 🌟 Keep up the great work with your studies!"
+                ]
+            }
+        }
+        
+        # The semantic tier sits between the regex patterns and the AI model
+        self.semantic_tier = SemanticIntentTier(self.semantic_intents) if NUMPY_AVAILABLE else None
+        
+        # Answers "explain X" questions from the markdown notes in notes/
+        # (only new or changed notes are read again)
+        self.knowledge_base = KnowledgeBase("notes")
+        self.knowledge_base.update()
+        
         # Start reminder monitoring
         self.start_reminder_monitoring()
     
-    def setup_conversational_ai(self):
+    def start_ai_warmup(self):
+        """
+        Load the conversational AI in a background thread
+        """
+        def warm_up():
+            try:
+                self.setup_conversational_ai(quiet=True)
+                if self.conversational_ai:
+                    print("\n✅ Conversational AI is warmed up! I can now chat naturally!")
+                    print("💬 Chat with me: ", end="", flush=True)
+            finally:
+                self.ai_ready.set()  # also when loading failed
+        
+        self.ai_warmup_thread = threading.Thread(target=warm_up)
+        self.ai_warmup_thread.daemon = True
+        self.ai_warmup_thread.start()
+    
+    def setup_conversational_ai(self, quiet=False):
         """
         Set up the conversational AI model for natural conversations
         """
         try:
-            print("🔄 Loading conversational AI... (this may take a moment)")
+            if not quiet:
+                print("🔄 Loading conversational AI... (this may take a moment)")
             
-            # Use a lightweight conversational model
-            model_name = "microsoft/DialoGPT-small"
+            if self.ai_workers and self.ai_backend is None:
+                self.setup_ai_workers()
+                if not quiet:
+                    print(f"✅ Conversational AI ready in {self.ai_workers} worker process(es)!")
+                return
             
-            self.conversational_ai = pipeline(
-                "text-generation",
-                model=model_name,
-                tokenizer=model_name,
-                pad_token_id=50256,
-                max_length=200,
-                do_sample=True,
-                temperature=0.7
+            if self.ai_backend is None and self.ai_models:
+                self.ai_backend = self.setup_model_router()
+            
+            conversational_ai = self.ai_backend
+            if conversational_ai is None:
+                # Use a lightweight conversational model
+                conversational_ai = TransformersBackend(
+                    self.ai_model_name,
+                    prefix=self.ai_instructions,
+                    quantize=self.quantize,
+                    max_length=200,
+                    **self.ai_sampling
+                )
+            
+            self.prefix_cache = conversational_ai.prefix_cache
+            self.inference_queue = BatchingScheduler(
+                conversational_ai.generate_batch,
+                max_batch_size=self.max_batch_size,
+                max_wait=self.batch_wait
             )
+            # Set last, so nobody uses the AI before everything is ready
+            self.conversational_ai = conversational_ai
             
-            print("✅ Conversational AI ready! I can now chat naturally!")
+            if not quiet:
+                print("✅ Conversational AI ready! I can now chat naturally!")
             
         except Exception as e:
             print(f"⚠️ Conversational AI setup failed: {e}")
             self.conversational_ai = None
+        finally:
+            self.ai_ready.set()
+    
+    def setup_model_router(self):
+        """
+        Loads every model in ai_models and puts a router in front of them
+        """
+        router = ModelRouter(target_seconds=self.ai_latency_target, intent_of=self.prompt_intent)
+        for model in self.ai_models:
+            if isinstance(model, str):
+                model = {'name': model}
+            backend = TransformersBackend(
+                model['name'],
+                prefix=self.ai_instructions,
+                quantize=self.quantize,
+                max_length=200,
+                **self.ai_sampling
+            )
+            router.register(backend, intents=model.get('intents'), max_input_words=model.get('max_input_words'))
+        return router
+    
+    def prompt_intent(self, student_prompt):
+        """
+        The command intent of the question inside an AI prompt (like
+        'study_tips'), or 'general' - lets the router send some kinds of
+        questions to a particular model
+        """
+        question = student_prompt.split("Student: ", 1)[-1].rsplit("\nAssistant:", 1)[0]
+        is_command, intent = self.is_structured_command(question)
+        return intent if is_command else 'general'
+    
+    def setup_ai_workers(self):
+        """
+        Loads the model in separate worker processes, so a long answer never
+        slows down the chat or the reminder thread
+        """
+        pool = InferenceWorkerPool(
+            self.ai_model_name,
+            {'max_length': 200, **self.ai_sampling},
+            prefix=self.ai_instructions,
+            workers=self.ai_workers,
+            quantize=self.quantize
+        )
+        if not pool.wait_until_ready():
+            pool.stop()
+            raise RuntimeError(pool.last_error)
+        
+        # The pool takes requests just like the batching queue, and can be
+        # called just like the pipeline
+        self.inference_queue = pool
+        self.conversational_ai = pool
     
-    def get_conversational_response(self, user_input):
+    def make_ai_request(self, user_input):
         """
-        Generate a natural conversational response using AI
+        Builds the prompt, the generation settings and the cache key settings
         """
+        # Create a student-focused prompt
+        student_prompt = f"""{self.ai_instructions}Student: {user_input}
+Assistant:"""
+        
+        settings = {
+            'max_length': len(student_prompt.split()) + 50,
+            'num_return_sequences': 1,
+        }
+        if self.ai_backend is not None:
+            model = {'model': self.ai_backend.name, 'variant': self.ai_backend.variant}
+        else:
+            model = {'model': self.ai_model_name, 'variant': 'int8' if self.quantize else 'fp32'}
+        cache_params = {**model, **self.ai_sampling, **settings}
+        
+        # Stop the model for good if it's still writing long after the deadline
+        settings['max_time'] = self.latency_budget.hard_limit
+        return student_prompt, settings, cache_params
+    
+    def get_conversational_response(self, user_input, stream=False):
+        """
+        Generate a natural conversational response using AI.
+        With stream=True the answer comes back as pieces to loop over.
+        """
+        if stream:
+            return self.stream_conversational_response(user_input)
+        
         if not self.conversational_ai:
             return None
         
         try:
-            # Create a student-focused prompt
-            student_prompt = f"""You are a helpful study assistant chatbot for students. You give friendly, encouraging advice about studying, academics, and student life. Keep responses concise and practical.
-
-Student: {user_input}
-Assistant:"""
+            student_prompt, settings, cache_params = self.make_ai_request(user_input)
             
-            # Generate response
-            response = self.conversational_ai(
-                student_prompt,
-                max_length=len(student_prompt.split()) + 50,
-                num_return_sequences=1,
-                pad_token_id=50256
-            )
+            # Asked before (maybe in other words)? Reuse the answer instead of generating again
+            assistant_response = self.recall_answer(user_input, student_prompt, cache_params)
             
-            # Extract the assistant's response
-            full_text = response[0]['generated_text']
-            assistant_response = full_text.split("Assistant:")[-1].strip()
+            if assistant_response is None:
+                # Generate response in the background
+                start = time.perf_counter()
+                if self.inference_queue:
+                    future = self.inference_queue.submit_async(student_prompt, **settings)
+                else:
+                    future = self.latency_budget.worker.submit(self.conversational_ai, student_prompt, **settings)
+                
+                # Out of time? get_response falls back to a pattern answer.
+                # The late answer isn't cached: it may have been cut off by
+                # max_time, and the student never saw it.
+                on_time, response = self.latency_budget.wait(future)
+                if not on_time:
+                    return None
+                # Saved right here (not in a callback), so the very next
+                # question can already use it
+                assistant_response = self.extract_assistant_reply(response)
+                self.remember_answer(user_input, student_prompt, cache_params, assistant_response,
+                                     time.perf_counter() - start)
             
             # Clean up the response
             if len(assistant_response) > 10 and assistant_response != user_input:
@@ -140,21 +453,105 @@ Assistant:"""
             print(f"⚠️ Conversational AI error: {e}")
             return None
     
+    def recall_answer(self, user_input, student_prompt, cache_params):
+        """
+        An earlier AI answer to this exact prompt, or to a question that
+        means the same thing - None if we have neither
+        """
+        answer = self.response_cache.get(student_prompt, cache_params)
+        if answer is None and self.semantic_cache:
+            answer = self.semantic_cache.get(user_input, self.semantic_params(cache_params))
+        return answer
+    
+    def remember_answer(self, user_input, student_prompt, cache_params, answer, seconds):
+        """
+        Saves an AI answer in both caches - if it is one we'd show again.
+        Empty or very short answers, the question echoed back, and answers
+        that ran into the hard time limit (probably cut off) are skipped:
+        a cached bad answer would come back for every similar question.
+        """
+        if len(answer) <= 10 or answer == user_input or seconds >= self.latency_budget.hard_limit:
+            return
+        self.response_cache.put(student_prompt, cache_params, answer, seconds)
+        if self.semantic_cache:
+            self.semantic_cache.put(user_input, self.semantic_params(cache_params), answer)
+    
+    def semantic_params(self, cache_params):
+        """
+        max_length grows with the question's length, so similar questions
+        would never share an answer if it were part of the key
+        """
+        return {key: value for key, value in cache_params.items() if key != 'max_length'}
+    
+    def extract_assistant_reply(self, response):
+        """
+        Extract the assistant's response from the generated text
+        """
+        full_text = response[0]['generated_text']
+        return full_text.split("Assistant:")[-1].strip()
+    
+    def stream_conversational_response(self, user_input):
+        """
+        Returns the AI answer as pieces while the model writes it,
+        or None if the AI has nothing useful to say
+        """
+        if not self.conversational_ai:
+            return None
+        
+        if self.ai_workers:
+            # Worker processes send back whole answers, not pieces
+            answer = self.get_conversational_response(user_input)
+            return iter([answer]) if answer else None
+        
+        student_prompt, settings, cache_params = self.make_ai_request(user_input)
+        cached = self.recall_answer(user_input, student_prompt, cache_params)
+        if cached is not None:
+            if len(cached) > 10 and cached != user_input:
+                return iter([f"🤖 {cached}"])
+            return None
+        
+        token_stream = self.conversational_ai.stream(student_prompt, {**self.ai_sampling, **settings})
+        
+        def pieces():
+            try:
+                # Nothing is shown until we know the answer isn't too short
+                yield from hold_back_short_answers(token_stream, 11)
+            except Exception as e:
+                print(f"⚠️ Conversational AI error: {e}")
+                return
+            # A late stream (the student got a pattern answer instead) is
+            # read to the end, but not cached
+            first_token = token_stream.first_token_seconds
+            if first_token is not None and first_token <= self.latency_budget.seconds:
+                self.remember_answer(user_input, student_prompt, cache_params, token_stream.text.strip(),
+                                     token_stream.total_seconds)
+            self.turn_stats.append(token_stream.stats())
+        
+        # No first words within the time budget? get_response falls back
+        answer = self.latency_budget.start_stream(pieces())
+        if answer is None:
+            return None
+        return itertools.chain(["🤖 "], answer)
+    
+    def get_semantic_response(self, user_input):
+        """
+        Answer from our ready-made responses if the question is similar
+        enough to an example question (much faster than the AI model)
+        """
+        if not self.semantic_tier:
+            return None
+        return self.semantic_tier.respond(user_input)
+    
     def is_structured_command(self, user_input):
         """
         Check if the input is a structured command rather than conversational
         """
         user_input = user_input.lower().strip()
         
-        # Check for command patterns
-        for intent, patterns in self.command_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, user_input):
-                    return True, intent
-        
-        # Check for grade calculations
-        if re.search(r'calculate.*\d+', user_input) or re.search(r'grades.*\d+', user_input):
-            return True, 'cgpa_calculation'
+        # One scan over the command patterns + grade calculation rules
+        intent = self.command_router.match(user_input)
+        if intent:
+            return True, intent
         
         return False, None
     
@@ -197,31 +594,22 @@ Assistant:"""
         """
         Check if any reminders are due and notify
         """
-        if not self.student_data.get('reminders'):
-            return
-        
         current_time = datetime.now()
-        
-        for reminder in self.student_data['reminders']:
-            if not reminder.get('completed', False) and not reminder.get('notified', False):
-                reminder_time = reminder.get('due_datetime')
-                if reminder_time:
-                    try:
-                        reminder_dt = datetime.fromisoformat(reminder_time)
-                        if current_time >= reminder_dt:
-                            # Show notification
-                            print(f"\n\n🔔 REMINDER ALERT! 🔔")
-                            print(f"⏰ Time: {reminder['time']}")
-                            print(f"📝 Task: {reminder['task']}")
-                            print(f"💡 Don't forget to {reminder['task']}!")
-                            print("="*40)
-                            print("💬 Command or question: ", end="", flush=True)
-                            
-                            # Mark as notified
-                            reminder['notified'] = True
-                            self.save_student_data()
-                    except:
-                        pass
+        # The same storage for the whole check, even if the student changes meanwhile
+        storage = self.storage
+        
+        # Only reminders that are due and not announced yet
+        for reminder in storage.due_reminders(current_time):
+            # Show notification
+            print(f"\n\n🔔 REMINDER ALERT! 🔔")
+            print(f"⏰ Time: {reminder['time']}")
+            print(f"📝 Task: {reminder['task']}")
+            print(f"💡 Don't forget to {reminder['task']}!")
+            print("="*40)
+            print("💬 Command or question: ", end="", flush=True)
+            
+            # Mark as notified
+            storage.mark_notified(reminder['id'])
     
     def parse_reminder_time(self, time_str):
         """
@@ -273,36 +661,6 @@ Assistant:"""
         due_time = current_time + timedelta(minutes=5)
         return due_time, "in 5 minutes (default)"
     
-    def load_student_data(self):
-        """
-        Load student data from file if it exists
-        """
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-            except:
-                pass
-        
-        # Default structure
-        return {
-            'subjects': {},
-            'reminders': [],
-            'goals': [],
-            'study_sessions': []
-        }
-    
-    def save_student_data(self):
-        """
-        Save student data to file
-        """
-        try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.student_data, f, indent=2)
-            return True
-        except:
-            return False
-    
     def add_subject_grade(self, text):
         """
         Extract subject and grade from text
@@ -314,13 +672,9 @@ Assistant:"""
             subject = match.group(1).strip().title()
             grade = float(match.group(2))
             
-            if subject not in self.student_data['subjects']:
-                self.student_data['subjects'][subject] = []
-            
-            self.student_data['subjects'][subject].append(grade)
-            self.save_student_data()
+            grades = self.storage.add_grade(subject, grade)
             
-            avg = sum(self.student_data['subjects'][subject]) / len(self.student_data['subjects'][subject])
+            avg = sum(grades) / len(grades)
             
             return f"✅ Added {subject}: {grade}\n📊 Current average in {subject}: {avg:.2f}\n💾 Data saved!"
         
@@ -330,7 +684,8 @@ Assistant:"""
         """
         Show all subjects and their progress
         """
-        if not self.student_data['subjects']:
+        subjects = self.storage.subjects()
+        if not subjects:
             return "📚 No subjects added yet! Try: 'add subject Math grade 8.5'"
         
         result = "📊 Your Academic Progress:\n" + "="*40 + "\n"
@@ -338,7 +693,7 @@ Assistant:"""
         total_points = 0
         total_subjects = 0
         
-        for subject, grades in self.student_data['subjects'].items():
+        for subject, grades in subjects.items():
             avg = sum(grades) / len(grades)
             total_points += avg
             total_subjects += 1
@@ -383,8 +738,7 @@ Assistant:"""
                 'notified': False
             }
             
-            self.student_data['reminders'].append(reminder)
-            self.save_student_data()
+            self.storage.add_reminder(reminder)
             
             return f"⏰ Reminder set!\n📝 Task: {task}\n🕐 Time: {formatted_time}\n⚡ I'll notify you automatically when it's time!\n💾 Reminder saved!"
         
@@ -394,12 +748,13 @@ Assistant:"""
         """
         Show all reminders with better formatting
         """
-        if not self.student_data['reminders']:
+        reminders = self.storage.reminders()
+        if not reminders:
             return "⏰ No reminders set! Try: 'set reminder study Math in 5 minutes'"
         
         result = "⏰ Your Study Reminders:\n" + "="*30 + "\n"
         
-        for i, reminder in enumerate(self.student_data['reminders'], 1):
+        for i, reminder in enumerate(reminders, 1):
             if reminder['completed']:
                 status = "✅ Completed"
             elif reminder.get('notified', False):
@@ -428,8 +783,7 @@ Assistant:"""
                 'target': 100
             }
             
-            self.student_data['goals'].append(goal)
-            self.save_student_data()
+            self.storage.add_goal(goal)
             
             return f"🎯 Goal set: {goal_text}\n📈 Track your progress with 'show goals'\n💪 You've got this!"
         
@@ -439,12 +793,13 @@ Assistant:"""
         """
         Show all goals
         """
-        if not self.student_data['goals']:
+        goals = self.storage.goals()
+        if not goals:
             return "🎯 No goals set! Try: 'set goal study 2 hours daily'"
         
         result = "🎯 Your Study Goals:\n" + "="*25 + "\n"
         
-        for i, goal in enumerate(self.student_data['goals'], 1):
+        for i, goal in enumerate(goals, 1):
             result += f"\n{i}. 📋 {goal['goal']}\n"
             result += f"   📅 Created: {goal['created']}\n"
             result += f"   📈 Progress: {goal['progress']}%\n"
@@ -481,6 +836,10 @@ Assistant:"""
 • 'calculate cgpa with grades X, Y, Z' - Calculate CGPA
 • 'what is gpa/cgpa' - Get explanations
 
+📖 YOUR NOTES:
+• "Explain binary search" - Answered from the markdown notes in 'notes/'
+• Add your own .md notes there - new and changed notes are picked up at start
+
 💾 DATA:
 Your data is automatically saved in 'student_data.json'
 
@@ -489,8 +848,12 @@ Reminders will automatically notify you when due!
 
 🌟 NEW: I can now chat naturally about studying!"""
         
-        if CONVERSATIONAL_AI_AVAILABLE:
+        if self.conversational_ai:
             help_text += "\n\n🧠 Conversational AI: ACTIVE ✅"
+        elif CONVERSATIONAL_AI_AVAILABLE and not self.ai_ready.is_set() and self.ai_warmup_thread:
+            help_text += "\n\n🧠 Conversational AI: warming up in the background ⏳ (commands work already!)"
+        elif CONVERSATIONAL_AI_AVAILABLE:
+            help_text += "\n\n🧠 Conversational AI: not loaded - using smart pattern answers"
         else:
             help_text += "\n\n🧠 Conversational AI: Install transformers for natural chat"
         
@@ -503,10 +866,15 @@ Reminders will automatically notify you when due!
         grades = re.findall(r'\b\d+(?:\.\d+)?\b', text)
         return [float(grade) for grade in grades if 0 <= float(grade) <= 10]
     
-    def get_response(self, user_input):
+    def get_response(self, user_input, stream=False):
         """
-        Main response handler - chooses between structured commands and conversational AI
+        Main response handler - chooses between structured commands and conversational AI.
+        With stream=True an AI answer comes back as pieces to print one by
+        one; every other answer is still a normal string.
         """
+        # Only look at the first part of very long messages
+        user_input = user_input[:self.max_input_length]
+        
         # Check if it's a structured command
         is_command, intent = self.is_structured_command(user_input)
         
@@ -534,37 +902,79 @@ Reminders will automatically notify you when due!
                 else:
                     return "🧮 CGPA Calculator ready! Format: 'calculate cgpa with grades 8, 9, 7, 8'"
             elif intent in ['gpa_question', 'cgpa_question', 'study_tips', 'time_management', 'exam_prep']:
-                # Use conversational AI for these if available, otherwise fallback
+                # Try a quick semantic answer, then the notes, then conversational AI, otherwise fallback
+                semantic_response = self.get_semantic_response(user_input)
+                if semantic_response:
+                    return semantic_response
+                notes_response = self.knowledge_base.answer(user_input)
+                if notes_response:
+                    return notes_response
                 if self.conversational_ai:
-                    ai_response = self.get_conversational_response(user_input)
+                    ai_response = self.get_conversational_response(user_input, stream=stream)
                     if ai_response:
                         return ai_response
                 return self.get_smart_fallback(user_input)
         
+        # Questions close to one we already know get an instant answer
+        semantic_response = self.get_semantic_response(user_input)
+        if semantic_response:
+            return semantic_response
+        
+        # Explanations from the student's notes beat a guess from the AI
+        notes_response = self.knowledge_base.answer(user_input)
+        if notes_response:
+            return notes_response
+        
         # Try conversational AI for natural questions
         if self.conversational_ai:
-            ai_response = self.get_conversational_response(user_input)
+            ai_response = self.get_conversational_response(user_input, stream=stream)
             if ai_response:
                 return ai_response
         
         # Fallback to smart pattern-based responses
         return self.get_smart_fallback(user_input)
     
+    def switch_student(self, student_id):
+        """
+        Carries on with another student's grades, reminders and goals
+        """
+        if self.profiles is None:
+            self.profiles = ProfileCache()
+        if self.own_storage and self.storage is not None:
+            # The bot's first storage isn't kept by `profiles`, so nobody
+            # else would ever save and close it
+            self.storage.close()
+        self.storage = self.profiles.get(student_id)
+        self.own_storage = False
+        self.student_id = student_id
+        self.data_file = self.profiles.path(student_id)
+        self.conversation_context = []
+    
     def shutdown(self):
         """
         Properly shutdown the bot
         """
         self.running = False
+        if self.inference_queue:
+            self.inference_queue.stop()
+        self.latency_budget.shutdown()
+        if self.semantic_cache:
+            self.semantic_cache.flush()
+        if self.profiles is not None:
+            self.profiles.close()  # closes the current storage too, if it came from there
+        if self.own_storage:
+            self.storage.close()
 
-def main_ultimate_chat():
+def main_ultimate_chat(student_id=None):
     """
     Main chat loop for the ultimate conversational student chatbot
     """
     greet_student()
-    bot = UltimateStudentBot()
+    bot = UltimateStudentBot(student_id=student_id)
     
     if CONVERSATIONAL_AI_AVAILABLE:
         print("✅ ULTIMATE mode activated! Natural conversations + structured commands!")
+        print("⏳ The AI is still warming up - commands and quick answers work right now.")
     else:
         print("✅ Advanced mode activated! Smart responses + structured commands!")
     
@@ -576,14 +986,26 @@ def main_ultimate_chat():
             
             if user_input.lower().strip() in ['quit', 'exit', 'bye', 'goodbye']:
                 print("\n👋 Goodbye! Your data has been saved. Keep studying smart! 🌟")
+                budget = bot.latency_budget.stats()
+                if budget['missed']:
+                    print(f"⏳ The AI missed the {budget['budget_seconds']:.0f}s time limit {budget['missed']} time(s) - I answered from my patterns instead")
+                if bot.semantic_cache and bot.semantic_cache.hits:
+                    print(f"🔁 {bot.semantic_cache.hits} question(s) were answered from similar earlier questions")
                 bot.shutdown()
                 break
             
             if user_input.strip() == "":
                 continue
             
-            response = bot.get_response(user_input)
-            print(f"\n🤖 Assistant: {response}")
+            response = bot.get_response(user_input, stream=True)
+            if isinstance(response, str):
+                print(f"\n🤖 Assistant: {response}")
+            else:
+                # AI answers are printed while they are being written
+                print("\n🤖 Assistant: ", end="", flush=True)
+                for piece in response:
+                    print(piece, end="", flush=True)
+                print()
     except KeyboardInterrupt:
         print("\n👋 Goodbye! Your data has been saved.")
         bot.shutdown()
@@ -591,4 +1013,5 @@ def main_ultimate_chat():
 # Start the ultimate chatbot
 if __name__ == "__main__":
     print("🚀 Starting ULTIMATE Student Helper with Conversational AI...")
-    main_ultimate_chat()
+    # python ultimate_chatbot.py [student ID]
+    main_ultimate_chat(sys.argv[1] if len(sys.argv) > 1 else None)